@@ -0,0 +1,103 @@
+"""Benchmark CPU per stream audio: jalur PCM lama vs Opus passthrough
+
+Membuat file uji Opus/WebM dengan FFmpeg, lalu memutar N stream bersamaan
+secara real-time (satu frame per 20 ms, seperti AudioPlayer discord.py)
+untuk setiap mode:
+
+  pcm        FFmpegPCMAudio + PCMVolumeTransformer, encode Opus di proses bot
+  pcm-50     sama, volume 50%
+  opus-copy  FFmpegOpusAudio dengan codec copy (tanpa decode/encode)
+  opus-50    FFmpegOpusAudio, volume 50% lewat filter FFmpeg (encode di FFmpeg)
+
+CPU dihitung terpisah untuk proses bot (termasuk encode libopus) dan untuk
+proses FFmpeg, lalu dibagi jumlah stream. Butuh ffmpeg di PATH dan libopus
+(untuk mode PCM).
+
+    python benchmarks/bench_audio.py [jumlah_stream] [detik]
+"""
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+
+from utils.audio import FRAME_SECONDS, open_audio
+
+MODES = {
+    'pcm': dict(mode='pcm', volume=1.0),
+    'pcm-50': dict(mode='pcm', volume=0.5),
+    'opus-copy': dict(mode='opus', volume=1.0),
+    'opus-50': dict(mode='opus', volume=0.5),
+}
+
+
+def make_sample(path, seconds):
+    """File WebM berisi Opus 48 kHz stereo, mirip format audio YouTube"""
+    subprocess.run([
+        'ffmpeg', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}:sample_rate=48000',
+        '-ac', '2', '-c:a', 'libopus', '-b:a', '128k', path,
+    ], check=True)
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_mode(path, streams, seconds, mode, volume):
+    encoder = discord.opus.Encoder() if mode == 'pcm' else None
+    sources = [open_audio(path, volume=volume, acodec='opus', mode=mode)
+               for _ in range(streams)]
+
+    cpu_start = time.process_time()
+    child_start = children_cpu()
+    wall_start = time.perf_counter()
+    frames = int(seconds / FRAME_SECONDS)
+    for i in range(frames):
+        for source in sources:
+            data = source.read()
+            if data and not source.is_opus():
+                encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+        # Jaga ritme real-time supaya FFmpeg tidak berjalan secepat mungkin
+        delay = wall_start + (i + 1) * FRAME_SECONDS - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    wall = time.perf_counter() - wall_start
+    bot_cpu = time.process_time() - cpu_start
+
+    for source in sources:
+        source.cleanup()
+    ffmpeg_cpu = children_cpu() - child_start
+    return bot_cpu / wall / streams * 100, ffmpeg_cpu / wall / streams * 100
+
+
+def main(streams, seconds):
+    if shutil.which('ffmpeg') is None:
+        sys.exit("ffmpeg tidak ditemukan di PATH")
+    if not discord.opus.is_loaded():
+        discord.opus._load_default()
+    modes = dict(MODES)
+    if not discord.opus.is_loaded():
+        print("libopus tidak tersedia, mode PCM dilewati")
+        modes = {k: v for k, v in modes.items() if v['mode'] != 'pcm'}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sample.webm')
+        make_sample(path, seconds + 5)
+        print(f"{streams} stream x {seconds}s, CPU per stream (% satu core)")
+        for name, options in modes.items():
+            bot_cpu, ffmpeg_cpu = run_mode(path, streams, seconds, **options)
+            print(f"  {name:<10} bot: {bot_cpu:6.2f}%  ffmpeg: {ffmpeg_cpu:6.2f}%  "
+                  f"total: {bot_cpu + ffmpeg_cpu:6.2f}%")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 10)
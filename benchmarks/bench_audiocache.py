@@ -0,0 +1,327 @@
+"""Pemeriksaan cache audio lokal (utils.audiocache) dengan fixture Ogg Opus
+
+Fixture pendek (Ogg Opus berisi frame hening 20 ms) dibuat di direktori
+sementara: lewat FFmpeg jika tersedia, selain itu ditulis langsung (halaman
+Ogg dengan CRC). Fixture direkam seperti OpusSource merekam output FFmpeg
+(TeeReader + parser Ogg) lalu diputar ulang lewat LocalOpusSource. Setiap
+skenario memeriksa (assert) isi cache, file di disk dan counter stats():
+
+  rekam       rekaman lengkap masuk store, diputar ulang paket per paket
+  ulang       track yang sama direkam lagi (serial Ogg lain) -> tetap satu objek
+  lru         kuota penuh -> objek yang paling lama tidak diputar dibuang
+  lfu         kuota penuh -> objek yang paling jarang diputar dibuang
+  batal       skip, tanpa durasi dan melebihi kuota -> tidak ada yang disimpan
+  crash       .part, .tmp dan objek tanpa index dibuang saat cache dibuka;
+              entri index yang filenya hilang ikut dibuang
+  index       get() tidak pernah fsync; hit tersimpan lewat thread latar/close()
+
+Di akhir diukur waktu get() untuk objek yang ada di cache.
+
+    python benchmarks/bench_audiocache.py [detik_fixture] [jumlah_get]
+"""
+import os
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discord.oggparse import OggStream  # noqa: E402
+
+from utils.audio import FRAME_SECONDS, LocalOpusSource  # noqa: E402
+from utils.audiocache import AudioCache, TeeReader  # noqa: E402
+
+# Frame Opus 20 ms berisi hening (TOC config 31, satu frame)
+SILENCE = b'\xf8\xff\xfe'
+PACKETS_PER_PAGE = 50
+
+
+def _crc_table():
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def ogg_crc(data):
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ CRC_TABLE[(crc >> 24) ^ byte]
+    return crc
+
+
+def ogg_page(flag, granule, serial, seq, packets):
+    lacing = b''
+    for packet in packets:
+        lacing += b'\xff' * (len(packet) // 255) + bytes([len(packet) % 255])
+    header = b'OggS' + struct.pack('<BBQIIIB', 0, flag, granule, serial, seq, 0, len(lacing))
+    page = header + lacing + b''.join(packets)
+    crc = ogg_crc(page)
+    return page[:22] + struct.pack('<I', crc) + page[26:]
+
+
+def write_fixture(path, seconds):
+    """Tulis Ogg Opus `seconds` detik; serial acak seperti output FFmpeg"""
+    serial = random.getrandbits(32)
+    head = b'OpusHead' + struct.pack('<BBHIhB', 1, 2, 312, 48000, 0, 0)
+    tags = b'OpusTags' + struct.pack('<I', 5) + b'bench' + struct.pack('<I', 0)
+    pages = [ogg_page(2, 0, serial, 0, [head]), ogg_page(0, 0, serial, 1, [tags])]
+    frames = int(seconds / FRAME_SECONDS)
+    for start in range(0, frames, PACKETS_PER_PAGE):
+        count = min(PACKETS_PER_PAGE, frames - start)
+        last = start + count >= frames
+        granule = 312 + (start + count) * 960
+        pages.append(ogg_page(4 if last else 0, granule, serial, len(pages), [SILENCE] * count))
+    with open(path, 'wb') as f:
+        f.write(b''.join(pages))
+
+
+def encode_fixture(path, seconds):
+    """Encode sine pendek dengan FFmpeg; False jika FFmpeg/libopus tidak ada"""
+    if shutil.which('ffmpeg') is None:
+        return False
+    result = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}',
+         '-c:a', 'libopus', '-b:a', '64k', '-f', 'ogg', path],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+def make_fixture(directory, seconds, name='fixture'):
+    path = os.path.join(directory, name + '.ogg')
+    if not encode_fixture(path, seconds):
+        write_fixture(path, seconds)
+    return path
+
+
+def record(cache, key, fixture, seconds, ok=True, expected=True):
+    """Rekam fixture seperti OpusSource: paket dibaca lewat TeeReader"""
+    recorder = cache.recorder(key, expected=seconds if expected else None)
+    with open(fixture, 'rb') as f:
+        packets = list(OggStream(TeeReader(f, recorder)).iter_packets())
+    recorder.finish(ok, len(packets) * FRAME_SECONDS)
+    return packets
+
+
+def replay(path):
+    source = LocalOpusSource(path)
+    packets = []
+    try:
+        while True:
+            packet = source.read()
+            if not packet:
+                break
+            packets.append(packet)
+        assert source.position == len(packets) * FRAME_SECONDS
+    finally:
+        source.cleanup()
+    return packets
+
+
+def tmp_files(cache):
+    # Tunggu thread latar selesai menulis index (file .tmp miliknya sendiri)
+    cache.flush()
+    names = os.listdir(os.path.join(cache.path, 'tmp'))
+    return names + [name for name in os.listdir(cache.path) if name.endswith('.tmp')]
+
+
+def object_files(cache):
+    objects = os.path.join(cache.path, 'objects')
+    return sorted(name for prefix in os.listdir(objects)
+                  for name in os.listdir(os.path.join(objects, prefix)))
+
+
+def scenario_record(work, seconds):
+    fixture = make_fixture(work, seconds)
+    cache = AudioCache(os.path.join(work, 'cache'))
+    recorded = record(cache, 'youtube:a', fixture, seconds)
+    path = cache.get('youtube:a')
+    assert path is not None and 'youtube:a' in cache
+    assert replay(path) == recorded and len(recorded) > seconds / FRAME_SECONDS
+    assert cache.get('youtube:b') is None
+    assert not tmp_files(cache)
+    return cache
+
+
+def scenario_rerecord(work, seconds):
+    cache = AudioCache(os.path.join(work, 'cache'))
+    for name in ('satu', 'dua'):
+        # Setiap rekaman punya serial Ogg berbeda, isinya tidak pernah identik
+        fixture = make_fixture(work, seconds, name)
+        recorded = record(cache, 'youtube:a', fixture, seconds)
+    assert len(cache) == 1 and cache.stats()['objects'] == 1
+    assert cache.stats()['stored'] == 2 and len(object_files(cache)) == 1
+    assert replay(cache.get('youtube:a')) == recorded
+    return cache
+
+
+def fill(work, seconds, policy):
+    """Cache dengan kuota 2,5 fixture berisi 'a' dan 'b'"""
+    fixture = make_fixture(work, seconds)
+    size = os.path.getsize(fixture)
+    cache = AudioCache(os.path.join(work, 'cache'), quota=int(size * 2.5), policy=policy)
+    for key in ('a', 'b'):
+        record(cache, key, fixture, seconds)
+    return cache, fixture
+
+
+def scenario_lru(work, seconds):
+    cache, fixture = fill(work, seconds, 'lru')
+    cache.get('b')
+    cache.get('b')
+    cache.get('a')
+    record(cache, 'c', fixture, seconds)
+    # 'b' lebih sering diputar, tapi 'a' yang terakhir
+    assert 'a' in cache and 'b' not in cache and 'c' in cache
+    assert cache.stats()['evictions'] == 1 and len(object_files(cache)) == 2
+    return cache
+
+
+def scenario_lfu(work, seconds):
+    cache, fixture = fill(work, seconds, 'lfu')
+    cache.get('b')
+    cache.get('b')
+    cache.get('a')
+    record(cache, 'c', fixture, seconds)
+    assert 'a' not in cache and 'b' in cache and 'c' in cache
+    assert cache.stats()['evictions'] == 1 and len(object_files(cache)) == 2
+    return cache
+
+
+def scenario_abort(work, seconds):
+    fixture = make_fixture(work, seconds)
+    cache = AudioCache(os.path.join(work, 'cache'), quota=os.path.getsize(fixture) // 2)
+    record(cache, 'besar', fixture, seconds)
+    cache.quota = 1024 ** 3
+    record(cache, 'live', fixture, seconds, expected=False)
+    record(cache, 'gagal', fixture, seconds, ok=False)
+
+    # Skip di tengah lagu: rekaman baru separuh lalu dibatalkan
+    recorder = cache.recorder('skip', expected=seconds)
+    with open(fixture, 'rb') as f:
+        recorder.write(f.read(os.path.getsize(fixture) // 2))
+    recorder.abort()
+    recorder.finish(True, seconds)
+
+    assert len(cache) == 0 and not object_files(cache) and not tmp_files(cache)
+    stats = cache.stats()
+    assert stats['stored'] == 0 and stats['aborted'] == 4, stats
+    return cache
+
+
+def scenario_crash(work, seconds):
+    fixture = make_fixture(work, seconds)
+    path = os.path.join(work, 'cache')
+    cache = AudioCache(path)
+    recorded = record(cache, 'a', fixture, seconds)
+    record(cache, 'b', fixture, seconds)
+    cache.flush()
+
+    # Proses mati di tengah rekaman, di tengah menulis index, dan setelah
+    # objek dipindahkan tapi sebelum index sempat ditulis
+    with open(os.path.join(path, 'tmp', 'x.part'), 'wb') as f:
+        f.write(b'OggS' + b'\0' * 100)
+    with open(os.path.join(path, 'index.json.tmp'), 'w') as f:
+        f.write('{"keys": {')
+    orphan = os.path.join(path, 'objects', 'ff', 'f' * 64 + '.ogg')
+    os.makedirs(os.path.dirname(orphan), exist_ok=True)
+    shutil.copy(fixture, orphan)
+    os.unlink(cache.get('b'))
+
+    cache = AudioCache(path)
+    assert not tmp_files(cache) and not os.path.exists(orphan)
+    assert 'a' in cache and 'b' not in cache and len(object_files(cache)) == 1
+    assert replay(cache.get('a')) == recorded
+    return cache
+
+
+def scenario_index(work, seconds):
+    fixture = make_fixture(work, seconds)
+    path = os.path.join(work, 'cache')
+    cache = AudioCache(path)
+    fsyncs = []
+    fsync = os.fsync
+
+    def counting_fsync(fd):
+        fsyncs.append(threading.current_thread().name)
+        fsync(fd)
+
+    os.fsync = counting_fsync
+    try:
+        record(cache, 'a', fixture, seconds)
+        # Hanya file .part yang di-fsync oleh thread perekam
+        assert fsyncs.count(threading.current_thread().name) == 1, fsyncs
+        fsyncs.clear()
+        for _ in range(100):
+            assert cache.get('a') is not None
+        assert threading.current_thread().name not in fsyncs, fsyncs
+        cache.close()
+    finally:
+        os.fsync = fsync
+    assert not cache._flusher.is_alive()
+
+    cache = AudioCache(path)
+    assert cache._objects[cache._keys['a']]['hits'] == 100
+    return cache
+
+
+SCENARIOS = (
+    ('rekam', scenario_record),
+    ('ulang', scenario_rerecord),
+    ('lru', scenario_lru),
+    ('lfu', scenario_lfu),
+    ('batal', scenario_abort),
+    ('crash', scenario_crash),
+    ('index', scenario_index),
+)
+
+
+def get_timing(work, seconds, count):
+    fixture = make_fixture(work, seconds)
+    cache = AudioCache(os.path.join(work, 'cache'))
+    record(cache, 'a', fixture, seconds)
+    started = time.perf_counter()
+    for _ in range(count):
+        cache.get('a')
+    elapsed = time.perf_counter() - started
+    cache.close()
+    return elapsed / count
+
+
+def main(seconds, count):
+    encoded = encode_fixture(os.path.join(tempfile.mkdtemp(), 'cek.ogg'), 0.1)
+    print(f"fixture {seconds:g} detik ({'FFmpeg libopus' if encoded else 'Ogg sintetis, FFmpeg tidak ada'})")
+    print(f"  {'skenario':<10} {'objek':>6} {'stored':>7} {'evict':>6} {'batal':>6}")
+    for name, scenario in SCENARIOS:
+        work = tempfile.mkdtemp()
+        try:
+            cache = scenario(work, seconds)
+            stats = cache.stats()
+            cache.close()
+        finally:
+            shutil.rmtree(work)
+        print(f"  {name:<10} {stats['objects']:>6} {stats['stored']:>7} "
+              f"{stats['evictions']:>6} {stats['aborted']:>6}  ok")
+
+    work = tempfile.mkdtemp()
+    try:
+        per_get = get_timing(work, seconds, count)
+    finally:
+        shutil.rmtree(work)
+    print(f"\n  get() untuk objek di cache: {per_get * 1e6:.1f} us ({count} kali)")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2.0,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
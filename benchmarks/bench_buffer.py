@@ -0,0 +1,220 @@
+"""Benchmark jitter buffer audio (utils.audiobuffer) dengan stream tersendat
+
+Membuat file Ogg berisi paket "Opus" sintetis (20 ms per paket), lalu
+menyajikannya lewat server HTTP lokal yang sengaja diperlambat: laju kirim
+sekian kali real-time dan jeda acak seperti stream YouTube yang tersendat.
+Source membaca paket dengan parser Ogg yang sama dengan FFmpegOpusAudio
+(tanpa FFmpeg, jadi bisa dijalankan offline), dan setiap stream diputar oleh
+thread dengan ritme AudioPlayer discord.py (satu frame per 20 ms).
+
+Untuk tiap skenario jaringan dan kedalaman buffer dicatat:
+
+  mulai    waktu sampai frame audio pertama (ms)
+  patah    frame yang terlambat > 20 ms (baca langsung) atau underrun (buffer)
+  celah    total audio yang hilang/tertunda setelah mulai (ms)
+  baca p99 waktu read() di thread player
+
+    python benchmarks/bench_buffer.py [jumlah_stream] [detik]
+"""
+import os
+import random
+import struct
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord  # noqa: E402
+from discord.oggparse import OggStream  # noqa: E402
+
+from utils import audiobuffer  # noqa: E402
+
+FRAME = 0.02
+PACKET_SIZE = 200
+
+# nama: (laju kirim x real-time, rata-rata jeda antar stall (detik), durasi stall min-max)
+SCENARIOS = {
+    'stabil': (1.5, None, (0, 0)),
+    'tersendat': (1.3, 3.0, (0.2, 0.8)),
+    'lambat': (0.9, None, (0, 0)),
+}
+DEPTHS_MS = (0, 250, 1000, 2000)
+
+
+def write_ogg(path, seconds):
+    """File Ogg dengan paket 200 byte per 20 ms (isi acak, tidak di-decode)"""
+    rng = random.Random(23)
+    packets = int(seconds / FRAME)
+    with open(path, 'wb') as f:
+        for page, start in enumerate(range(0, packets, 50)):
+            count = min(50, packets - start)
+            body = bytes(rng.getrandbits(8) for _ in range(PACKET_SIZE)) * count
+            header = struct.pack('<4sBBqIIIB', b'OggS', 0, 0, (start + count) * 960,
+                                 1, page, 0, count)
+            f.write(header + bytes([PACKET_SIZE]) * count + body)
+
+
+class ThrottledHandler(BaseHTTPRequestHandler):
+    """Kirim file dengan laju terbatas dan jeda acak; jalur /<skenario>/<seed>"""
+
+    path_file = None
+
+    def do_GET(self):
+        _, name, seed = self.path.split('/')
+        rate, stall_every, (stall_min, stall_max) = SCENARIOS[name]
+        rng = random.Random(int(seed))
+        with open(self.path_file, 'rb') as f:
+            data = f.read()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        bytes_per_second = PACKET_SIZE / FRAME * rate
+        chunk = 2048
+        started = time.perf_counter()
+        sent = 0
+        next_stall = started + rng.expovariate(1 / stall_every) if stall_every else None
+        try:
+            while sent < len(data):
+                now = time.perf_counter()
+                if next_stall is not None and now >= next_stall:
+                    pause = rng.uniform(stall_min, stall_max)
+                    time.sleep(pause)
+                    started += pause
+                    next_stall = time.perf_counter() + rng.expovariate(1 / stall_every)
+                self.wfile.write(data[sent:sent + chunk])
+                sent += chunk
+                delay = started + sent / bytes_per_second - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPOggSource(discord.AudioSource):
+    """Paket Ogg dari HTTP, seperti FFmpegOpusAudio membaca pipe FFmpeg"""
+
+    def __init__(self, url):
+        self.response = urllib.request.urlopen(url)
+        self._packets = OggStream(self.response).iter_packets()
+
+    def read(self):
+        return next(self._packets, b'')
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        self.response.close()
+
+
+def play(source, result):
+    """Putar source dengan ritme AudioPlayer._do_run discord.py"""
+    reads = []
+    late = 0.0
+    late_frames = 0
+    loops = 0
+    first = None
+    start = time.perf_counter()
+    while True:
+        before = time.perf_counter()
+        data = source.read()
+        took = time.perf_counter() - before
+        reads.append(took)
+        if not data:
+            break
+        if first is None:
+            # BufferedSource memutar hening sampai frame pertama tersedia
+            if getattr(source, 'frames', 1):
+                first = time.perf_counter() - start
+        elif took > FRAME:
+            late_frames += 1
+            late += took - FRAME
+        loops += 1
+        next_time = start + FRAME * loops
+        delay = max(0, FRAME + (next_time - time.perf_counter()))
+        time.sleep(delay)
+    source.cleanup()
+    result.append((first or 0.0, late_frames, late, reads))
+
+
+def run(base_url, scenario, depth_ms, streams):
+    audiobuffer.guild_stats.clear()
+    results = []
+    threads = []
+    for i in range(streams):
+        source = HTTPOggSource(f"{base_url}/{scenario}/{i}")
+        if depth_ms:
+            source = audiobuffer.buffered(source, guild_id=i, buffer_ms=depth_ms)
+        thread = threading.Thread(target=play, args=(source, results))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    # Underrun buffer terdengar sebagai frame hening, bukan frame terlambat
+    totals = audiobuffer.totals()
+    first_ms = sum(r[0] for r in results) * 1000
+    events = sum(r[1] for r in results) + totals['underruns']
+    gap_ms = (sum(r[2] for r in results) + totals['silence'] * FRAME) * 1000
+    reads = sorted(t for r in results for t in r[3])
+    return (first_ms / streams, events / streams, gap_ms / streams,
+            reads[int(len(reads) * 0.99)] * 1e6)
+
+
+def main(streams, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stream.ogg')
+        write_ogg(path, seconds)
+        ThrottledHandler.path_file = path
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ThrottledHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"{streams} stream x {seconds:g}s audio, nilai rata-rata per stream")
+        print(f"  {'skenario':<10} {'buffer':>8} {'mulai (ms)':>11} {'patah':>7} "
+              f"{'celah (ms)':>11} {'baca p99 (us)':>14}")
+        for scenario in SCENARIOS:
+            for depth_ms in DEPTHS_MS:
+                first_ms, events, gap_ms, p99 = run(base_url, scenario, depth_ms, streams)
+                label = f"{depth_ms} ms" if depth_ms else "langsung"
+                print(f"  {scenario:<10} {label:>8} {first_ms:>11.0f} {events:>7.1f} "
+                      f"{gap_ms:>11.0f} {p99:>14.0f}")
+        server.shutdown()
+
+    # Biaya read() saat buffer selalu terisi (tanpa jaringan)
+    frames = 200000
+    source = audiobuffer.buffered(MemorySource(frames), guild_id='mem', buffer_ms=1000)
+    time.sleep(0.1)
+    started = time.perf_counter()
+    count = 0
+    while source.read():
+        count += 1
+    elapsed = time.perf_counter() - started
+    source.cleanup()
+    print(f"read() dari buffer terisi: {elapsed / count * 1e6:.2f} us/frame "
+          f"(termasuk thread pembaca di CPU yang sama)")
+
+
+class MemorySource(discord.AudioSource):
+    def __init__(self, frames):
+        self.remaining = frames
+        self.packet = bytes(PACKET_SIZE)
+
+    def read(self):
+        if self.remaining <= 0:
+            return b''
+        self.remaining -= 1
+        return self.packet
+
+    def is_opus(self):
+        return True
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 15)
@@ -0,0 +1,250 @@
+"""Pemeriksaan dan benchmark penggabungan lookup identik (utils.coalesce)
+
+N permintaan bersamaan untuk query yang sama dijalankan lewat SingleFlight
+terhadap extractor palsu yang lambat. Setiap skenario memeriksa (assert)
+jumlah ekstraksi yang benar-benar jalan, counter `unique`/`coalesced` dan
+hasil yang diterima tiap pemanggil:
+
+  sama        N query identik -> satu ekstraksi, semua dapat hasil yang sama
+  berbeda     N query berbeda -> N ekstraksi, tidak ada yang digabung
+  gagal       exception ekstraksi dibagikan ke semua pemanggil
+  batal       ekstraksi bersama dibatalkan pemiliknya (ExtractionCancelled);
+              penunggu mengulang dengan ekstraksi miliknya sendiri
+  pergi       penunggu yang dibatalkan tidak menghentikan ekstraksi
+  guild       cancel() untuk satu guild hanya melepas penunggu guild itu
+  semua       semua penunggu dilepas -> ekstraksi dibatalkan, permintaan
+              baru memulai ekstraksi sendiri
+  player      GuildPlayer yang ekstraksinya dilepas membuang track tanpa
+              pesan gagal; player guild lain tetap memutarnya
+
+Di akhir dibandingkan waktu N lookup identik dengan dan tanpa penggabungan,
+dengan ekstraksi dibatasi MAX_CONCURRENT sekaligus seperti penjadwal
+ekstraksi default (2 worker x 2).
+
+    python benchmarks/bench_coalesce.py [jumlah_permintaan] [ekstraksi_ms]
+"""
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.backend import FakeBackend, FakeResolved, FakeSource  # noqa: E402
+from utils.coalesce import SingleFlight  # noqa: E402
+from utils.extractor import ExtractionCancelled  # noqa: E402
+from utils.player import GuildPlayer, Track  # noqa: E402
+
+MAX_CONCURRENT = 4
+
+
+class SlowExtractor:
+    """Extractor palsu: setiap panggilan tidur `delay` detik lalu menjawab,
+    paling banyak `limit` sekaligus"""
+
+    def __init__(self, delay, limit=MAX_CONCURRENT):
+        self.delay = delay
+        self.limit = asyncio.Semaphore(limit)
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+
+    def func(self, query, outcome='ok'):
+        async def extract():
+            self.calls += 1
+            async with self.limit:
+                self.running += 1
+                self.peak = max(self.peak, self.running)
+                try:
+                    await asyncio.sleep(self.delay)
+                finally:
+                    self.running -= 1
+            if outcome == 'cancel':
+                raise ExtractionCancelled(f"Ekstraksi dibatalkan: {query}")
+            if outcome == 'error':
+                raise ValueError(f"Tidak ada hasil untuk: {query}")
+            return {'title': query, 'extraction': self.calls}
+        return extract
+
+
+async def gather(flight, calls):
+    return await asyncio.gather(*(flight.do(key, func) for key, func in calls),
+                                return_exceptions=True)
+
+
+async def scenario_same(count, delay):
+    flight, extractor = SingleFlight(), SlowExtractor(delay)
+    results = await gather(flight, [('lagu', extractor.func('lagu'))] * count)
+    assert extractor.calls == 1, extractor.calls
+    assert flight.unique == 1 and flight.coalesced == count - 1, flight.stats()
+    assert all(result == {'title': 'lagu', 'extraction': 1} for result in results)
+    assert flight.stats()['inflight'] == 0
+    return extractor, flight
+
+
+async def scenario_distinct(count, delay):
+    flight, extractor = SingleFlight(), SlowExtractor(delay)
+    results = await gather(flight, [(f"lagu {i}", extractor.func(f"lagu {i}"))
+                                    for i in range(count)])
+    assert extractor.calls == count, extractor.calls
+    assert flight.unique == count and flight.coalesced == 0, flight.stats()
+    assert [result['title'] for result in results] == [f"lagu {i}" for i in range(count)]
+    return extractor, flight
+
+
+async def scenario_error(count, delay):
+    flight, extractor = SingleFlight(), SlowExtractor(delay)
+    results = await gather(flight, [('rusak', extractor.func('rusak', 'error'))] * count)
+    assert extractor.calls == 1, extractor.calls
+    assert flight.unique == 1 and flight.coalesced == count - 1, flight.stats()
+    assert all(isinstance(result, ValueError) for result in results)
+    return extractor, flight
+
+
+async def scenario_cancelled(count, delay):
+    """Pemilik ekstraksi pertama pergi; penunggu mengulang sendiri"""
+    flight, extractor = SingleFlight(), SlowExtractor(delay)
+    calls = [('lagu', extractor.func('lagu', 'cancel'))]
+    calls += [('lagu', extractor.func('lagu'))] * (count - 1)
+    results = await gather(flight, calls)
+    # Satu ekstraksi dibatalkan, lalu penunggu pertama yang mengulang
+    # menjalankan ekstraksinya sendiri dan sisanya menunggu ekstraksi itu
+    assert extractor.calls == 2, extractor.calls
+    assert flight.unique == 2, flight.stats()
+    assert flight.coalesced == (count - 1) + (count - 2), flight.stats()
+    assert isinstance(results[0], ExtractionCancelled)
+    assert all(result == {'title': 'lagu', 'extraction': 2} for result in results[1:])
+    assert flight.stats()['inflight'] == 0
+    return extractor, flight
+
+
+async def scenario_waiter_left(count, delay):
+    """Sebagian penunggu dibatalkan di tengah jalan; sisanya tetap dapat hasil"""
+    flight, extractor = SingleFlight(), SlowExtractor(delay)
+    tasks = [asyncio.ensure_future(flight.do('lagu', extractor.func('lagu')))
+             for _ in range(count)]
+    await asyncio.sleep(delay / 2)
+    for task in tasks[:count // 2]:
+        task.cancel()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert extractor.calls == 1, extractor.calls
+    assert flight.unique == 1 and flight.coalesced == count - 1, flight.stats()
+    assert all(isinstance(result, asyncio.CancelledError) for result in results[:count // 2])
+    assert all(result == {'title': 'lagu', 'extraction': 1} for result in results[count // 2:])
+    return extractor, flight
+
+
+async def scenario_guild(count, delay):
+    """Penunggu guild 1 dilepas di tengah ekstraksi bersama dengan guild 2"""
+    flight, extractor = SingleFlight(), SlowExtractor(delay)
+    tasks = [asyncio.ensure_future(flight.do('lagu', extractor.func('lagu'), tag=(i % 2 + 1, i)))
+             for i in range(count)]
+    await asyncio.sleep(delay / 2)
+    released = flight.cancel(lambda tag: tag[0] == 1)
+    assert released == (count + 1) // 2, released
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert extractor.calls == 1, extractor.calls
+    assert all(isinstance(result, ExtractionCancelled) for result in results[0::2])
+    assert all(result == {'title': 'lagu', 'extraction': 1} for result in results[1::2])
+    assert flight.stats()['inflight'] == 0
+    return extractor, flight
+
+
+async def scenario_all_released(count, delay):
+    """Semua penunggu dilepas; ekstraksi yang tidak diinginkan lagi dibatalkan"""
+    flight, extractor = SingleFlight(), SlowExtractor(delay)
+    tasks = [asyncio.ensure_future(flight.do('lagu', extractor.func('lagu'), tag=(1, i)))
+             for i in range(count)]
+    await asyncio.sleep(delay / 2)
+    assert flight.cancel(lambda tag: tag[0] == 1) == count
+    # Permintaan baru tidak ikut menunggu ekstraksi yang sudah batal
+    fresh = await flight.do('lagu', extractor.func('lagu'), tag=(2, 0))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, ExtractionCancelled) for result in results)
+    assert extractor.calls == 2 and fresh == {'title': 'lagu', 'extraction': 2}
+    assert flight.unique == 2, flight.stats()
+    return extractor, flight
+
+
+async def scenario_player(count, delay):
+    """Dua guild memutar lagu yang sama; ekstraksi guild 1 dilepas"""
+    flight, extractor = SingleFlight(), SlowExtractor(delay)
+    backend = FakeBackend()
+    loop = asyncio.get_running_loop()
+    sent = {1: [], 2: []}
+
+    async def make_player(guild_id):
+        async def resolver(track):
+            data = await flight.do(track.query, extractor.func(track.query),
+                                   tag=(guild_id, None))
+            return FakeResolved(data['title'], FakeSource(data['title']))
+
+        async def send(message):
+            sent[guild_id].append(message)
+
+        guild = SimpleNamespace(id=guild_id)
+        voice = await backend.connect(SimpleNamespace(id=guild_id, name='musik', guild=guild))
+        channel = SimpleNamespace(guild=guild, send=send)
+        return GuildPlayer(guild_id, loop, resolver, voice), channel
+
+    players = {}
+    adds = []
+    for guild_id in (1, 2):
+        players[guild_id], channel = await make_player(guild_id)
+        adds.append(asyncio.ensure_future(players[guild_id].add(Track('lagu', channel=channel))))
+    await asyncio.sleep(delay / 2)
+    assert flight.cancel(lambda tag: tag[0] == 1) == 1
+    assert await asyncio.gather(*adds) == [False, True]
+    await asyncio.sleep(0)
+    assert extractor.calls == 1, extractor.calls
+    assert players[1].current is None and not players[1].queue and not sent[1], sent
+    assert players[2].current is not None and backend.voice_clients[2].source is not None
+    for player in players.values():
+        player.destroy()
+    return extractor, flight
+
+
+SCENARIOS = (
+    ('sama', scenario_same),
+    ('berbeda', scenario_distinct),
+    ('gagal', scenario_error),
+    ('batal', scenario_cancelled),
+    ('pergi', scenario_waiter_left),
+    ('guild', scenario_guild),
+    ('semua', scenario_all_released),
+    ('player', scenario_player),
+)
+
+
+async def uncoalesced(count, delay):
+    extractor = SlowExtractor(delay)
+    await asyncio.gather(*(extractor.func('lagu')() for _ in range(count)))
+    return extractor
+
+
+async def main(count, delay):
+    print(f"{count} permintaan bersamaan, ekstraksi palsu {delay * 1000:.0f} ms")
+    print(f"  {'skenario':<10} {'ekstraksi':>9} {'unique':>7} {'coalesced':>10} {'ms':>7}")
+    for name, scenario in SCENARIOS:
+        started = time.perf_counter()
+        extractor, flight = await scenario(count, delay)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"  {name:<10} {extractor.calls:>9} {flight.unique:>7} "
+              f"{flight.coalesced:>10} {elapsed:>7.0f}  ok")
+
+    # Tanpa penggabungan setiap permintaan menjalankan ekstraksinya sendiri
+    started = time.perf_counter()
+    extractor = await uncoalesced(count, delay)
+    plain = time.perf_counter() - started
+    started = time.perf_counter()
+    await scenario_same(count, delay)
+    shared = time.perf_counter() - started
+    print(f"\n  tanpa SingleFlight: {extractor.calls} ekstraksi ({extractor.peak} "
+          f"bersamaan), {plain * 1000:.0f} ms")
+    print(f"  dengan SingleFlight: 1 ekstraksi, {shared * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+                     float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.3))
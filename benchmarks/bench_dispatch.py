@@ -0,0 +1,147 @@
+"""Benchmark jalur cepat on_message (utils.dispatch)
+
+Membandingkan pesan/detik melalui `on_message` versi lama (cek author,
+`startswith('!')`, lalu `bot.process_commands` dengan get_context bawaan
+discord.py) dengan `bot.on_message` saat ini yang memakai CommandRouter.
+Ada tiga jenis lalu lintas: obrolan biasa (bukan perintah), perintah tanpa
+isi (`!bench`, callback kosong) dan campuran 2% perintah seperti guild
+sungguhan. Pembatas laju dimatikan supaya yang diukur hanya dispatch.
+
+Diperiksa juga (assert) bahwa router melihat perintah yang ditambah,
+dihapus, dan cog yang dimuat ulang setelah router dibuat.
+
+    python benchmarks/bench_dispatch.py [jumlah_pesan]
+"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHAT = ("wkwk iya bener", "ada yang mau main nanti malam?", "lagu ini enak banget",
+        "https://example.com/meme.png", "haha", "siapa yang online", "gg")
+
+
+def make_message(i, content, state=None):
+    return SimpleNamespace(
+        id=i,
+        _state=state,
+        attachments=[],
+        content=content,
+        author=SimpleNamespace(id=10000 + i % 500, bot=False, name=f"user{i % 500}"),
+        guild=SimpleNamespace(id=i % 1000),
+        channel=SimpleNamespace(id=5000 + i % 1000),
+    )
+
+
+def traffic(kind, count, rng, state=None):
+    messages = []
+    for i in range(count):
+        if kind == 'perintah' or (kind == 'campuran' and rng.random() < 0.02):
+            content = "!bench lagu favorit"
+        else:
+            content = rng.choice(CHAT)
+        messages.append(make_message(i, content, state))
+    return messages
+
+
+def old_on_message(bot, message_log, message_sampler):
+    """on_message versi lama, disalin dari bot.py sebelum jalur cepat"""
+    async def on_message(message):
+        if message.author.bot:
+            return
+        if message_log.isEnabledFor(logging.DEBUG) and message_sampler.allow():
+            message_log.debug("Pesan diterima", extra={
+                'content': message.content, 'author': str(message.author),
+                'guild': message.guild.id if message.guild else None, '_sampled': True})
+        if message.content.startswith('!'):
+            await bot.process_commands(message)
+    return on_message
+
+
+async def measure(handler, messages):
+    start = time.perf_counter()
+    for message in messages:
+        await handler(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def check_changes(bot, router):
+    """Perintah dan cog yang berubah setelah router dibuat langsung terlihat"""
+    from discord.ext import commands
+
+    def matched(content):
+        return router.match(make_message(0, content))[2]
+
+    class Echo(commands.Cog):
+        @commands.command(name="gema", aliases=["g"])
+        async def gema(self, ctx):
+            pass
+
+    assert matched("!gema") is None
+    asyncio.run(bot.add_cog(Echo()))
+    first = matched("!gema")
+    assert first is not None and matched("!g") is first
+    # Muat ulang cog: perintah lama diganti objek baru dengan nama yang sama
+    asyncio.run(bot.remove_cog("Echo"))
+    assert matched("!gema") is None and matched("!g") is None
+    asyncio.run(bot.add_cog(Echo()))
+    second = matched("!gema")
+    assert second is not None and second is not first
+    asyncio.run(bot.remove_cog("Echo"))
+
+    @bot.command(name="sementara")
+    async def sementara(ctx):
+        pass
+
+    assert matched("!sementara") is sementara
+    bot.remove_command("sementara")
+    assert matched("!sementara") is None
+
+
+def main(count):
+    from utils.log import setup_logging
+    setup_logging(stream=open(os.devnull, 'w'))
+    import bot as bot_module
+    from utils.ratelimit import limiter
+
+    bot = bot_module.bot
+    limiter.enabled = False
+    bot._connection.user = SimpleNamespace(id=1)
+    calls = []
+
+    @bot.command(name="bench")
+    async def bench(ctx, *, query=None):
+        calls.append(query)
+
+    check_changes(bot, bot_module.router)
+    print("router melihat perintah dan cog yang berubah  ok")
+
+    old = old_on_message(bot, bot_module.message_log, bot_module.message_sampler)
+    router_prefix = bot.command_prefix
+    rng = random.Random(1)
+    print(f"{count} pesan per jenis lalu lintas")
+    print(f"  {'jenis':<10} {'lama (pesan/s)':>15} {'baru (pesan/s)':>15} {'rasio':>7}")
+    for kind in ('obrolan', 'perintah', 'campuran'):
+        messages = traffic(kind, count, rng, bot._connection)
+        bot.command_prefix = "!"
+        before = asyncio.run(measure(old, messages))
+        bot.command_prefix = router_prefix
+        after = asyncio.run(measure(bot_module.on_message, messages))
+        print(f"  {kind:<10} {before:>15,.0f} {after:>15,.0f} {after / before:>6.1f}x")
+
+    # Channel yang dimatikan ditolak sebelum Context dibuat
+    router = bot_module.router
+    for guild_id in range(1000):
+        router.disable(guild_id, 5000 + guild_id)
+    messages = traffic('perintah', count, rng, bot._connection)
+    disabled = asyncio.run(measure(bot_module.on_message, messages))
+    print(f"  perintah di channel yang dimatikan: {disabled:,.0f} pesan/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
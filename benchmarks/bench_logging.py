@@ -0,0 +1,109 @@
+"""Benchmark overhead logging di on_message
+
+Membandingkan biaya per pesan non-perintah di event loop antara versi lama
+(dua `print` sinkron per pesan) dan `bot.on_message` saat ini yang memakai
+logging terstruktur lewat thread listener. Output diarahkan ke pipe yang
+dibaca thread lain supaya mirip dengan stdout yang diteruskan ke log host.
+
+Sebelumnya diperiksa (assert) sampling per kategori: record INFO di atas
+batas per detik dibuang dan dihitung, WARNING/ERROR selalu lolos.
+
+    python benchmarks/bench_logging.py [jumlah_pesan]
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_pipe_stdout():
+    """Ganti stdout dengan pipe yang dikuras oleh thread lain"""
+    read_fd, write_fd = os.pipe()
+
+    def drain():
+        while os.read(read_fd, 65536):
+            pass
+
+    threading.Thread(target=drain, daemon=True).start()
+    return os.fdopen(write_fd, 'w', buffering=1)
+
+
+def make_message(i):
+    author = SimpleNamespace(bot=False, name=f"user{i % 500}")
+    return SimpleNamespace(
+        content=f"pesan biasa nomor {i} tentang lagu hari ini",
+        author=author,
+        guild=SimpleNamespace(id=i % 1000),
+    )
+
+
+async def old_on_message(message):
+    """on_message versi lama, disalin dari bot.py sebelum logging diganti"""
+    if message.author.bot:
+        return
+    print(f"Pesan diterima: {message.content} dari {message.author}")
+    if message.content.startswith('!'):
+        print(f"Mencoba menjalankan perintah: {message.content}")
+
+
+async def measure(handler, messages):
+    start = time.perf_counter()
+    for message in messages:
+        await handler(message)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def check_sampling(rate=5, count=200):
+    from utils.log import RateLimitFilter
+
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger('bench.sampling')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    logger.addFilter(RateLimitFilter(rate))
+    for i in range(count):
+        logger.info("ramai %d", i)
+        logger.warning("peringatan %d", i)
+        logger.error("gagal %d", i)
+    kept = [r for r in records if r.levelno == logging.INFO]
+    assert sum(r.levelno == logging.WARNING for r in records) == count
+    assert sum(r.levelno == logging.ERROR for r in records) == count
+    # Waktu berjalan sedikit selama loop, jadi bisa ada satu token tambahan
+    assert rate <= len(kept) <= rate + 1, len(kept)
+    suppressed = sum(getattr(r, 'suppressed', 0) for r in records)
+    assert len(kept) + suppressed == count, suppressed
+    print(f"sampling {rate}/detik: {len(kept)} dari {count} INFO lolos, "
+          f"semua {2 * count} WARNING/ERROR lolos  ok")
+
+
+def main(count):
+    check_sampling()
+    pipe = make_pipe_stdout()
+    real_stdout = sys.stdout
+    sys.stdout = pipe
+    try:
+        from utils.log import setup_logging
+        setup_logging(stream=pipe)
+        import bot
+
+        messages = [make_message(i) for i in range(count)]
+        before = asyncio.run(measure(old_on_message, messages))
+        after = asyncio.run(measure(bot.on_message, messages))
+    finally:
+        sys.stdout = real_stdout
+
+    print(f"{count} pesan non-perintah")
+    print(f"  sebelum (print):        {before:7.2f} us/pesan")
+    print(f"  sesudah (logging/queue): {after:7.2f} us/pesan")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,108 @@
+"""Benchmark memori cache gateway per profil
+
+Membuat payload GUILD_CREATE sintetis (guild dengan channel, member,
+presence dan voice state) lalu memasukkannya ke ConnectionState discord.py
+untuk profil "full" dan "lean", ditambah sejumlah MESSAGE_CREATE. Seperti
+gateway asli, member dan presence hanya dikirim jika intent-nya aktif.
+Memori diukur dengan tracemalloc.
+
+    python benchmarks/bench_memory.py [guild] [member_per_guild] [pesan]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discord.ext import commands
+
+from utils.gateway import bot_options
+
+
+def guild_payload(guild_id, members, intents):
+    channel_id = guild_id * 10
+    voice_id = guild_id * 10 + 1
+    users = [{'id': str(guild_id * 100000 + i), 'username': f'user{i}',
+              'discriminator': '0', 'avatar': None, 'global_name': f'User {i}'}
+             for i in range(members)]
+    # Beberapa member sedang berada di voice
+    in_voice = users[:3]
+    data = {
+        'id': str(guild_id), 'name': f'Guild {guild_id}', 'owner_id': users[0]['id'],
+        'member_count': members, 'roles': [], 'emojis': [], 'stickers': [],
+        'features': [], 'large': members >= 250,
+        'channels': [
+            {'id': str(channel_id), 'type': 0, 'name': 'umum', 'position': 0,
+             'permission_overwrites': []},
+            {'id': str(voice_id), 'type': 2, 'name': 'Musik', 'position': 1,
+             'permission_overwrites': [], 'bitrate': 64000, 'user_limit': 0},
+        ],
+        'voice_states': [
+            {'user_id': u['id'], 'channel_id': str(voice_id), 'session_id': 'x',
+             'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False,
+             'suppress': False, 'request_to_speak_timestamp': None}
+            for u in in_voice
+        ],
+        'threads': [],
+        'stage_instances': [],
+        'guild_scheduled_events': [],
+    }
+    # Gateway hanya mengirim daftar member lengkap/presence jika intent aktif
+    member_users = users if intents.members else in_voice
+    data['members'] = [{'user': u, 'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00',
+                        'deaf': False, 'mute': False, 'flags': 0} for u in member_users]
+    data['presences'] = [{'user': {'id': u['id']}, 'status': 'online', 'activities': [],
+                          'client_status': {'desktop': 'online'}}
+                         for u in users] if intents.presences else []
+    return data
+
+
+def message_payload(i, guild_id):
+    return {
+        'id': str(10 ** 12 + i), 'channel_id': str(guild_id * 10), 'guild_id': str(guild_id),
+        'author': {'id': str(guild_id * 100000 + 1), 'username': 'user1',
+                   'discriminator': '0', 'avatar': None},
+        'content': f'pesan nomor {i}', 'timestamp': '2024-01-01T00:00:00+00:00',
+        'edited_timestamp': None, 'tts': False, 'mention_everyone': False,
+        'mentions': [], 'mention_roles': [], 'attachments': [], 'embeds': [],
+        'pinned': False, 'type': 0,
+    }
+
+
+def measure(profile, guilds, members, messages):
+    gc.collect()
+    tracemalloc.start()
+    bot = commands.Bot(command_prefix="!", **bot_options(profile))
+    state = bot._connection
+    # Jangan menunggu READY, chunking lewat jaringan atau dispatch event
+    state._ready_state = None
+    state._chunk_guilds = False
+    state.dispatch = lambda *args, **kwargs: None
+    before = tracemalloc.get_traced_memory()[0]
+
+    for g in range(1, guilds + 1):
+        state._add_guild_from_data(guild_payload(g, members, state._intents))
+    for i in range(messages):
+        state.parse_message_create(message_payload(i, i % guilds + 1))
+
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    cached_members = sum(len(g._members) for g in state._guilds.values())
+    cached_messages = len(state._messages) if state._messages is not None else 0
+    tracemalloc.stop()
+    return used, cached_members, cached_messages
+
+
+def main(guilds, members, messages):
+    print(f"{guilds} guild x {members} member, {messages} pesan")
+    for profile in ('full', 'lean'):
+        used, cached_members, cached_messages = measure(profile, guilds, members, messages)
+        print(f"  {profile:<5} {used / 2**20:8.1f} MiB   member di cache: {cached_members:<8}"
+              f" pesan di cache: {cached_messages}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    defaults = [500, 200, 5000]
+    main(*(args + defaults[len(args):]))
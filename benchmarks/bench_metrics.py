@@ -0,0 +1,199 @@
+"""Pemeriksaan metrik Prometheus (utils.metrics dan /metrics di main.py)
+
+Diperiksa (assert):
+
+  format      counter, gauge (termasuk gauge dengan func) dan histogram
+              dirender dalam format teks Prometheus: bucket kumulatif sampai
+              +Inf, _sum/_count, label di-escape; label yang salah dan nama
+              ganda ditolak
+  perintah    hook before/after_invoke dari instrument_bot mencatat latensi
+              per perintah dengan outcome ok/error
+  play        `!play` dengan FakeBackend mencatat time-to-first-audio, tahap
+              connect/extract dan latensi koneksi voice
+  ekstraksi   YTDLSource.extract mencatat outcome ok/error/cancelled
+  player      error dari callback after player dihitung per jenis
+  endpoint    /metrics menjawab text/plain berisi semua metrik di atas
+
+Di akhir diukur waktu render /metrics.
+
+    python benchmarks/bench_metrics.py [jumlah_render]
+"""
+import asyncio
+import contextlib
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+os.environ.setdefault('LOG_LEVELS', 'bot.command=CRITICAL,discord=CRITICAL')
+
+import discord  # noqa: E402
+from aiohttp.test_utils import make_mocked_request  # noqa: E402
+from discord.ext import commands  # noqa: E402
+
+import main  # noqa: E402
+import music_commands  # noqa: E402
+from utils import metrics, ytdl  # noqa: E402
+from utils.backend import FakeBackend  # noqa: E402
+from utils.extractor import ExtractionCancelled, ExtractionError  # noqa: E402
+from utils.player import GuildPlayer, players  # noqa: E402
+from utils.ytdl import YTDLSource  # noqa: E402
+
+
+def check_format():
+    registry = metrics.Registry()
+    hits = registry.register(metrics.Counter('hits_total', 'Jumlah hit', ('path',)))
+    depth = registry.register(metrics.Gauge('queue_depth', 'Kedalaman antrian'))
+    sizes = registry.register(metrics.Gauge('cache', 'Statistik cache', ('stat',),
+                                            func=lambda: {'size': 3, 'hits': 7}))
+    latency = registry.register(metrics.Histogram('latency_seconds', 'Latensi', ('op',),
+                                                  buckets=(0.1, 1)))
+    hits.inc(path='/a"b\n')
+    hits.inc(2, path='/a"b\n')
+    depth.set(5)
+    depth.dec()
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, op='baca')
+    assert hits.value(path='/a"b\n') == 3 and latency.count(op='baca') == 4
+
+    lines = registry.render().splitlines()
+    assert lines[:3] == ['# HELP hits_total Jumlah hit', '# TYPE hits_total counter',
+                         'hits_total{path="/a\\"b\\n"} 3'], lines[:3]
+    for line in ('queue_depth 4', 'cache{stat="hits"} 7', 'cache{stat="size"} 3',
+                 '# TYPE latency_seconds histogram',
+                 'latency_seconds_bucket{op="baca",le="0.1"} 2',
+                 'latency_seconds_bucket{op="baca",le="1"} 3',
+                 'latency_seconds_bucket{op="baca",le="+Inf"} 4',
+                 'latency_seconds_sum{op="baca"} 3.65',
+                 'latency_seconds_count{op="baca"} 4'):
+        assert line in lines, (line, lines)
+    assert sizes.kind == 'gauge'
+
+    for bad in (lambda: hits.inc(), lambda: hits.inc(path='/', method='GET'),
+                lambda: registry.register(metrics.Counter('hits_total', 'lagi'))):
+        try:
+            bad()
+        except ValueError:
+            continue
+        raise AssertionError("label atau nama yang salah diterima")
+
+
+async def check_commands():
+    bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+    metrics.instrument_bot(bot)
+    for name, failed in (('bench_ok', False), ('bench_gagal', True)):
+        ctx = SimpleNamespace(command=SimpleNamespace(qualified_name=name), command_failed=failed)
+        await bot._before_invoke(ctx)
+        await asyncio.sleep(0.01)
+        await bot._after_invoke(ctx)
+    assert metrics.COMMAND_LATENCY.count(command='bench_ok', outcome='ok') == 1
+    assert metrics.COMMAND_LATENCY.count(command='bench_gagal', outcome='error') == 1
+    counts, total, count = metrics.COMMAND_LATENCY._values[('bench_ok', 'ok')]
+    assert total >= 0.01 and sum(counts) == count == 1
+    # Perintah yang gagal sebelum before_invoke tidak dicatat
+    await bot._after_invoke(SimpleNamespace(command=None, command_failed=True))
+
+
+def make_ctx():
+    async def send(message, **kwargs):
+        pass
+
+    guild = SimpleNamespace(id=7)
+    listener = SimpleNamespace(id=2, bot=False)
+    channel = SimpleNamespace(id=70, guild=guild, members=[listener])
+    author = SimpleNamespace(id=2, bot=False, voice=SimpleNamespace(channel=channel))
+    return SimpleNamespace(guild=guild, channel=channel, author=author, send=send,
+                           typing=contextlib.nullcontext)
+
+
+async def check_play():
+    players.clear()
+    first_audio = metrics.TIME_TO_FIRST_AUDIO.count()
+    connects = metrics.VOICE_CONNECT_LATENCY.count(outcome='ok')
+    backend = FakeBackend(connect_delay=0.01, resolve_delay=0.02)
+    cog = music_commands.Music(None, backend)
+    ctx = make_ctx()
+    await cog.play.callback(cog, ctx, query="lagu pertama")
+    await cog.play.callback(cog, ctx, query="lagu kedua")
+    # Hanya play yang langsung memutar audio yang dihitung
+    assert metrics.TIME_TO_FIRST_AUDIO.count() == first_audio + 1
+    assert metrics.VOICE_CONNECT_LATENCY.count(outcome='ok') == connects + 1
+    for stage in ('connect', 'extract', 'total'):
+        assert metrics.PLAY_STAGE_LATENCY.count(stage=stage) >= 1, stage
+    total = metrics.TIME_TO_FIRST_AUDIO._values[()][1]
+    assert total >= 0.02, total
+    await cog.cog_unload()
+
+
+class FakeScheduler:
+    async def run(self, query, options, *, guild_id=None, owner=None, shared=False):
+        if query == 'batal':
+            raise ExtractionCancelled(query)
+        if query == 'rusak':
+            raise ExtractionError("Video unavailable")
+        if query == 'kosong':
+            return None
+        return {'entries': [{'title': query, 'url': 'https://stream.example/1'}]}
+
+
+async def check_extract():
+    ytdl.scheduler = FakeScheduler()
+    before = {outcome: metrics.EXTRACT_LATENCY.count(outcome=outcome)
+              for outcome in ('ok', 'error', 'cancelled')}
+    assert (await YTDLSource.extract('lagu'))['title'] == 'lagu'
+    for query, error in (('batal', ExtractionCancelled), ('rusak', ExtractionError),
+                         ('kosong', ValueError)):
+        try:
+            await YTDLSource.extract(query)
+        except error:
+            continue
+        raise AssertionError(f"{query} tidak gagal")
+    # Hasil kosong dicatat ok: yt-dlp selesai, hanya tidak ada entrinya
+    assert metrics.EXTRACT_LATENCY.count(outcome='ok') == before['ok'] + 2
+    assert metrics.EXTRACT_LATENCY.count(outcome='error') == before['error'] + 1
+    assert metrics.EXTRACT_LATENCY.count(outcome='cancelled') == before['cancelled'] + 1
+
+
+async def check_player_errors():
+    player = GuildPlayer(1, asyncio.get_running_loop(), None)
+    before = metrics.PLAYER_ERRORS.value(type='OSError')
+    player._after(OSError("ffmpeg keluar"))
+    player._after(None)
+    assert metrics.PLAYER_ERRORS.value(type='OSError') == before + 1
+    await asyncio.sleep(0)
+    player.destroy()
+
+
+async def check_endpoint():
+    response = await main.metrics_endpoint(make_mocked_request('GET', '/metrics'))
+    assert response.status == 200 and response.content_type == 'text/plain'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    for name in ('bot_command_duration_seconds_bucket', 'ytdl_extract_duration_seconds_count',
+                 'play_time_to_first_audio_seconds_sum', 'play_stage_duration_seconds_count',
+                 'voice_connect_duration_seconds_count', 'player_errors_total',
+                 'bot_voice_clients', 'player_queue_tracks', 'player_active'):
+        assert f"\n{name}" in response.text, name
+
+
+def render_time(count):
+    started = time.perf_counter()
+    for _ in range(count):
+        metrics.REGISTRY.render()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def run(count):
+    check_format()
+    print(f"{'format':<10} ok")
+    for name, check in (('perintah', check_commands), ('play', check_play),
+                        ('ekstraksi', check_extract), ('player', check_player_errors),
+                        ('endpoint', check_endpoint)):
+        asyncio.run(check())
+        print(f"{name:<10} ok")
+    print(f"render /metrics: {render_time(count):.1f} us")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
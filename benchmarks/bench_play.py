@@ -0,0 +1,125 @@
+"""Benchmark time-to-first-audio perintah !play
+
+Menjalankan perintah `play` dari cog musik dengan FakeBackend (delay koneksi
+voice dan ekstraksi acak log-normal) untuk guild yang belum tersambung ke
+voice, lalu membandingkan p50/p95 waktu sampai lagu mulai diputar antara
+jalur berurutan (PLAY_FAST_START=0) dan fast start.
+
+Sebelumnya diperiksa (assert) dua play bersamaan di guild yang belum
+tersambung: track yang kalah cepat masuk antrian tanpa source terbuka, baik
+jika lagu lain mulai diputar selama koneksi voice maupun selama ekstraksinya.
+
+    python benchmarks/bench_play.py [jumlah_play] [median_connect_ms] [median_extract_ms]
+"""
+import asyncio
+import contextlib
+import math
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('LOG_LEVELS', 'bot.command=WARNING,discord=ERROR')
+
+import music_commands
+from utils.backend import FakeBackend
+from utils.player import players
+
+
+def lognormal(median_ms):
+    return random.lognormvariate(math.log(median_ms / 1000), 0.5)
+
+
+def make_ctx(guild_id):
+    async def send(*args, **kwargs):
+        pass
+
+    guild = SimpleNamespace(id=guild_id)
+    channel = SimpleNamespace(id=guild_id, name='musik', guild=guild, members=[])
+    author = SimpleNamespace(id=guild_id, bot=False, voice=SimpleNamespace(channel=channel))
+    # Peminta ada di channel supaya sesi voice tidak dianggap menganggur
+    channel.members.append(author)
+    return SimpleNamespace(
+        guild=guild, channel=SimpleNamespace(send=send), send=send,
+        typing=contextlib.nullcontext, author=author)
+
+
+async def run(count, connect_ms, extract_ms, fast_start):
+    music_commands.FAST_START = fast_start
+    players.clear()
+    backend = FakeBackend(connect_delay=lambda: lognormal(connect_ms),
+                          resolve_delay=lambda: lognormal(extract_ms))
+    cog = music_commands.Music(None, backend)
+
+    async def one(i):
+        ctx = make_ctx(i)
+        started = time.perf_counter()
+        await cog.play.callback(cog, ctx, query=f"lagu {i}")
+        if backend.voice_client(ctx).source is not None:
+            return time.perf_counter() - started
+
+    results = await asyncio.gather(*(one(i) for i in range(count)))
+    for player in list(players.values()):
+        player.destroy()
+    return sorted(r for r in results if r is not None)
+
+
+async def race(connect_ms, extract_ms):
+    """Dua play bersamaan di satu guild; delay dalam ms, per play berurutan"""
+    music_commands.FAST_START = True
+    players.clear()
+    delays = iter(ms / 1000 for ms in extract_ms)
+    backend = FakeBackend(connect_delay=connect_ms / 1000, resolve_delay=lambda: next(delays, 10))
+    sources = []
+    resolve = backend.resolve
+
+    async def spy(track, **kwargs):
+        resolved = await resolve(track, **kwargs)
+        sources.append(resolved.source)
+        return resolved
+
+    backend.resolve = spy
+    cog = music_commands.Music(None, backend)
+    ctx = make_ctx(1)
+    await asyncio.gather(*(cog.play.callback(cog, ctx, query=f"lagu {i}") for i in range(2)))
+    player = players[1]
+    playing = backend.voice_client(ctx).source
+    assert playing is not None and not playing.closed
+    assert len(player.queue) == 1 and player.queue[0].resolved is None, player.queue
+    # Source lain yang sempat dibuka sudah ditutup, bukan menunggu di antrian
+    assert all(source.closed for source in sources if source is not playing), sources
+    player.destroy()
+    return player.queue
+
+
+def check_races():
+    # Lagu pertama mulai diputar sebelum ekstraksi kedua selesai (kedua dibatalkan)
+    asyncio.run(race(50, (10, 200)))
+    # Keduanya selesai selama koneksi voice; yang kedua ditutup setelah connect
+    asyncio.run(race(50, (1, 2)))
+    # Lagu kedua diputar lebih dulu selagi ekstraksi pertama masih berjalan
+    asyncio.run(race(10, (200, 50)))
+    print("  play bersamaan di satu guild: track yang kalah masuk antrian tanpa source  ok")
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main(count, connect_ms, extract_ms):
+    check_races()
+    random.seed(1)
+    print(f"{count} play, median connect {connect_ms}ms, median ekstraksi {extract_ms}ms")
+    for name, fast_start in (('berurutan', False), ('fast start', True)):
+        results = asyncio.run(run(count, connect_ms, extract_ms, fast_start))
+        print(f"  {name:<11} p50: {percentile(results, 0.5) * 1000:7.1f}ms  "
+              f"p95: {percentile(results, 0.95) * 1000:7.1f}ms  ({len(results)} diputar)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 400,
+         float(sys.argv[3]) if len(sys.argv) > 3 else 900)
@@ -0,0 +1,204 @@
+"""Pemeriksaan mesin antrian per guild (utils.player.GuildPlayer)
+
+GuildPlayer dijalankan dengan FakeVoiceClient dan resolver palsu yang
+mencatat setiap panggilan dan bisa ditahan per track. Diperiksa (assert):
+
+- lagu berikutnya sudah di-resolve (prefetch) selama lagu saat ini diputar,
+  jadi pergantian lagu tidak memanggil resolver lagi dan urutan antrian tetap
+- track yang gagal di-resolve dibuang dengan pesan, lalu lagu berikutnya diputar
+- source hasil prefetch ditutup dan prefetch yang berjalan dibatalkan jika
+  antrian dikosongkan
+- destroy membatalkan prefetch dan menutup semua source
+
+Di akhir dilaporkan rata-rata jeda antara akhir lagu dan mulainya lagu
+berikutnya untuk sejumlah lagu dengan resolve yang lambat.
+
+    python benchmarks/bench_player.py [jumlah_lagu] [resolve_ms]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.backend import FakeBackend, FakeResolved, FakeSource, FakeVoiceClient  # noqa: E402
+from utils.player import GuildPlayer, Track  # noqa: E402
+
+
+class Resolver:
+    """Resolver palsu; track di `held` menunggu sampai release(query)"""
+
+    def __init__(self, delay=0, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = []
+        self.sources = []
+        self.held = {}
+
+    def hold(self, query):
+        self.held[query] = asyncio.Event()
+
+    def release(self, query):
+        self.held.pop(query).set()
+
+    async def __call__(self, track):
+        self.calls.append(track.query)
+        if track.query in self.held:
+            await self.held[track.query].wait()
+        elif self.delay:
+            await asyncio.sleep(self.delay)
+        if track.query in self.fail:
+            raise RuntimeError("video tidak tersedia")
+        source = FakeSource(track.query)
+        self.sources.append(source)
+        return FakeResolved(track.query, source)
+
+
+def make_player(resolver):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    guild = SimpleNamespace(id=1)
+    channel = SimpleNamespace(guild=guild, send=send)
+    voice = FakeVoiceClient(FakeBackend(), channel)
+    player = GuildPlayer(guild.id, asyncio.get_running_loop(), resolver, voice)
+    return player, voice, channel, messages
+
+
+async def settle():
+    """Beri kesempatan callback dan task background berjalan"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def check_prefetch():
+    resolver = Resolver()
+    player, voice, channel, _ = make_player(resolver)
+    queries = [f"lagu {i}" for i in range(4)]
+    assert await player.add(Track(queries[0], channel=channel))
+    for query in queries[1:]:
+        assert not await player.add(Track(query, channel=channel))
+    await settle()
+    # Hanya kepala antrian yang di-prefetch, sisanya menunggu giliran
+    assert resolver.calls == queries[:2], resolver.calls
+    assert player.queue[0].resolved is not None and player.queue[1].resolved is None
+
+    played = []
+    while player.current is not None:
+        played.append(player.current.query)
+        calls = len(resolver.calls)
+        voice.stop()
+        await settle()
+        if player.current is not None:
+            # Lagu baru langsung diputar dari hasil prefetch
+            assert voice.source is player.current.resolved.source
+            assert len(resolver.calls) == min(calls + 1, len(queries)), resolver.calls
+    assert played == queries and resolver.calls == queries, (played, resolver.calls)
+    assert all(source.closed for source in resolver.sources)
+    player.destroy()
+
+
+async def check_failure():
+    resolver = Resolver(fail={'rusak'})
+    player, voice, channel, messages = make_player(resolver)
+    await player.add(Track('pertama', channel=channel))
+    await player.add(Track('rusak', channel=channel))
+    await player.add(Track('ketiga', channel=channel))
+    await settle()
+    voice.stop()
+    await settle()
+    assert player.current.query == 'ketiga', player.current.query
+    assert not player.queue
+    assert any('rusak' in message for message in messages), messages
+    player.destroy()
+
+
+async def check_clear():
+    resolver = Resolver()
+    player, voice, channel, _ = make_player(resolver)
+    await player.add(Track('pertama', channel=channel))
+    await player.add(Track('kedua', channel=channel))
+    await settle()
+    # Source hasil prefetch yang sudah terbuka ditutup
+    prefetched = player.queue[0].resolved.source
+    player.clear()
+    assert prefetched.closed and not player.queue
+
+    # Prefetch yang masih berjalan dibatalkan tanpa membuka source
+    resolver.hold('ketiga')
+    await player.add(Track('ketiga', channel=channel))
+    await settle()
+    prefetch = player._prefetch
+    assert prefetch is not None
+    player.clear()
+    await settle()
+    assert prefetch.cancelled() and player._prefetch is None
+    assert [source.title for source in resolver.sources] == ['pertama', 'kedua']
+    voice.stop()
+    await settle()
+    assert player.current is None and voice.source is None
+    player.destroy()
+
+
+async def check_destroy():
+    resolver = Resolver()
+    player, voice, channel, _ = make_player(resolver)
+    await player.add(Track('pertama', channel=channel))
+    await player.add(Track('kedua', channel=channel))
+    await settle()
+    resolver.hold('ketiga')
+    prefetched = player.queue[0].resolved.source
+    voice.stop()
+    await player.add(Track('ketiga', channel=channel))
+    await settle()
+    assert player._prefetch is not None
+    prefetch = player._prefetch
+    player.destroy()
+    await settle()
+    assert prefetch.cancelled() and player.current is None and not player.queue
+    assert not prefetched.closed  # sedang diputar; ditutup voice client saat berhenti
+    voice.stop()
+    assert prefetched.closed
+
+
+async def gaps(songs, delay):
+    """Rata-rata dan maksimum jeda (ms) antar lagu dengan resolve `delay` detik"""
+    resolver = Resolver(delay=delay)
+    player, voice, channel, _ = make_player(resolver)
+    for i in range(songs):
+        await player.add(Track(f"lagu {i}", channel=channel))
+    samples = []
+    while player.current is not None:
+        # Lagu diputar lebih lama dari resolve, jadi prefetch selalu sempat
+        await asyncio.sleep(delay * 1.5)
+        current = player.current
+        ended = time.perf_counter()
+        voice.stop()
+        # Akhir lagu diproses lewat call_soon_threadsafe, lalu _advance
+        while player.current is current or (
+                player.current is None and (player.queue or player._advancing)):
+            await asyncio.sleep(0)
+        if player.current is not None and player.current is not current:
+            samples.append((time.perf_counter() - ended) * 1000)
+    player.destroy()
+    return sum(samples) / len(samples), max(samples)
+
+
+def main(songs, resolve_ms):
+    for check in (check_prefetch, check_failure, check_clear, check_destroy):
+        asyncio.run(check())
+        print(f"{check.__name__:<16} ok")
+    average, worst = asyncio.run(gaps(songs, resolve_ms / 1000))
+    print(f"{songs} lagu, resolve {resolve_ms} ms: jeda antar lagu rata-rata "
+          f"{average:.3f} ms, maksimum {worst:.3f} ms")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.CRITICAL)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 50)
@@ -0,0 +1,153 @@
+"""Pemeriksaan pemuatan playlist bertahap (YTDLSource.iter_playlist, Music.ingest_playlist)
+
+Diperiksa (assert):
+
+  halaman     iter_playlist mengambil halaman pertama lalu sisanya dalam satu
+              ekstraksi flat, melewati entri kosong, berhenti jika halaman
+              pertama tidak penuh dan menghormati batas entri
+  bertahap    `!play` playlist langsung membalas; lagu pertama sudah diputar
+              sebelum halaman berikutnya selesai diambil
+  malas       dari ribuan entri hanya lagu saat ini dan satu prefetch yang
+              di-resolve; sisanya menunggu giliran
+  memori      memori per entri antrian tetap kecil (Track dengan __slots__)
+
+    python benchmarks/bench_playlist.py [jumlah_entri]
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import music_commands  # noqa: E402
+from utils import ytdl  # noqa: E402
+from utils.backend import FakeBackend  # noqa: E402
+from utils.player import players  # noqa: E402
+from utils.ytdl import PLAYLIST_PAGE_SIZE, YTDLSource  # noqa: E402
+
+PLAYLIST = 'https://www.youtube.com/playlist?list=PL1'
+# Batas memori per entri antrian (byte)
+MAX_ENTRY_BYTES = 1024
+
+
+class FakeScheduler:
+    """Pengganti ExtractionScheduler.run untuk playlist dengan `size` entri"""
+
+    def __init__(self, size, holes=()):
+        self.size = size
+        self.holes = set(holes)
+        self.calls = []
+
+    async def run(self, query, options, *, guild_id=None, owner=None, shared=False):
+        assert options.get('extract_flat') == 'in_playlist', options
+        start, end = map(int, options['playlist_items'].split('-'))
+        self.calls.append((start, end))
+        await asyncio.sleep(0)
+        return {'title': 'Playlist', 'entries': [
+            None if i in self.holes else
+            {'id': f"v{i}", 'url': f"https://youtu.be/v{i}", 'title': f"Lagu {i}",
+             'duration': 180}
+            for i in range(start, min(end, self.size) + 1)]}
+
+
+async def collect(size, limit, holes=()):
+    scheduler = FakeScheduler(size, holes)
+    ytdl.scheduler = scheduler
+    entries = [entry async for entry in YTDLSource.iter_playlist(PLAYLIST, limit=limit)]
+    return entries, scheduler.calls
+
+
+async def check_pages():
+    entries, calls = await collect(5000, 5000, holes={7})
+    assert calls == [(1, PLAYLIST_PAGE_SIZE), (PLAYLIST_PAGE_SIZE + 1, 5000)], calls
+    assert len(entries) == 4999 and entries[0] == \
+        {'url': 'https://youtu.be/v1', 'title': 'Lagu 1', 'duration': 180}, entries[0]
+    assert 'https://youtu.be/v7' not in {entry['url'] for entry in entries}
+
+    entries, calls = await collect(30, 5000)
+    assert calls == [(1, PLAYLIST_PAGE_SIZE)] and len(entries) == 30, calls
+    entries, calls = await collect(5000, 250)
+    assert calls[-1] == (PLAYLIST_PAGE_SIZE + 1, 250) and len(entries) == 250, calls
+
+
+class SlowPlaylistBackend(FakeBackend):
+    """Halaman pertama playlist langsung ada, sisanya menunggu `rest`"""
+
+    def __init__(self):
+        super().__init__()
+        self.rest = asyncio.Event()
+
+    async def iter_playlist(self, query, *, guild_id=None, owner=None):
+        count = int(query.split(':', 1)[1])
+        for i in range(count):
+            if i == PLAYLIST_PAGE_SIZE:
+                await self.rest.wait()
+            yield {'url': f"{query}/{i}", 'title': f"Entri {i}", 'duration': 180}
+
+
+def make_ctx(replies):
+    async def send(message, **kwargs):
+        replies.append(message)
+
+    guild = SimpleNamespace(id=1)
+    listener = SimpleNamespace(id=2, bot=False)
+    channel = SimpleNamespace(id=10, guild=guild, members=[listener])
+    author = SimpleNamespace(id=2, bot=False, voice=SimpleNamespace(channel=channel))
+    return SimpleNamespace(guild=guild, channel=channel, author=author, send=send,
+                           typing=contextlib.nullcontext)
+
+
+async def ingest(size):
+    """Putar playlist `size` entri; kembalikan (detik sampai lagu pertama, byte per entri)"""
+    players.clear()
+    backend = SlowPlaylistBackend()
+    cog = music_commands.Music(None, backend)
+    replies = []
+    ctx = make_ctx(replies)
+
+    started = time.perf_counter()
+    await cog.play.callback(cog, ctx, query=f"playlist:{size}")
+    assert replies == ["📃 Memuat playlist..."], replies
+    player = players[ctx.guild.id]
+    while player.current is None:
+        await asyncio.sleep(0)
+    first_audio = time.perf_counter() - started
+    assert player.current.query == f"playlist:{size}/0", player.current.query
+    assert len(player.queue) < PLAYLIST_PAGE_SIZE and not backend.rest.is_set()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    backend.rest.set()
+    while player._tasks:
+        await asyncio.sleep(0)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    assert replies[-1] == f"📃 {size} lagu dari playlist ditambahkan ke antrian", replies
+    assert [track.query for track in player.queue] == \
+        [f"playlist:{size}/{i}" for i in range(1, size)]
+    # Hanya lagu saat ini dan kepala antrian yang sudah di-resolve
+    assert backend.resolves == 2, backend.resolves
+    assert sum(track.resolved is not None for track in player.queue) == 1
+    per_entry = used / (size - PLAYLIST_PAGE_SIZE)
+    assert per_entry < MAX_ENTRY_BYTES, per_entry
+    await cog.cog_unload()
+    return first_audio, per_entry
+
+
+def main(size):
+    asyncio.run(check_pages())
+    print("halaman    ok")
+    first_audio, per_entry = asyncio.run(ingest(size))
+    print(f"playlist {size} entri: lagu pertama setelah {first_audio * 1000:.2f} ms, "
+          f"{per_entry:.0f} byte per entri antrian  ok")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,166 @@
+"""Simulasi burst perintah terhadap pembatas laju (utils.ratelimit)
+
+Setiap skenario membuat daftar perintah bertanda waktu (waktu virtual, jadi
+tidak perlu menunggu) dari beberapa kelas pengirim, lalu memutuskannya lewat
+CommandLimiter dengan batas default. Yang dilaporkan per kelas: perintah
+yang dikirim, diterima, ditolak per scope/shed dan jumlah balasan penolakan
+(dibatasi sekali per jendela per user atau per guild). Pengguna normal seharusnya hampir
+selalu diterima walaupun ada spammer atau raid. Di akhir diukur overhead
+satu keputusan dalam mikrodetik.
+
+Spam perintah yang tidak dikenal (`!asdf`) diperiksa (assert) lewat
+CommandLimiter.check_unknown: hanya sebagian kecil yang dibalas dan pengguna
+lain di guild yang sama tidak terpengaruh.
+
+    python benchmarks/bench_ratelimit.py [durasi_detik]
+"""
+import collections
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ratelimit import CommandLimiter, RateLimited  # noqa: E402
+
+# Campuran perintah pengguna biasa
+NORMAL_MIX = ('play', 'play', 'queue', 'now', 'skip', 'volume', 'pause', 'resume')
+
+
+def poisson(rng, rate, duration, start=0.0):
+    """Waktu kedatangan dengan laju `rate` per detik selama `duration` detik"""
+    t = start
+    while True:
+        t += rng.expovariate(rate)
+        if t >= start + duration:
+            return
+        yield t
+
+
+def normal_users(rng, events, guilds, users, rate, duration, first_guild=1000):
+    for guild in range(first_guild, first_guild + guilds):
+        for user in range(users):
+            user_id = guild * 1000 + user
+            for t in poisson(rng, rate, duration):
+                events.append((t, 'normal', rng.choice(NORMAL_MIX), user_id, guild))
+
+
+def scenario_spammer(rng, duration):
+    """Satu user spam !play 20/detik di guild yang juga dipakai pengguna biasa"""
+    events = []
+    for t in poisson(rng, 20, duration):
+        events.append((t, 'spammer', 'play', 1, 1))
+    for user in range(5):
+        for t in poisson(rng, 0.1, duration):
+            events.append((t, 'normal', rng.choice(NORMAL_MIX), 100 + user, 1))
+    normal_users(rng, events, guilds=50, users=3, rate=0.05, duration=duration)
+    return events
+
+
+def scenario_raid(rng, duration):
+    """200 akun raid di satu guild masing-masing mengirim !play 1/detik"""
+    events = []
+    for user in range(200):
+        for t in poisson(rng, 1, duration):
+            events.append((t, 'raid', 'play', 10000 + user, 2))
+    normal_users(rng, events, guilds=300, users=2, rate=0.05, duration=duration)
+    return events
+
+
+def scenario_global(rng, duration):
+    """Lonjakan di 2000 guild sekaligus selama 5 detik (mis. bot disebut streamer)"""
+    events = []
+    for guild in range(3000, 5000):
+        for t in poisson(rng, 0.5, 5, start=duration / 2):
+            events.append((t, 'lonjakan', 'play', guild * 1000, guild))
+    normal_users(rng, events, guilds=300, users=2, rate=0.05, duration=duration)
+    return events
+
+
+def scenario_shed(rng, duration):
+    """Pengguna biasa saat antrian ekstraksi penuh di paruh kedua durasi"""
+    events = []
+    normal_users(rng, events, guilds=300, users=2, rate=0.05, duration=duration)
+    return events
+
+
+def run(name, events, limiter, clock=None):
+    events.sort()
+    stats = collections.defaultdict(collections.Counter)
+    for t, cls, command, user_id, guild_id in events:
+        if clock is not None:
+            clock[0] = t
+        error = limiter.decide(command, user_id, guild_id, now=t)
+        row = stats[cls]
+        row['dikirim'] += 1
+        if error is None:
+            row['diterima'] += 1
+        else:
+            row[getattr(error, 'scope', 'shed')] += 1
+            row['balasan'] += error.notify
+    print(f"\n{name}")
+    print(f"  {'kelas':<9} {'dikirim':>8} {'diterima':>9} {'%':>6} {'user':>6} "
+          f"{'guild':>6} {'global':>7} {'shed':>6} {'balasan':>8}")
+    for cls, row in sorted(stats.items()):
+        share = row['diterima'] / row['dikirim'] * 100
+        print(f"  {cls:<9} {row['dikirim']:>8} {row['diterima']:>9} {share:>5.1f}% "
+              f"{row['user']:>6} {row['guild']:>6} {row['global']:>7} {row['shed']:>6} "
+              f"{row['balasan']:>8}")
+
+
+def unknown_spam(duration=10, rate=20):
+    """Satu user spam perintah tak dikenal; balasan = diterima + penolakan yang dibalas"""
+    limiter = CommandLimiter()
+    spammer = SimpleNamespace(author=SimpleNamespace(id=1), guild=SimpleNamespace(id=1))
+    replies = 0
+    sent = int(duration * rate)
+    for i in range(sent):
+        error = limiter.check_unknown(spammer, now=i / rate)
+        if error is None or error.notify:
+            replies += 1
+        if error is not None:
+            assert isinstance(error, RateLimited) and error.scope == 'user', error
+    # Burst user (15) + isi ulang 1/detik + paling banyak satu balasan penolakan per detik
+    user_rate, user_burst = limiter.limits['user']
+    assert replies <= user_burst + 2 * user_rate * duration + 1, replies
+    assert limiter.decide('play', 2, 1, now=duration) is None
+    assert limiter.check_unknown(SimpleNamespace(author=SimpleNamespace(id=3), guild=None)) is None
+    return sent, replies
+
+
+def overhead(count=200000):
+    """Rata-rata waktu satu keputusan yang diterima (mikrodetik), 10.000 user aktif"""
+    limiter = CommandLimiter(limits={'user': (1e6, 1e6), 'guild': (1e6, 1e6),
+                                     'global': (1e6, 1e6)})
+    limiter.watch('extract_backlog', lambda: 0, 50)
+    rng = random.Random(2)
+    calls = [(rng.choice(NORMAL_MIX), rng.randrange(10000), rng.randrange(1000))
+             for _ in range(count)]
+    start = time.perf_counter()
+    for command, user_id, guild_id in calls:
+        limiter.decide(command, user_id, guild_id)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main(duration):
+    rng = random.Random(1)
+    run("Spammer di satu guild", scenario_spammer(rng, duration), CommandLimiter())
+    run("Raid 200 akun di satu guild", scenario_raid(rng, duration), CommandLimiter())
+    run("Lonjakan di 2000 guild", scenario_global(rng, duration), CommandLimiter())
+
+    # Sinyal beban palsu: backlog ekstraksi melewati batas di paruh kedua
+    clock = [0.0]
+    limiter = CommandLimiter()
+    limiter.watch('extract_backlog', lambda: 80 if clock[0] > duration / 2 else 0, 50)
+    run("Antrian ekstraksi penuh (paruh kedua)", scenario_shed(rng, duration), limiter, clock)
+
+    sent, replies = unknown_spam()
+    print(f"\nSpam perintah tak dikenal: {sent} dikirim, {replies} dibalas  ok")
+
+    print(f"\nOverhead keputusan: {overhead():.2f} us/perintah")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 60)
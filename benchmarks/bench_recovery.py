@@ -0,0 +1,232 @@
+"""Benchmark pemulihan stream (utils.streamrecovery) dengan server yang rewel
+
+Server HTTP lokal menyajikan stream Ogg berisi paket "Opus" sintetis (20 ms
+per paket, nomor paket tertulis di 4 byte pertama) mulai dari posisi
+`start`, seperti FFmpeg dengan `-ss`. URL membawa parameter `expire` seperti
+URL stream YouTube; URL yang sudah kedaluwarsa ditolak (403). Skenario:
+
+  putus        koneksi ditutup setiap DROP_AFTER detik audio
+  kedaluwarsa  seperti putus, tapi URL hanya berlaku URL_LIFETIME detik
+               sehingga membuka ulang dengan URL lama ditolak
+  macet        server berhenti mengirim tanpa menutup koneksi
+               setiap DROP_AFTER detik audio
+
+Setiap stream dibaca lewat BufferedSource dan diputar dengan ritme
+AudioPlayer discord.py, tanpa pemulihan, dengan pemulihan yang baru
+me-refresh URL setelah buka ulang gagal (tanpa refresh), dan dengan
+pemulihan lengkap (URL di-refresh di background sebelum kedaluwarsa). Dari nomor paket yang diputar dihitung paket yang
+hilang dan terulang, plus hening (ms) setelah mulai, jumlah buka ulang,
+refresh URL dan respons 403.
+
+    python benchmarks/bench_recovery.py [jumlah_stream] [detik]
+"""
+import asyncio
+import http.client
+import logging
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord  # noqa: E402
+from discord.oggparse import OggStream  # noqa: E402
+
+from utils import audiobuffer  # noqa: E402
+from utils.streamrecovery import StreamRecovery  # noqa: E402
+
+FRAME = 0.02
+PACKET_SIZE = 200
+PAGE = 50
+RATE = 1.5
+DROP_AFTER = 7.0
+URL_LIFETIME = 4
+REFRESH_MARGIN = 2.0
+STALL_TIMEOUT = 1.0
+RESOLVE_DELAY = 0.2
+BUFFER_MS = 1000
+
+SCENARIOS = ('putus', 'kedaluwarsa', 'macet')
+MODES = ('tidak', 'tanpa refresh', 'ya')
+
+
+def page(index, count):
+    body = b''.join(struct.pack('<I', i).ljust(PACKET_SIZE, b'\0')
+                    for i in range(index, index + count))
+    header = struct.pack('<4sBBqIIIB', b'OggS', 0, 0, (index + count) * 960,
+                         1, index // PAGE, 0, count)
+    return header + bytes([PACKET_SIZE]) * count + body
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Stream /<skenario>/<id>?expire=..&start=..; `packets` total per lagu"""
+
+    packets = 0
+    forbidden = 0
+    stop = threading.Event()
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        scenario = parts.path.split('/')[1]
+        query = parse_qs(parts.query)
+        if int(query['expire'][0]) <= time.time():
+            FlakyHandler.forbidden += 1
+            self.send_error(403)
+            return
+        index = round(float(query.get('start', ['0'])[0]) / FRAME)
+        self.send_response(200)
+        self.end_headers()
+        limit = index + int(DROP_AFTER / FRAME)
+        started = time.perf_counter()
+        sent = 0
+        try:
+            while index < self.packets:
+                if index >= limit:
+                    if scenario == 'macet':
+                        # Koneksi dibiarkan terbuka tanpa data
+                        self.stop.wait(self.packets * FRAME)
+                    return
+                count = min(PAGE, self.packets - index)
+                self.wfile.write(page(index, count))
+                index += count
+                sent += count
+                # Detik pertama dikirim sekaligus, sisanya RATE x real-time
+                delay = started + (sent - PAGE) * FRAME / RATE - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPOggSource(discord.AudioSource):
+    """Paket Ogg dari HTTP; seperti proses FFmpeg, URL yang ditolak baru
+    terlihat sebagai stream kosong saat dibaca"""
+
+    def __init__(self, url, start=0.0):
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port)
+        self.conn.request('GET', f"{parts.path}?{parts.query}&start={start}")
+        self.sock = self.conn.sock
+        self.response = self.conn.getresponse()
+        if self.response.status == 200:
+            self._packets = OggStream(self.response).iter_packets()
+        else:
+            self._packets = iter(())
+
+    def read(self):
+        return next(self._packets, b'')
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        # shutdown membangunkan read() yang menunggu di thread lain; response
+        # tidak ditutup dari sini karena http.client tidak thread-safe
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def play(source, result):
+    """Putar source dengan ritme AudioPlayer._do_run, catat nomor paket"""
+    played = []
+    silence = 0
+    loops = 0
+    start = time.perf_counter()
+    while True:
+        data = source.read()
+        if not data:
+            break
+        if len(data) == PACKET_SIZE:
+            played.append(struct.unpack_from('<I', data)[0])
+        elif played:
+            silence += 1
+        loops += 1
+        time.sleep(max(0, start + FRAME * loops - time.perf_counter()))
+    source.cleanup()
+    result.append((played, silence))
+
+
+async def run(base_url, scenario, streams, mode):
+    audiobuffer.guild_stats.clear()
+    FlakyHandler.forbidden = 0
+    loop = asyncio.get_running_loop()
+
+    lifetime = URL_LIFETIME if scenario == 'kedaluwarsa' else 3600
+
+    def fresh_url(i):
+        return f"{base_url}/{scenario}/{i}?expire={int(time.time()) + lifetime}"
+
+    recoveries = []
+    results = []
+    threads = []
+    for i in range(streams):
+        data = {'url': fresh_url(i), 'duration': FlakyHandler.packets * FRAME}
+        recovery = None
+        if mode != 'tidak':
+            async def refresh(i=i):
+                await asyncio.sleep(RESOLVE_DELAY)
+                return {'url': fresh_url(i), 'duration': FlakyHandler.packets * FRAME}
+
+            recovery = StreamRecovery(
+                loop, data, lambda data, start: HTTPOggSource(data['url'], start or 0.0),
+                refresh, margin=REFRESH_MARGIN if mode == 'ya' else 0,
+                stall_timeout=STALL_TIMEOUT)
+            if mode == 'ya':
+                recovery.start()
+            recoveries.append(recovery)
+        source = audiobuffer.buffered(HTTPOggSource(data['url']), guild_id=i,
+                                      buffer_ms=BUFFER_MS, recovery=recovery)
+        thread = threading.Thread(target=play, args=(source, results))
+        thread.start()
+        threads.append(thread)
+    while any(thread.is_alive() for thread in threads):
+        await asyncio.sleep(0.1)
+
+    missing = duplicates = silence = 0
+    for played, silent in results:
+        unique = set(played)
+        missing += FlakyHandler.packets - len(unique)
+        duplicates += len(played) - len(unique)
+        silence += silent
+    totals = audiobuffer.totals()
+    return (missing / streams, duplicates / streams, silence * FRAME * 1000 / streams,
+            totals['recoveries'] / streams, sum(r.refreshes for r in recoveries) / streams,
+            FlakyHandler.forbidden / streams)
+
+
+async def main(streams, seconds):
+    FlakyHandler.packets = int(seconds / FRAME)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"{streams} stream x {seconds:g}s audio ({FlakyHandler.packets} paket), "
+          f"rata-rata per stream")
+    print(f"  {'skenario':<12} {'pemulihan':>13} {'hilang':>7} {'ulang':>6} {'hening (ms)':>12} "
+          f"{'buka ulang':>11} {'refresh':>8} {'403':>5}")
+    for scenario in SCENARIOS:
+        for mode in MODES:
+            missing, duplicates, silence_ms, reopened, refreshes, forbidden = \
+                await run(base_url, scenario, streams, mode)
+            print(f"  {scenario:<12} {mode:>13} {missing:>7.0f} "
+                  f"{duplicates:>6.0f} {silence_ms:>12.0f} {reopened:>11.1f} "
+                  f"{refreshes:>8.1f} {forbidden:>5.1f}")
+    FlakyHandler.stop.set()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 4,
+                     float(sys.argv[2]) if len(sys.argv) > 2 else 20))
@@ -0,0 +1,116 @@
+"""Pemeriksaan state player yang bertahan setelah restart (utils.playerstate)
+
+Cog musik dengan FakeBackend dan PlayerStore di file sementara memutar
+beberapa lagu di dua guild dan mengubah volumenya, lalu dihentikan seperti
+bot yang berhenti. Cog baru dengan store yang dibuka ulang memulihkan kedua
+guild lewat restore_player; di guild pertama channel teks tempat perintah
+dikirim sudah dihapus. Diperiksa (assert): lagu saat ini dilanjutkan dari
+posisi tersimpan dengan volume guild-nya, antrian utuh dan urut, dan setiap
+track tetap tahu guild-nya walaupun tanpa ctx dan channel teks.
+
+    python benchmarks/bench_restore.py [jumlah_lagu_per_guild]
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import music_commands  # noqa: E402
+from utils.backend import FakeBackend  # noqa: E402
+from utils.player import players  # noqa: E402
+from utils.playerstate import PlayerStore  # noqa: E402
+
+LISTENER = SimpleNamespace(id=99, bot=False, voice=None)
+VOLUMES = {1: 0.4, 2: 0.7}
+POSITION = 42.5
+
+
+async def send(*args, **kwargs):
+    pass
+
+
+def make_guild(guild_id, text_channel=True):
+    guild = SimpleNamespace(id=guild_id, unavailable=False)
+    voice = SimpleNamespace(id=guild_id * 10, name='musik', guild=guild, members=[LISTENER])
+    text = SimpleNamespace(id=guild_id * 10 + 1, guild=guild, send=send)
+    channels = {voice.id: voice}
+    if text_channel:
+        channels[text.id] = text
+    guild.get_channel = channels.get
+    return guild, voice, text
+
+
+def make_ctx(guild, voice, text):
+    author = SimpleNamespace(id=guild.id, bot=False, voice=SimpleNamespace(channel=voice))
+    return SimpleNamespace(guild=guild, channel=text, send=send, typing=contextlib.nullcontext,
+                           author=author)
+
+
+async def play_and_stop(path, songs):
+    """Putar `songs` lagu per guild, ubah volume, lalu hentikan cog"""
+    players.clear()
+    backend = FakeBackend()
+    cog = music_commands.Music(None, backend, store=PlayerStore(path))
+    for guild_id in VOLUMES:
+        ctx = make_ctx(*make_guild(guild_id))
+        for i in range(songs):
+            await cog.play.callback(cog, ctx, query=f"lagu {guild_id}-{i}")
+        players[guild_id].set_volume(VOLUMES[guild_id])
+        # Posisi lagu saat ini ketika checkpoint terakhir
+        backend.voice_client(ctx).source.position = POSITION
+    await cog.cog_unload()
+    assert not players
+
+
+async def restore(path, songs):
+    """Buka store lagi dan pulihkan kedua guild; guild 1 kehilangan channel teksnya"""
+    guilds = {1: make_guild(1, text_channel=False)[0], 2: make_guild(2)[0]}
+    backend = FakeBackend()
+    store = PlayerStore(path)
+    bot = SimpleNamespace(get_guild=guilds.get)
+    cog = music_commands.Music(bot, backend, store=store)
+    states = await asyncio.to_thread(store.load)
+    assert set(states) == set(VOLUMES), states
+
+    started = time.perf_counter()
+    for guild_id, state in states.items():
+        assert await cog.restore_player(guild_id, state)
+    elapsed = time.perf_counter() - started
+
+    for guild_id, guild in guilds.items():
+        player = players[guild_id]
+        voice = backend.voice_clients[guild_id]
+        source = voice.source
+        assert player.current is not None and source is not None, guild_id
+        assert player.current.query == f"lagu {guild_id}-0", player.current.query
+        assert player.current.start == POSITION, player.current.start
+        # resolve_track menemukan player lewat track.guild_id, jadi volume ikut
+        assert player.volume == VOLUMES[guild_id] and source.volume == VOLUMES[guild_id], \
+            (guild_id, source.volume)
+        assert [track.query for track in player.queue] == \
+            [f"lagu {guild_id}-{i}" for i in range(1, songs)]
+        for track in (player.current, *player.queue):
+            assert track.guild_id == guild_id and track.ctx is None
+            assert (track.channel is None) == (guild_id == 1)
+    await cog.cog_unload()
+    return elapsed
+
+
+def main(songs):
+    path = os.path.join(tempfile.mkdtemp(), 'player.sqlite3')
+    asyncio.run(play_and_stop(path, songs))
+    elapsed = asyncio.run(restore(path, songs))
+    print(f"{len(VOLUMES)} guild x {songs} lagu dipulihkan dalam {elapsed * 1000:.1f} ms")
+    print("  lagu, posisi, volume dan antrian utuh; track tanpa channel teks tetap "
+          "menemukan guild-nya  ok")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
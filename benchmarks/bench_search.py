@@ -0,0 +1,131 @@
+"""Benchmark indeks pencarian lokal (utils.searchindex) pada 1 juta lagu
+
+Mengisi indeks dengan judul sintetis (kosakata berdistribusi Zipf seperti
+judul sungguhan: sedikit kata sangat umum, banyak kata langka) lewat jalur
+`record()` yang sama dengan bot, lalu mengukur ukuran file dan latensi:
+
+  lookup query   query !play yang pernah di-resolve (tabel queries)
+  lookup judul   semua kata query ada di judul lagu yang pernah diputar
+  lookup miss    kata yang tidak ada di indeks (diteruskan ke yt-dlp)
+  lookup umum    satu kata yang sangat umum ("official", "music")
+  search 2/3/5   autocomplete: 2, 3 dan 5 huruf pertama sebuah kata
+  search 2 kata  autocomplete: kata lengkap + awal kata berikutnya
+
+    python benchmarks/bench_search.py [jumlah_lagu] [jumlah_query]
+
+File indeks yang sudah terisi dipakai ulang (BENCH_SEARCH_PATH, default di
+direktori temp) supaya pengukuran ulang tidak perlu mengisi dari awal.
+"""
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.searchindex import SearchIndex, normalize  # noqa: E402
+
+COMMON = ("official", "music", "video", "lyrics", "audio", "remix", "live", "feat", "cover")
+GUILDS = 1000
+
+
+def vocabulary(rng, size=60000):
+    syllables = [c + v for c in "bcdfghjklmnprstvwyz" for v in "aeiou"]
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_title(rng, words, weights):
+    title = rng.choices(words, cum_weights=weights, k=rng.randint(2, 6))
+    if rng.random() < 0.5:
+        title.append(rng.choice(COMMON))
+    return ' '.join(title).title()
+
+
+def fill(index, count, rng, words, weights):
+    started = time.perf_counter()
+    for i in range(count):
+        title = make_title(rng, words, weights)
+        data = {'title': title, 'webpage_url': f"https://www.youtube.com/watch?v=t{i:010d}",
+                'duration': rng.randint(90, 600)}
+        query = ' '.join(title.split()[:2]) if rng.random() < 0.3 else None
+        index.record(f"youtube:t{i:010d}", data, query=query, guild_id=rng.randrange(GUILDS))
+        if i % 10000 == 9999:
+            # Jangan menumpuk jutaan record di antrian penulis
+            index.flush(timeout=600)
+    index.flush(timeout=600)
+    return time.perf_counter() - started
+
+
+def measure(func, queries):
+    samples = []
+    hits = 0
+    for query in queries:
+        started = time.perf_counter()
+        result = func(query)
+        samples.append(time.perf_counter() - started)
+        hits += bool(result)
+    samples.sort()
+    return (statistics.median(samples), samples[int(len(samples) * 0.99) - 1],
+            samples[-1], hits / len(queries))
+
+
+def main(count, queries):
+    rng = random.Random(22)
+    words = vocabulary(rng)
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    path = os.getenv("BENCH_SEARCH_PATH") or os.path.join(
+        tempfile.gettempdir(), f"bench_search_{count}.db")
+    index = SearchIndex(path)
+    existing = index.stats()['tracks']
+    if existing != count:
+        if existing:
+            index.close()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            index = SearchIndex(path)
+        print(f"Mengisi {count:,} lagu ke {path} ...")
+        seconds = fill(index, count, rng, words, weights)
+        print(f"  {count / seconds:,.0f} lagu/detik ({seconds:.1f} detik)")
+    index._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size = os.path.getsize(path)
+    print(f"Ukuran indeks: {size / 2**20:,.1f} MiB ({size / count:.0f} byte/lagu)")
+
+    sample = [index._reader.execute("SELECT title FROM tracks WHERE id = ?",
+                                    (rng.randint(1, count),)).fetchone()[0]
+              for _ in range(queries)]
+    guild = lambda: rng.randrange(GUILDS)  # noqa: E731
+    first_two = [' '.join(t.split()[:2]) for t in sample]
+    partial = [normalize(t).split() for t in sample]
+    rare = [rng.choice(words[len(words) // 2:]) for _ in range(queries)]
+    cases = [
+        ("lookup query", lambda q: index.lookup(q, guild()), first_two),
+        ("lookup judul", lambda q: index.lookup(q, guild()),
+         [' '.join(rng.sample(t, min(2, len(t)))) for t in partial]),
+        ("lookup miss", lambda q: index.lookup(q, guild()),
+         [f"zzq{i} qqz{i}" for i in range(queries)]),
+        ("lookup umum", lambda q: index.lookup(q, guild()),
+         [rng.choice(COMMON) for _ in range(queries)]),
+        ("search 2 huruf", lambda q: index.search(q, guild()), [t[0][:2] for t in partial]),
+        ("search 3 huruf", lambda q: index.search(q, guild()), [t[0][:3] for t in partial]),
+        ("search 5 huruf", lambda q: index.search(q, guild()), [w[:5] for w in rare]),
+        ("search 2 kata", lambda q: index.search(q, guild()),
+         [f"{t[0]} {t[1][:3]}" for t in partial if len(t) > 1]),
+    ]
+    print(f"{queries} query per kasus, {count:,} lagu")
+    print(f"  {'kasus':<15} {'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9} {'hit':>6}")
+    for name, func, inputs in cases:
+        p50, p99, worst, hit = measure(func, inputs)
+        print(f"  {name:<15} {p50 * 1000:>9.2f} {p99 * 1000:>9.2f} {worst * 1000:>9.2f} {hit:>6.0%}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
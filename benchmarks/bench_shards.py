@@ -0,0 +1,185 @@
+"""Pemeriksaan supervisor shard (utils.shards) dengan gateway palsu
+
+1. main.py dijalankan sebagai supervisor dengan SHARD_WORKERS worker yang
+   memakai gateway palsu (FAKE_GATEWAY_GUILDS): worker tidak memuat bot dan
+   melaporkan guild sintetis. Satu worker dibunuh (SIGKILL); diperiksa
+   (assert) bahwa /shards dan /status kembali ke jumlah guild penuh, worker
+   itu punya pid baru dan restarts 1, dan worker lain tidak tersentuh.
+2. ControlClient terhadap socket yang belum ada lalu terus diputus:
+   klien harus tersambung lagi dan mengirim ulang status terakhir.
+3. ShardSupervisor yang gagal menjalankan satu worker (_spawn error):
+   worker itu dicoba lagi dengan backoff dan worker lain tetap berjalan.
+
+    python benchmarks/bench_shards.py [jumlah_worker] [guild_per_shard]
+"""
+import asyncio
+import http.client
+import json
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import shards  # noqa: E402
+
+SHARDS_PER_WORKER = 2
+TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_json(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+    try:
+        conn.request('GET', path)
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def wait_for(port, check):
+    """Poll /shards sampai `check(summary)` benar; kembalikan (detik, summary)"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < TIMEOUT:
+        try:
+            summary = get_json(port, '/shards')
+        except OSError:
+            summary = None
+        if summary and summary.get('workers') and check(summary):
+            return time.perf_counter() - started, summary
+        time.sleep(0.02)
+    raise AssertionError(f"/shards tidak memenuhi syarat dalam {TIMEOUT}s: {summary}")
+
+
+def supervisor_recovery(workers, guilds_per_shard):
+    port = free_port()
+    total = workers * SHARDS_PER_WORKER * guilds_per_shard
+    env = dict(os.environ, PORT=str(port), SHARD_WORKERS=str(workers),
+               SHARD_COUNT=str(workers * SHARDS_PER_WORKER),
+               FAKE_GATEWAY_GUILDS=str(guilds_per_shard),
+               CONTROL_SOCKET=os.path.join(tempfile.mkdtemp(), 'control.sock'))
+    env.pop('DISCORD_TOKEN', None)
+    process = subprocess.Popen([sys.executable, 'main.py'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready, summary = wait_for(port, lambda s: s['ready'] and s['guilds'] == total)
+        status = get_json(port, '/status')
+        assert status['status'] == 'online' and status['guilds'] == total, status
+
+        before = {w['worker']: w['pid'] for w in summary['workers']}
+        victim = workers // 2
+        os.kill(before[victim], signal.SIGKILL)
+        wait_for(port, lambda s: s['guilds'] < total)
+
+        def recovered(s):
+            worker = s['workers'][victim]
+            return s['ready'] and s['guilds'] == total and worker['pid'] != before[victim]
+
+        recovery, summary = wait_for(port, recovered)
+        for worker in summary['workers']:
+            if worker['worker'] == victim:
+                assert worker['restarts'] == 1, worker
+            else:
+                assert worker['pid'] == before[worker['worker']] and worker['restarts'] == 0, worker
+        status = get_json(port, '/status')
+        assert status['status'] == 'online' and status['guilds'] == total, status
+        return ready, recovery, total
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=15)
+
+
+async def client_reconnect():
+    """Server yang memutus setiap koneksi setelah satu laporan"""
+    path = os.path.join(tempfile.mkdtemp(), 'control.sock')
+    client = shards.ControlClient(path, 7)
+    client.report(ready=True, guilds=42)
+    task = asyncio.create_task(client.run())
+    received = []
+
+    async def handle(reader, writer):
+        line = await reader.readline()
+        if line:
+            received.append(json.loads(line))
+        writer.close()
+
+    # Supervisor belum ada saat worker mulai
+    await asyncio.sleep(0.3)
+    started = time.perf_counter()
+    server = await asyncio.start_unix_server(handle, path)
+    while len(received) < 3 and time.perf_counter() - started < TIMEOUT:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    server.close()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert len(received) >= 3, received
+    assert all(r['worker'] == 7 and r['guilds'] == 42 and r['ready'] for r in received)
+    assert client.connects >= 3, client.connects
+    return client.connects, elapsed
+
+
+class FlakySupervisor(shards.ShardSupervisor):
+    """Gagal menjalankan worker 0 sebanyak `failures` kali"""
+
+    failures = 2
+
+    async def _spawn(self, worker):
+        if worker.worker_id == 0 and self.failures:
+            self.failures -= 1
+            raise OSError("fork gagal (disimulasikan)")
+        await super()._spawn(worker)
+
+
+async def spawn_failure(guilds_per_shard):
+    shards.RESTART_BACKOFF_MIN = 0.05
+    os.environ['FAKE_GATEWAY_GUILDS'] = str(guilds_per_shard)
+    os.environ.pop('DISCORD_TOKEN', None)
+    path = os.path.join(tempfile.mkdtemp(), 'control.sock')
+    supervisor = FlakySupervisor(2, 2, shards.worker_command(), path)
+    stop = asyncio.Event()
+    task = asyncio.create_task(supervisor.run(stop))
+    started = time.perf_counter()
+    try:
+        while not (supervisor.ready and supervisor.guilds == 2 * guilds_per_shard):
+            assert not task.done(), task
+            assert time.perf_counter() - started < TIMEOUT, supervisor.summary()
+            await asyncio.sleep(0.02)
+        elapsed = time.perf_counter() - started
+        assert supervisor.workers[0].restarts == 2, supervisor.summary()
+        assert supervisor.workers[1].restarts == 0, supervisor.summary()
+    finally:
+        stop.set()
+        await task
+    return elapsed
+
+
+def main(workers, guilds_per_shard):
+    ready, recovery, total = supervisor_recovery(workers, guilds_per_shard)
+    print(f"supervisor {workers} worker x {SHARDS_PER_WORKER} shard, {total} guild palsu")
+    print(f"  semua worker ready            {ready * 1000:>7.0f} ms  ok")
+    print(f"  pulih setelah SIGKILL worker  {recovery * 1000:>7.0f} ms  ok")
+
+    connects, elapsed = asyncio.run(client_reconnect())
+    print(f"  ControlClient tersambung lagi {connects} kali dalam {elapsed * 1000:.0f} ms  ok")
+
+    elapsed = asyncio.run(spawn_failure(guilds_per_shard))
+    print(f"  _spawn gagal 2x lalu pulih    {elapsed * 1000:>7.0f} ms  ok")
+
+
+if __name__ == "__main__":
+    # Kegagalan yang disimulasikan sengaja dicatat sebagai error oleh supervisor
+    logging.basicConfig(level=logging.CRITICAL)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 25)
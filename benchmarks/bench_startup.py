@@ -0,0 +1,170 @@
+"""Benchmark cold start main.py: waktu sampai healthy, loaded dan yt-dlp siap
+
+1. Profil impor (-X importtime) per tahap startup: modul tingkat atas yang
+   diimpor sebelum server status jalan (healthy), saat bot dimuat (loaded)
+   dan saat yt-dlp disiapkan di worker (warm).
+2. Proses main.py sungguhan dijalankan berulang tanpa DISCORD_TOKEN (jadi
+   tidak ada koneksi keluar): waktu dari spawn sampai /health menjawab dan
+   sampai tahap `loaded`. Pembanding "eager" mengimpor bot dan discord.py
+   sebelum main.py seperti sebelum startup bertahap.
+3. Biaya yt-dlp di worker ekstraksi: impor, pembuatan YoutubeDL dan
+   pencocokan URL pertama, dengan semua extractor vs YTDL_EXTRACTORS.
+
+    python benchmarks/bench_startup.py [jumlah_run]
+"""
+import http.client
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SCRIPT = """
+import sys
+sys.stderr.write('-- healthy\\n')
+import main
+sys.stderr.write('-- loaded\\n')
+main.import_modules(main.BOT_MODULES)
+sys.stderr.write('-- warm\\n')
+import yt_dlp
+"""
+
+EAGER_SCRIPT = """
+import runpy, sys
+import bot, utils.audiobuffer, utils.ratelimit
+sys.argv = ['main.py']
+runpy.run_path('main.py', run_name='__main__')
+"""
+
+YTDL_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import yt_dlp
+imported = time.perf_counter()
+options = {'quiet': True, 'allowed_extractors': sys.argv[1].split(',')}
+ytdl = yt_dlp.YoutubeDL(options)
+created = time.perf_counter()
+matches = {}
+for url in sys.argv[2:]:
+    begin = time.perf_counter()
+    for ie in ytdl._ies.values():
+        if ie.suitable(url):
+            break
+    matches[url] = time.perf_counter() - begin
+print(json.dumps({'import': imported - started, 'init': created - imported,
+                  'extractors': len(ytdl._ies), 'match': matches}))
+"""
+
+URLS = ('https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'ytsearch1:never gonna give you up',
+        'https://soundcloud.com/artist/track', 'https://example.com/audio.mp3')
+
+
+def environment(**extra):
+    env = dict(os.environ, **extra)
+    env.pop('DISCORD_TOKEN', None)
+    return env
+
+
+def import_profile():
+    """Jumlah waktu impor modul tingkat atas per tahap (ms) dan yang terberat"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT],
+                            cwd=ROOT, env=environment(), capture_output=True, text=True)
+    stages = {'python': []}
+    current = 'python'
+    for line in result.stderr.splitlines():
+        if line.startswith('-- '):
+            current = line[3:]
+            stages[current] = []
+        elif line.startswith('import time:') and 'self [us]' not in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if not name.startswith('  '):
+                # Hanya modul tingkat atas; submodul sudah termasuk kumulatifnya
+                stages[current].append((int(cumulative) / 1000, name.strip()))
+    return stages
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_health(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+    try:
+        conn.request('GET', '/health')
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def cold_start(eager):
+    """(spawn->healthy, spawn->loaded, tahap dari /health) untuk satu proses"""
+    port = free_port()
+    argv = [sys.executable, '-c', EAGER_SCRIPT] if eager else [sys.executable, 'main.py']
+    started = time.perf_counter()
+    process = subprocess.Popen(argv, cwd=ROOT, env=environment(PORT=str(port)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    healthy = loaded = None
+    try:
+        while loaded is None:
+            try:
+                health = get_health(port)
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError("main.py berhenti sebelum healthy")
+                time.sleep(0.002)
+                continue
+            now = time.perf_counter() - started
+            healthy = healthy or now
+            if 'loaded' in health['stages']:
+                loaded = now
+            else:
+                time.sleep(0.002)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=10)
+    return healthy, loaded, health['stages']
+
+
+def ytdl_cost(extractors):
+    result = subprocess.run([sys.executable, '-c', YTDL_SCRIPT, extractors, *URLS],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main(runs):
+    print("Profil impor per tahap (-X importtime, ms kumulatif modul tingkat atas)")
+    for stage, modules in import_profile().items():
+        heaviest = ', '.join(f"{name} {ms:.0f}" for ms, name in sorted(modules, reverse=True)[:4])
+        print(f"  {stage:<8} {sum(ms for ms, _ in modules):>7.0f}  {heaviest}")
+
+    print(f"\nCold start main.py, median {runs} run (ms sejak spawn)")
+    print(f"  {'mode':<10} {'healthy':>8} {'loaded':>8}   tahap internal (sejak proses mulai)")
+    for eager in (True, False):
+        results = [cold_start(eager) for _ in range(runs)]
+        healthy = statistics.median(r[0] for r in results) * 1000
+        loaded = statistics.median(r[1] for r in results) * 1000
+        stages = results[len(results) // 2][2]
+        internal = ', '.join(f"{name} {seconds * 1000:.0f}" for name, seconds in stages.items())
+        print(f"  {'eager' if eager else 'bertahap':<10} {healthy:>8.0f} {loaded:>8.0f}   {internal}")
+
+    sys.path.insert(0, ROOT)
+    from utils.ytdl import YTDL_EXTRACTORS
+    print("\nyt-dlp di worker ekstraksi (ms)")
+    print(f"  {'extractor':<32} {'jumlah':>6} {'impor':>6} {'init':>6}  pencocokan URL pertama")
+    for extractors in ('default', ','.join(YTDL_EXTRACTORS)):
+        cost = ytdl_cost(extractors)
+        matches = ', '.join(f"{url.split('/')[2] if '//' in url else url.split(':')[0]} "
+                            f"{seconds * 1000:.1f}" for url, seconds in cost['match'].items())
+        print(f"  {extractors:<32} {cost['extractors']:>6} {cost['import'] * 1000:>6.0f} "
+              f"{cost['init'] * 1000:>6.0f}  {matches}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,42 @@
+"""Benchmark endpoint status
+
+Mengukur waktu per request handler `/`, `/status` dan `/uptime` (tanpa
+jaringan) untuk jumlah guild yang berbeda-beda. Latensi seharusnya tetap
+sama berapa pun jumlah guild karena respons sudah dirender sebelumnya.
+
+    python benchmarks/bench_status.py [jumlah_request]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp.test_utils import make_mocked_request
+
+import main
+
+
+async def bench(path, count, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    request = make_mocked_request('GET', path, headers=headers)
+    handler = {'/': main.home, '/status': main.status, '/uptime': main.uptime}[path]
+    start = time.perf_counter()
+    for _ in range(count):
+        await handler(request)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+async def run(count):
+    for guilds in (1, 1000, 100000):
+        main.snapshot.update(connected=True, name="Ner-O", user_id=1, guilds=guilds)
+        for path in ('/', '/status', '/uptime'):
+            etag = main.snapshot.responses[path].etag
+            full = await bench(path, count)
+            cached = await bench(path, count, etag)
+            print(f"guilds={guilds:<7} {path:<8} 200: {full:6.2f} us/req   304: {cached:6.2f} us/req")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
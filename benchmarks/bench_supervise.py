@@ -0,0 +1,210 @@
+"""Pemeriksaan supervisor bot dan kontrak endpoint status (main.py)
+
+`main.supervise_bot` dijalankan terhadap bot palsu yang `start()`-nya
+mengikuti skenario (error, sempat online lalu error, login gagal, jalan
+terus), dengan backoff diperkecil dan jitter dimatikan. Diperiksa (assert):
+
+  backoff     error berturut-turut di-restart dengan jeda 1x, 2x, 4x ... sampai
+              batas RESTART_BACKOFF_MAX; client yang tertutup di-reset dulu
+  reset       bot yang sempat online sebelum berhenti di-restart lagi dengan
+              backoff minimum
+  login       token tidak valid menghentikan supervisor tanpa restart
+  stop        event stop menutup bot yang sedang jalan dan status jadi offline
+  token       tanpa DISCORD_TOKEN bot tidak pernah dijalankan
+  endpoint    `/status` berisi status/nama/id/guild, `/uptime` 500 selama bot
+              tidak tersambung dan 200 setelah ready, ETag menghasilkan 304
+
+    python benchmarks/bench_supervise.py
+"""
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Error restart yang disengaja tidak perlu dicetak
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+import discord  # noqa: E402
+from aiohttp.test_utils import make_mocked_request  # noqa: E402
+
+import main  # noqa: E402
+
+BACKOFF_MIN = 0.02
+BACKOFF_MAX = 0.16
+# Toleransi jadwal event loop (detik)
+SLACK = 0.05
+
+
+class FakeBot:
+    """Bot palsu; setiap start() menjalankan langkah berikutnya dari `script`
+
+    Langkah: 'error' (langsung raise), 'online' (ready lalu raise), 'login'
+    (LoginFailure) atau 'hang' (jalan sampai close()).
+    """
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.starts = []
+        self.clears = 0
+        self.closed = True
+        self.ready = False
+        self.user = SimpleNamespace(name="Ner-O", id=42)
+        self.guilds = [object()] * 3
+        self.http = SimpleNamespace(connector=discord.utils.MISSING)
+        self._closing = None
+
+    async def start(self, token):
+        loop = asyncio.get_running_loop()
+        self.starts.append(loop.time())
+        # Supervisor harus me-reset client dan connector yang sudah ditutup
+        assert not self.closed and self.http.connector is discord.utils.MISSING
+        self.closed = False
+        self._closing = asyncio.Event()
+        step = self.script.pop(0) if self.script else 'hang'
+        if step == 'online':
+            self.ready = True
+            main.bot_status = "online"
+            main.publish_status()
+            await asyncio.sleep(0)
+            raise ConnectionResetError("gateway putus")
+        if step == 'login':
+            raise discord.errors.LoginFailure("Improper token has been passed.")
+        if step == 'error':
+            raise ConnectionResetError("gateway putus")
+        await self._closing.wait()
+
+    async def close(self):
+        self.closed = True
+        self.ready = False
+        self.http.connector = SimpleNamespace(closed=True)
+        if self._closing is not None:
+            self._closing.set()
+
+    def clear(self):
+        self.clears += 1
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    def is_ready(self):
+        return self.ready
+
+
+def install(bot, token="token"):
+    main.bot = bot
+    main.discord = discord
+    main.TOKEN = token
+    main.bot_status = "starting"
+    main.snapshot.update(connected=False)
+
+
+async def supervise(bot, until):
+    """Jalankan supervisor sampai `until(bot)` benar, lalu hentikan"""
+    stop = asyncio.Event()
+    task = asyncio.create_task(main.supervise_bot(stop))
+    while not until(bot) and not task.done():
+        await asyncio.sleep(0.005)
+    stop.set()
+    await asyncio.wait_for(task, 5)
+
+
+def gaps(bot):
+    return [b - a for a, b in zip(bot.starts, bot.starts[1:])]
+
+
+async def check_backoff():
+    bot = FakeBot(['error'] * 5)
+    install(bot)
+    await supervise(bot, lambda bot: len(bot.starts) == 6)
+    expected = [min(BACKOFF_MIN * 2 ** i, BACKOFF_MAX) for i in range(5)]
+    for gap, want in zip(gaps(bot), expected):
+        assert want <= gap < want + SLACK, (gaps(bot), expected)
+    assert bot.clears == len(bot.starts) and main.bot_status == "stopped"
+
+
+async def check_reset():
+    bot = FakeBot(['error', 'error', 'online', 'error'])
+    install(bot)
+    await supervise(bot, lambda bot: len(bot.starts) == 5)
+    got = gaps(bot)
+    # Jeda ketiga kembali ke minimum karena bot sempat online
+    assert got[1] >= 2 * BACKOFF_MIN and got[2] < BACKOFF_MIN + SLACK, got
+    assert 2 * BACKOFF_MIN <= got[3] < 2 * BACKOFF_MIN + SLACK, got
+
+
+async def check_login():
+    bot = FakeBot(['login'])
+    install(bot)
+    stop = asyncio.Event()
+    await asyncio.wait_for(main.supervise_bot(stop), 1)
+    assert len(bot.starts) == 1 and bot.closed, bot.starts
+    assert main.bot_status == "stopped"
+
+
+async def check_stop():
+    bot = FakeBot(['hang'])
+    install(bot)
+    await supervise(bot, lambda bot: bot.starts)
+    assert len(bot.starts) == 1 and bot.closed and main.bot_status == "stopped"
+    assert main.snapshot.responses['/uptime'].status == 500
+
+
+async def check_token():
+    bot = FakeBot([])
+    install(bot, token=None)
+    await asyncio.wait_for(main.supervise_bot(asyncio.Event()), 1)
+    assert not bot.starts and main.bot_status == "error_no_token"
+
+
+async def get(path, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    request = make_mocked_request('GET', path, headers=headers)
+    handler = {'/': main.home, '/status': main.status, '/uptime': main.uptime}[path]
+    return await handler(request)
+
+
+async def check_endpoints():
+    bot = FakeBot([])
+    install(bot)
+    offline = await get('/status')
+    assert json.loads(offline.body) == \
+        {'status': 'offline', 'name': 'Unknown', 'id': 'Unknown', 'guilds': 0}
+    response = await get('/uptime')
+    assert response.status == 500 and response.body == b"Bot not connected"
+    assert b"Bot Offline" in (await get('/')).body
+
+    bot.ready, bot.closed = True, False
+    await main.on_resumed()
+    response = await get('/status')
+    assert response.status == 200 and response.content_type == 'application/json'
+    assert json.loads(response.body) == \
+        {'status': 'online', 'name': 'Ner-O', 'id': '42', 'guilds': 3}, response.body
+    assert response.headers['ETag'] != offline.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+    cached = await get('/status', response.headers['ETag'])
+    assert cached.status == 304 and not cached.body
+    response = await get('/uptime')
+    assert response.status == 200 and response.body == b"OK"
+
+    # discord.py tetap is_ready() selama reconnect; event disconnect yang menentukan
+    await main.on_disconnect()
+    assert main.bot_status == "reconnecting" and (await get('/uptime')).status == 500
+    assert json.loads((await get('/status')).body)['status'] == 'offline'
+
+
+def run():
+    main.RESTART_BACKOFF_MIN = BACKOFF_MIN
+    main.RESTART_BACKOFF_MAX = BACKOFF_MAX
+    main.random = SimpleNamespace(uniform=lambda low, high: 1.0)
+    for name, check in (('backoff', check_backoff), ('reset', check_reset),
+                        ('login', check_login), ('stop', check_stop),
+                        ('token', check_token), ('endpoint', check_endpoints)):
+        asyncio.run(check())
+        print(f"{name:<9} ok")
+
+
+if __name__ == "__main__":
+    run()
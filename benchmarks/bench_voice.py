@@ -0,0 +1,197 @@
+"""Pemeriksaan sesi voice (utils.voice) dengan FakeBackend
+
+Setiap skenario menjalankan VoiceSessions terhadap backend di memori dan
+memeriksa (assert) jumlah connect, sesi yang tersisa dan callback
+on_idle/on_reconnect:
+
+  gabung       connect bersamaan untuk satu guild -> satu koneksi
+  pindah       channel lain di guild yang sama memakai move_to
+  retry        connect yang habis waktu diulang dengan backoff
+  idle         channel tanpa pendengar diputus setelah masa tenggang
+  diputus      bot diputus orang (Disconnect/kick) -> sesi ditutup, tidak kembali
+  server       koneksi hilang (server voice berganti) -> langsung tersambung lagi
+  kosong       koneksi hilang di channel tanpa pendengar -> tidak disambung lagi
+
+Di akhir diukur waktu ensure() untuk banyak guild sekaligus.
+
+    python benchmarks/bench_voice.py [jumlah_guild] [connect_ms]
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.backend import FakeBackend  # noqa: E402
+from utils.voice import VoiceConnectError, VoiceSessions  # noqa: E402
+
+LISTENER = SimpleNamespace(bot=False)
+
+
+def make_channel(guild_id, channel_id=1, listeners=True):
+    guild = SimpleNamespace(id=guild_id)
+    return SimpleNamespace(id=channel_id, name=f"voice {channel_id}", guild=guild,
+                           members=[LISTENER] if listeners else [])
+
+
+def make_sessions(backend, **kwargs):
+    sessions = VoiceSessions(backend, **dict(dict(timeout=1.0, backoff=0.01), **kwargs))
+    sessions.idled = []
+    sessions.reconnected = []
+    sessions.on_idle = sessions.idled.append
+    sessions.on_reconnect = lambda guild_id, voice: sessions.reconnected.append(guild_id)
+    return sessions
+
+
+def left(channel):
+    """(before, after) voice state bot yang keluar dari `channel`"""
+    return SimpleNamespace(channel=channel), SimpleNamespace(channel=None)
+
+
+async def settle(sessions):
+    """Tunggu koneksi ulang dan pelepasan di background selesai"""
+    while sessions._reconnects or sessions._discards:
+        await asyncio.sleep(0.001)
+
+
+async def scenario_coalesce():
+    backend = FakeBackend(connect_delay=0.02)
+    sessions = make_sessions(backend)
+    channel = make_channel(1)
+    voices = await asyncio.gather(*(sessions.ensure(channel) for _ in range(20)))
+    assert backend.connects == 1, backend.connects
+    assert all(voice is voices[0] for voice in voices)
+    return backend, sessions
+
+
+async def scenario_move():
+    backend = FakeBackend()
+    sessions = make_sessions(backend)
+    voice = await sessions.ensure(make_channel(1, 1))
+    moved = await sessions.ensure(make_channel(1, 2))
+    assert moved is voice and voice.channel.id == 2
+    assert backend.connects == 1, backend.connects
+    return backend, sessions
+
+
+async def scenario_retry():
+    delays = iter((5.0, 0))
+    backend = FakeBackend(connect_delay=lambda: next(delays))
+    sessions = make_sessions(backend, timeout=0.05, retries=1)
+    voice = await sessions.ensure(make_channel(1))
+    assert voice.is_connected() and backend.connects == 1
+
+    backend = FakeBackend(connect_delay=5.0)
+    sessions = make_sessions(backend, timeout=0.02, retries=2)
+    try:
+        await sessions.ensure(make_channel(1))
+    except VoiceConnectError:
+        pass
+    else:
+        raise AssertionError("connect yang selalu habis waktu harus gagal")
+    assert not sessions.sessions
+    return backend, sessions
+
+
+async def scenario_idle():
+    backend = FakeBackend()
+    sessions = make_sessions(backend, idle_grace=0.05)
+    channel = make_channel(1, listeners=False)
+    voice = await sessions.ensure(channel)
+    await asyncio.sleep(0.1)
+    assert sessions.idled == [1] and not sessions.sessions
+    assert not voice.is_connected() and not backend.voice_clients
+    return backend, sessions
+
+
+async def scenario_forced():
+    backend = FakeBackend()
+    sessions = make_sessions(backend)
+    channel = make_channel(1)
+    await sessions.ensure(channel)
+    backend.drop(1, lost=False)
+    sessions.self_update(1, *left(channel))
+    await settle(sessions)
+    assert backend.connects == 1, backend.connects
+    assert sessions.idled == [1] and sessions.reconnected == []
+    assert not sessions.sessions and not backend.voice_clients
+    return backend, sessions
+
+
+async def scenario_server_change():
+    backend = FakeBackend(connect_delay=0.01)
+    sessions = make_sessions(backend)
+    channel = make_channel(1)
+    old = await sessions.ensure(channel)
+    backend.drop(1, lost=True)
+    sessions.self_update(1, *left(channel))
+    await settle(sessions)
+    assert backend.connects == 2, backend.connects
+    assert sessions.reconnected == [1] and sessions.idled == []
+    voice = sessions.get(1)
+    assert voice is not None and voice is not old and voice.channel is channel
+    return backend, sessions
+
+
+async def scenario_empty():
+    backend = FakeBackend()
+    sessions = make_sessions(backend)
+    channel = make_channel(1)
+    await sessions.ensure(channel)
+    backend.drop(1, lost=True)
+    channel.members.clear()
+    sessions.self_update(1, *left(channel))
+    await settle(sessions)
+    assert backend.connects == 1 and sessions.idled == [1] and sessions.reconnected == []
+    return backend, sessions
+
+
+SCENARIOS = (
+    ('gabung', scenario_coalesce),
+    ('pindah', scenario_move),
+    ('retry', scenario_retry),
+    ('idle', scenario_idle),
+    ('diputus', scenario_forced),
+    ('server', scenario_server_change),
+    ('kosong', scenario_empty),
+)
+
+
+async def throughput(guilds, delay):
+    backend = FakeBackend(connect_delay=delay)
+    sessions = make_sessions(backend)
+    latencies = []
+
+    async def join(guild_id):
+        started = time.perf_counter()
+        await sessions.ensure(make_channel(guild_id))
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(join(guild_id) for guild_id in range(guilds)))
+    elapsed = time.perf_counter() - started
+    sessions.close()
+    return elapsed, statistics.median(latencies)
+
+
+async def main(guilds, delay):
+    print(f"  {'skenario':<10} {'connect':>8} {'sesi':>5} {'idle':>5} {'ulang':>6}")
+    for name, scenario in SCENARIOS:
+        backend, sessions = await scenario()
+        sessions.close()
+        print(f"  {name:<10} {backend.connects:>8} {len(sessions.sessions):>5} "
+              f"{len(sessions.idled):>5} {len(sessions.reconnected):>6}  ok")
+
+    elapsed, median = await throughput(guilds, delay)
+    print(f"\n{guilds} guild connect bersamaan ({delay * 1000:.0f} ms per connect): "
+          f"{elapsed * 1000:.0f} ms total, median {median * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+                     float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05))
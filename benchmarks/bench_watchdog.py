@@ -0,0 +1,156 @@
+"""Pemeriksaan watchdog event loop dan profiler (utils.watchdog, /loop di main.py)
+
+LoopWatchdog dijalankan dengan batas kecil terhadap kode yang sengaja
+memblokir event loop. Diperiksa (assert):
+
+  tenang      loop yang hanya menunggu tidak dianggap stall
+  stall       blokir di dalam perintah tercatat dengan call site fungsi yang
+              memblokir, nama perintah, nama task dan lag-nya; recent_lag ikut naik
+  profiler    sampel stack ditulis dalam format folded dan fungsi yang
+              memblokir mendominasi sampel
+  endpoint    /loop berisi persentil lag dan pelaku; /loop/profile 404 jika
+              profiler tidak aktif
+  env         LOOP_WATCHDOG=0 mematikan watchdog
+
+    python benchmarks/bench_watchdog.py
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+from aiohttp.test_utils import make_mocked_request  # noqa: E402
+
+import main  # noqa: E402
+from utils import watchdog as watchdog_module  # noqa: E402
+from utils.watchdog import LoopWatchdog  # noqa: E402
+
+THRESHOLD = 0.05
+INTERVAL = 0.01
+BLOCK = 0.25
+
+
+def blocking_io(seconds):
+    """Meniru pemanggilan sinkron yang lupa dipindah ke thread"""
+    time.sleep(seconds)
+
+
+async def slow_command(ctx):
+    blocking_io(BLOCK)
+
+
+COMMANDS = [SimpleNamespace(callback=slow_command, qualified_name='lambat')]
+
+
+async def beats(count=5):
+    await asyncio.sleep(INTERVAL * count)
+
+
+async def check_quiet():
+    watchdog = LoopWatchdog(threshold=THRESHOLD, interval=INTERVAL)
+    watchdog.start()
+    for _ in range(10):
+        await asyncio.sleep(0.02)
+    watchdog.stop()
+    summary = watchdog.summary()
+    assert summary['stalls'] == 0 and not summary['offenders'], summary
+    assert summary['samples'] > 0 and summary['lag_ms']['p50'] < THRESHOLD * 1000, summary
+
+
+async def check_stall():
+    watchdog = LoopWatchdog(threshold=THRESHOLD, interval=INTERVAL,
+                            commands=lambda: COMMANDS)
+    watchdog.start()
+    await beats()
+    await asyncio.create_task(slow_command(None), name='perintah-lambat')
+    await beats()
+    assert watchdog.recent_lag() >= BLOCK * 0.8, watchdog.recent_lag()
+    watchdog.stop()
+
+    summary = watchdog.summary()
+    assert summary['stalls'] == 1, summary
+    offender, = summary['offenders']
+    assert offender['site'].startswith('benchmarks/bench_watchdog.py:'), offender
+    assert offender['site'].endswith(' blocking_io'), offender
+    assert offender['commands'] == {'lambat': 1}, offender
+    assert offender['tasks'] == {'perintah-lambat': 1}, offender
+    assert offender['max_ms'] >= BLOCK * 1000 * 0.8, offender
+    stall, = summary['recent']
+    assert stall['lag_ms'] == offender['max_ms'] and stall['command'] == 'lambat'
+    assert any('slow_command' in frame for frame in stall['stack']), stall['stack']
+    return summary['lag_ms']
+
+
+async def check_profiler():
+    path = os.path.join(tempfile.mkdtemp(), 'loop.folded')
+    watchdog = LoopWatchdog(threshold=THRESHOLD, interval=INTERVAL,
+                            profile_path=path, profile_hz=200)
+    watchdog.start()
+    await beats()
+    blocking_io(BLOCK)
+    await beats()
+    watchdog.stop()
+
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines and not os.path.exists(path + '.tmp')
+    counts = {}
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0 and stack, line
+        counts[stack] = int(count)
+    total = sum(counts.values())
+    hot = sum(count for stack, count in counts.items()
+              if 'blocking_io (bench_watchdog.py:' in stack)
+    assert total == watchdog.summary()['profile_samples'], (total, watchdog.summary())
+    assert hot >= total / 2, (hot, total)
+    return total, hot
+
+
+async def check_endpoint():
+    main.watchdog = LoopWatchdog(threshold=THRESHOLD, interval=INTERVAL)
+    main.watchdog.start()
+    await beats()
+    response = await main.loop_status(make_mocked_request('GET', '/loop'))
+    main.watchdog.stop()
+    body = json.loads(response.body)
+    assert body['enabled'] and set(body['lag_ms']) == {'p50', 'p90', 'p99', 'max'}, body
+    assert body['threshold_ms'] == THRESHOLD * 1000 and not body['profiling'], body
+    response = await main.loop_profile(make_mocked_request('GET', '/loop/profile'))
+    assert response.status == 404
+
+    main.watchdog = None
+    response = await main.loop_status(make_mocked_request('GET', '/loop'))
+    assert json.loads(response.body) == {'enabled': False}
+
+
+def check_env():
+    os.environ['LOOP_WATCHDOG'] = '0'
+    assert watchdog_module.watchdog_from_env() is None
+    os.environ['LOOP_WATCHDOG'] = '1'
+    os.environ['LOOP_LAG_THRESHOLD_MS'] = '40'
+    watchdog = watchdog_module.watchdog_from_env()
+    assert watchdog.threshold == 0.04 and watchdog.profile_path is None
+
+
+def run():
+    asyncio.run(check_quiet())
+    print(f"{'tenang':<9} ok")
+    lag = asyncio.run(check_stall())
+    print(f"{'stall':<9} ok  (lag p50 {lag['p50']} ms, max {lag['max']} ms)")
+    total, hot = asyncio.run(check_profiler())
+    print(f"{'profiler':<9} ok  ({hot}/{total} sampel di blocking_io)")
+    asyncio.run(check_endpoint())
+    print(f"{'endpoint':<9} ok")
+    check_env()
+    print(f"{'env':<9} ok")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,167 @@
+"""Pemeriksaan cache resolusi YTDLSource (utils.cache dan utils.ytdl)
+
+Penjadwal ekstraksi diganti extractor palsu yang mencatat setiap query yang
+benar-benar diekstrak, lalu diperiksa (assert):
+
+  kunci       bentuk link YouTube yang berbeda dan kata kunci dengan huruf/spasi
+              berbeda menjadi satu kunci cache
+  hit         resolve kedua (dengan bentuk link lain) tidak mengekstrak lagi
+  basi        URL stream yang kedaluwarsa (parameter `expire`) di-refresh dari
+              `webpage_url`, bukan dengan pencarian ulang; `usable` bisa
+              memakai metadata lama
+  ttl         metadata yang lewat TTL dicari ulang dari query asli
+  lru         entri paling lama tidak dipakai dibuang saat cache penuh
+  sqlite      entri bertahan setelah cache dibuka ulang, entri yang dibuang
+              dan di-invalidate ikut terhapus dari file
+  bersamaan   resolve bersamaan untuk query yang sama hanya satu ekstraksi
+
+Di akhir diukur waktu resolve yang dijawab dari cache.
+
+    python benchmarks/bench_ytdl.py [jumlah_resolve]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ytdl  # noqa: E402
+from utils.cache import ResolutionCache, normalize_query  # noqa: E402
+from utils.ytdl import YTDLSource  # noqa: E402
+
+VIDEO = 'https://www.youtube.com/watch?v=abc123'
+HOUR = 3600
+
+
+class FakeScheduler:
+    """Pengganti ExtractionScheduler.run; URL stream berlaku `expires_in` detik"""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.expires_in = HOUR
+        self.queries = []
+
+    async def run(self, query, options, *, guild_id=None, owner=None, shared=False):
+        self.queries.append(query)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        key = normalize_query(query)
+        video = key.split(':', 1)[1] if key.startswith('youtube:') else 'abc123'
+        expire = int(time.time() + self.expires_in)
+        return {'entries': [{
+            'id': video, 'title': f"Lagu {video}", 'extractor': 'youtube',
+            'webpage_url': f"https://www.youtube.com/watch?v={video}",
+            'url': f"https://stream.example/{video}?expire={expire}",
+            'duration': 200, 'formats': ['tidak disimpan'],
+        }]}
+
+
+def install(cache, scheduler):
+    ytdl.resolution_cache = cache
+    ytdl.scheduler = scheduler
+
+
+def check_keys():
+    forms = (VIDEO, 'https://youtu.be/abc123', 'https://m.youtube.com/watch?v=abc123&si=x',
+             'https://music.youtube.com/watch?feature=share&v=abc123')
+    assert {normalize_query(query) for query in forms} == {'youtube:abc123'}
+    assert normalize_query('  Lagu   Baru ') == normalize_query('lagu baru') == 'search:lagu baru'
+    assert normalize_query(VIDEO + '&list=PL1') != 'youtube:abc123'
+    assert normalize_query('https://Example.com/a/?utm_source=x&b=2') == \
+        'url:https://example.com/a?b=2'
+
+
+async def check_hit():
+    cache, scheduler = ResolutionCache(), FakeScheduler()
+    install(cache, scheduler)
+    data = await YTDLSource.resolve(VIDEO)
+    assert await YTDLSource.resolve('https://youtu.be/abc123') == data
+    assert scheduler.queries == [VIDEO], scheduler.queries
+    assert 'formats' not in data and data['title'] == 'Lagu abc123'
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1, cache.stats()
+
+
+async def check_stale():
+    cache, scheduler = ResolutionCache(), FakeScheduler()
+    install(cache, scheduler)
+    # URL stream kedaluwarsa sebelum margin habis
+    scheduler.expires_in = cache.stream_margin / 2
+    old = await YTDLSource.resolve('lagu lama')
+    assert await YTDLSource.resolve('lagu lama', usable=lambda data: True) == old
+    assert scheduler.queries == ['lagu lama']
+    scheduler.expires_in = HOUR
+    fresh = await YTDLSource.resolve('Lagu  Lama')
+    assert scheduler.queries == ['lagu lama', old['webpage_url']], scheduler.queries
+    assert fresh['url'] != old['url'] and cache.stats()['stale'] == 2, cache.stats()
+
+
+async def check_ttl():
+    cache, scheduler = ResolutionCache(ttl=HOUR), FakeScheduler()
+    install(cache, scheduler)
+    await YTDLSource.resolve('lagu ttl')
+    cache._entries['search:lagu ttl'].created -= HOUR + 1
+    await YTDLSource.resolve('lagu ttl')
+    assert scheduler.queries == ['lagu ttl', 'lagu ttl'], scheduler.queries
+
+
+async def check_lru():
+    cache, scheduler = ResolutionCache(maxsize=3), FakeScheduler()
+    install(cache, scheduler)
+    for video in ('v1', 'v2', 'v3'):
+        await YTDLSource.resolve(f"https://youtu.be/{video}")
+    await YTDLSource.resolve('https://youtu.be/v1')
+    await YTDLSource.resolve('https://youtu.be/v4')
+    assert 'youtube:v2' not in cache and len(cache) == 3, list(cache._entries)
+    assert cache.stats()['evictions'] == 1
+    await YTDLSource.resolve('https://youtu.be/v1')
+    assert scheduler.queries.count('https://youtu.be/v1') == 1, scheduler.queries
+
+
+async def check_sqlite():
+    path = os.path.join(tempfile.mkdtemp(), 'resolusi.sqlite3')
+    cache, scheduler = ResolutionCache(maxsize=2, path=path), FakeScheduler()
+    install(cache, scheduler)
+    for video in ('v1', 'v2', 'v3'):
+        await YTDLSource.resolve(f"https://youtu.be/{video}")
+    cache.invalidate('youtube:v3')
+
+    reopened = ResolutionCache(maxsize=2, path=path)
+    assert list(reopened._entries) == ['youtube:v2'], list(reopened._entries)
+    install(reopened, scheduler)
+    data = await YTDLSource.resolve('https://youtu.be/v2')
+    assert data['id'] == 'v2' and len(scheduler.queries) == 3, scheduler.queries
+
+
+async def check_concurrent(count=20):
+    cache, scheduler = ResolutionCache(), FakeScheduler(delay=0.01)
+    install(cache, scheduler)
+    results = await asyncio.gather(*(YTDLSource.resolve('lagu rame', guild_id=guild)
+                                     for guild in range(count)))
+    assert scheduler.queries == ['lagu rame'], scheduler.queries
+    assert all(result == results[0] for result in results)
+
+
+async def hit_latency(count):
+    install(ResolutionCache(), FakeScheduler())
+    await YTDLSource.resolve(VIDEO)
+    started = time.perf_counter()
+    for _ in range(count):
+        await YTDLSource.resolve(VIDEO)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def main(count):
+    check_keys()
+    print(f"{'kunci':<10} ok")
+    for name, check in (('hit', check_hit), ('basi', check_stale), ('ttl', check_ttl),
+                        ('lru', check_lru), ('sqlite', check_sqlite),
+                        ('bersamaan', check_concurrent)):
+        asyncio.run(check())
+        print(f"{name:<10} ok")
+    print(f"resolve dari cache: {asyncio.run(hit_latency(count)):.2f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
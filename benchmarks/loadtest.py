@@ -0,0 +1,350 @@
+"""Load test perintah musik tanpa jaringan
+
+Setiap skenario dijalankan di subprocess tersendiri supaya RSS dan state
+player bersih. Di dalamnya dibuat guild sintetis (GUILD_CREATE dengan channel
+teks, channel suara dan beberapa member di voice) pada ConnectionState bot
+dari bot.py, lalu MESSAGE_CREATE berisi campuran `!play`, `!skip`, `!queue`
+dan `!volume` di-parse seperti dari gateway, sehingga melewati `on_message`
+dan dispatcher perintah yang asli (utils.dispatch). Cog musik memakai
+FakeBackend (voice client palsu, extractor dengan latensi acak) dan HTTP
+Discord diganti stub, jadi tidak ada koneksi keluar.
+
+Yang dilaporkan per skenario: perintah/detik, latensi perintah p50/p99
+(dari pesan masuk sampai perintah selesai), lag event loop p99/maks dan RSS.
+Pembatas laju perintah (utils.ratelimit) dimatikan supaya angka sebanding
+dengan baseline; `--limiter` menyalakannya dan melaporkan jumlah penolakan.
+Hasil bisa disimpan sebagai baseline dan dibandingkan di run berikutnya;
+exit code 1 jika ada regresi melebihi toleransi.
+
+    python benchmarks/loadtest.py --guilds 1,100,1000,10000
+    python benchmarks/loadtest.py --save-baseline
+    python benchmarks/loadtest.py --baseline benchmarks/loadtest_baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'loadtest_baseline.json')
+
+# Campuran perintah (bobot)
+MIX = (('play', 50), ('queue', 20), ('skip', 15), ('volume', 15))
+
+# Metrik yang dibandingkan dengan baseline: (nama, True jika makin besar makin baik)
+COMPARED = (('commands_per_s', True), ('p99_ms', False), ('loop_lag_p99_ms', False),
+            ('rss_mib', False))
+
+BOT_USER_ID = 1
+VOICE_MEMBERS = 3
+
+
+# ----- payload gateway sintetis -----
+
+
+def user_payload(user_id, name):
+    return {'id': str(user_id), 'username': name, 'discriminator': '0',
+            'avatar': None, 'global_name': name}
+
+
+def guild_payload(guild_id):
+    users = [user_payload(guild_id * 100000 + i, f'user{i}') for i in range(VOICE_MEMBERS)]
+    voice_id = guild_id * 10 + 1
+    return {
+        'id': str(guild_id), 'name': f'Guild {guild_id}', 'owner_id': users[0]['id'],
+        'member_count': 50, 'roles': [], 'emojis': [], 'stickers': [], 'features': [],
+        'large': False,
+        'channels': [
+            {'id': str(guild_id * 10), 'type': 0, 'name': 'umum', 'position': 0,
+             'permission_overwrites': []},
+            {'id': str(voice_id), 'type': 2, 'name': 'Musik', 'position': 1,
+             'permission_overwrites': [], 'bitrate': 64000, 'user_limit': 0},
+        ],
+        'members': [{'user': u, 'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00',
+                     'deaf': False, 'mute': False, 'flags': 0} for u in users],
+        'voice_states': [
+            {'user_id': u['id'], 'channel_id': str(voice_id), 'session_id': 'x',
+             'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False,
+             'suppress': False, 'request_to_speak_timestamp': None}
+            for u in users
+        ],
+        'presences': [], 'threads': [], 'stage_instances': [],
+        'guild_scheduled_events': [],
+    }
+
+
+def message_payload(message_id, guild_id, author_id, content):
+    return {
+        'id': str(message_id), 'channel_id': str(guild_id * 10), 'guild_id': str(guild_id),
+        'author': user_payload(author_id, 'user'),
+        'member': {'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00',
+                   'deaf': False, 'mute': False, 'flags': 0},
+        'content': content, 'timestamp': '2024-01-01T00:00:00+00:00',
+        'edited_timestamp': None, 'tts': False, 'mention_everyone': False,
+        'mentions': [], 'mention_roles': [], 'attachments': [], 'embeds': [],
+        'pinned': False, 'type': 0,
+    }
+
+
+def command_content(rng, n):
+    name = rng.choices([m[0] for m in MIX], weights=[m[1] for m in MIX])[0]
+    if name == 'play':
+        return f"!play lagu {rng.randrange(5000)}"
+    if name == 'volume':
+        return f"!volume {rng.randrange(101)}"
+    return f"!{name}"
+
+
+# ----- HTTP palsu -----
+
+
+def stub_http(bot):
+    """Ganti panggilan REST yang dipakai perintah dengan stub lokal"""
+    counter = iter(range(10 ** 15, 10 ** 16))
+    bot_user = user_payload(BOT_USER_ID, 'Ner-O')
+    bot_user['bot'] = True
+
+    async def send_message(channel_id, *, params):
+        payload = params.payload or {}
+        return message_payload(next(counter), 0, BOT_USER_ID, payload.get('content') or '') | {
+            'channel_id': str(channel_id), 'author': bot_user, 'guild_id': None,
+            'embeds': payload.get('embeds') or []}
+
+    async def send_typing(channel_id):
+        pass
+
+    bot.http.send_message = send_message
+    bot.http.send_typing = send_typing
+
+
+# ----- skenario (dijalankan di subprocess) -----
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def current_rss_mib():
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+async def monitor_lag(samples, interval=0.01):
+    """Catat keterlambatan bangun event loop dibanding interval sleep"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - started - interval))
+
+
+async def run_scenario(args):
+    # Log tetap diproses seperti produksi tapi dibuang ke /dev/null
+    from utils.log import setup_logging
+    setup_logging(stream=open(os.devnull, 'w'))
+
+    import bot as bot_module
+    import music_commands
+    from discord import ClientUser
+    from utils.backend import FakeBackend
+    from utils.ratelimit import Overloaded, RateLimited, limiter
+
+    limiter.enabled = args.limiter
+    bot = bot_module.bot
+    await bot._async_setup_hook()
+    rng = random.Random(args.seed)
+    extract = args.extract_ms / 1000
+    connect = args.connect_ms / 1000
+    backend = FakeBackend(
+        connect_delay=lambda: rng.expovariate(1 / connect) if connect else 0,
+        resolve_delay=lambda: rng.expovariate(1 / extract) if extract else 0,
+        track_seconds=args.track_seconds)
+    await bot.add_cog(music_commands.Music(bot, backend))
+    stub_http(bot)
+
+    state = bot._connection
+    state._ready_state = None
+    state._chunk_guilds = False
+    state.user = ClientUser(state=state, data=user_payload(BOT_USER_ID, 'Ner-O') | {'bot': True})
+    for guild_id in range(1, args.guilds + 1):
+        state._add_guild_from_data(guild_payload(guild_id))
+
+    injected = {}
+    latencies = []
+    slots = asyncio.Semaphore(args.concurrency)
+    done = asyncio.Event()
+    finished = 0
+    errors = 0
+    limited = 0
+
+    def complete(ctx, failed=False, rejected=False):
+        nonlocal finished, errors, limited
+        started = injected.pop(ctx.message.id, None)
+        if started is None:
+            return
+        latencies.append(time.perf_counter() - started)
+        errors += failed
+        limited += rejected
+        finished += 1
+        slots.release()
+        if finished == args.commands:
+            done.set()
+
+    async def on_command_completion(ctx):
+        complete(ctx)
+
+    async def on_command_error(ctx, error):
+        if isinstance(error, (RateLimited, Overloaded)):
+            complete(ctx, rejected=True)
+        else:
+            complete(ctx, failed=True)
+
+    bot.add_listener(on_command_completion)
+    bot.add_listener(on_command_error)
+
+    lag = []
+    lag_task = asyncio.create_task(monitor_lag(lag))
+    rss_before = current_rss_mib()
+    started = time.perf_counter()
+    for n in range(args.commands):
+        await slots.acquire()
+        guild_id = rng.randrange(1, args.guilds + 1)
+        author_id = guild_id * 100000 + rng.randrange(VOICE_MEMBERS)
+        message_id = 10 ** 12 + n
+        injected[message_id] = time.perf_counter()
+        state.parse_message_create(
+            message_payload(message_id, guild_id, author_id, command_content(rng, n)))
+        if args.rate:
+            await asyncio.sleep(1 / args.rate)
+    await asyncio.wait_for(done.wait(), timeout=args.timeout)
+    elapsed = time.perf_counter() - started
+    lag_task.cancel()
+
+    from utils.player import players
+    return {
+        'guilds': args.guilds,
+        'commands': args.commands,
+        'errors': errors,
+        'limited': limited,
+        'commands_per_s': round(args.commands / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'loop_lag_p99_ms': round(percentile(lag, 0.99) * 1000, 2),
+        'loop_lag_max_ms': round(max(lag, default=0) * 1000, 2),
+        'rss_mib': round(current_rss_mib(), 1),
+        'rss_peak_mib': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'players': len(players),
+        'voice_connects': backend.connects,
+        'tracks_played': backend.plays,
+        'player_kib_per_guild': round((current_rss_mib() - rss_before) * 1024 / args.guilds, 2),
+    }
+
+
+# ----- runner -----
+
+
+def run_subprocess(args, guilds):
+    command = [sys.executable, os.path.abspath(__file__), '--scenario',
+               '--guilds', str(guilds), '--commands', str(args.commands),
+               '--concurrency', str(args.concurrency), '--rate', str(args.rate),
+               '--extract-ms', str(args.extract_ms), '--connect-ms', str(args.connect_ms),
+               '--track-seconds', str(args.track_seconds), '--seed', str(args.seed),
+               '--timeout', str(args.timeout)]
+    if args.limiter:
+        command.append('--limiter')
+    env = dict(os.environ, LOG_LEVEL='INFO', PYTHONPATH=ROOT)
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Daftar regresi dibanding baseline (selisih relatif > tolerance)"""
+    regressions = []
+    for result in results:
+        base = baseline.get(str(result['guilds']))
+        if base is None:
+            continue
+        for name, higher_is_better in COMPARED:
+            old, new = base.get(name), result.get(name)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"guilds={result['guilds']} {name}: {old} -> {new} "
+                                   f"({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', default='1,100,1000,10000',
+                        help='daftar jumlah guild per skenario, dipisah koma')
+    parser.add_argument('--commands', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=500,
+                        help='maksimum perintah yang sedang diproses')
+    parser.add_argument('--rate', type=float, default=0,
+                        help='perintah per detik (0 = secepat mungkin)')
+    parser.add_argument('--extract-ms', type=float, default=50)
+    parser.add_argument('--connect-ms', type=float, default=20)
+    parser.add_argument('--track-seconds', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--limiter', action='store_true',
+                        help='nyalakan pembatas laju perintah')
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE,
+                        help='bandingkan dengan file baseline')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE,
+                        help='simpan hasil sebagai baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='selisih relatif yang dianggap regresi')
+    parser.add_argument('--scenario', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        args.guilds = int(args.guilds)
+        print(json.dumps(asyncio.run(run_scenario(args))))
+        return
+
+    results = []
+    print(f"{'guild':>6} {'cmd/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'lag p99':>8} "
+          f"{'lag max':>8} {'RSS MiB':>8} {'KiB/guild':>9} {'error':>6} {'ditolak':>8}")
+    for guilds in (int(g) for g in args.guilds.split(',')):
+        result = run_subprocess(args, guilds)
+        results.append(result)
+        print(f"{guilds:>6} {result['commands_per_s']:>9} {result['p50_ms']:>8} "
+              f"{result['p99_ms']:>8} {result['loop_lag_p99_ms']:>8} "
+              f"{result['loop_lag_max_ms']:>8} {result['rss_mib']:>8} "
+              f"{result['player_kib_per_guild']:>9} {result['errors']:>6} "
+              f"{result['limited']:>8}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({str(r['guilds']): r for r in results}, f, indent=2)
+        print(f"Baseline disimpan ke {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regresi dibanding baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"Tidak ada regresi dibanding {args.baseline} (toleransi {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
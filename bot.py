@@ -2,170 +2,51 @@ import discord
 from discord.ext import commands
 import logging
 import os
-import asyncio
-import traceback
-import sys
 
-# Import modul YTDLSource dari utils.ytdl
-from utils.ytdl import YTDLSource
-
-# Konfigurasi logging untuk lebih detail
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[logging.StreamHandler()]
-)
-
-# Set up intents yang lengkap
-intents = discord.Intents.all()  # Menggunakan semua intents yang tersedia
-intents.message_content = True   # Pastikan intent untuk membaca konten pesan diaktifkan
-intents.guild_messages = True    # Aktifkan intent untuk pesan-pesan server
-intents.guilds = True            # Aktifkan intent untuk server
-intents.voice_states = True      # Aktifkan intent untuk voice states
-
-# Create bot instance
-bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
-
-# ----- DEFINISI PERINTAH MUSIK -----
-
-@bot.command(name="join", help="Bergabung dengan channel suara")
-async def join(ctx, *, channel: discord.VoiceChannel = None):
-    """Bergabung dengan channel suara"""
-    print(f"Menjalankan perintah join dari {ctx.author}")
-    # Implementasi join command
-    if not channel and not ctx.author.voice:
-        return await ctx.send("Kamu tidak terhubung ke channel suara.")
-        
-    channel = channel or ctx.author.voice.channel
-    
-    if ctx.voice_client:
-        if ctx.voice_client.channel.id == channel.id:
-            return
-        await ctx.voice_client.move_to(channel)
-    else:
-        try:
-            await channel.connect()
-        except Exception as e:
-            return await ctx.send(f"Tidak dapat terhubung ke channel suara: {e}")
-        
-    await ctx.send(f"Bergabung ke {channel.name}")
-
-@bot.command(name="play", help="Putar lagu dari URL atau kata kunci")
-async def play(ctx, *, query):
-    """Putar lagu dari URL atau kata kunci pencarian"""
-    print(f"Menjalankan perintah play dari {ctx.author}: {query}")
-    # Bergabung dengan channel suara pengguna jika belum terhubung
-    if not ctx.voice_client:
-        if not ctx.author.voice:
-            return await ctx.send("Kamu tidak terhubung ke channel suara.")
-        try:
-            await ctx.author.voice.channel.connect()
-        except Exception as e:
-            return await ctx.send(f"Tidak dapat terhubung ke channel suara: {e}")
-    
-    # Kirim pesan menunggu
-    async with ctx.typing():
-        try:
-            # Cari lagu
-            source = await YTDLSource.create_source(ctx, query, loop=ctx.bot.loop)
-            
-            # Mainkan atau tambahkan ke antrian
-            if ctx.voice_client.is_playing():
-                await ctx.send(f"Menambahkan ke antrian: **{source.title}**")
-            else:
-                ctx.voice_client.play(
-                    source.source,
-                    after=lambda e: print(f'Player error: {e}') if e else None
-                )
-                await ctx.send(f"▶️ Memutar: **{source.title}**")
-                
-        except Exception as e:
-            await ctx.send(f"Terjadi kesalahan: {e}")
-            traceback.print_exc()
-
-@bot.command(name="pause", help="Jedakan lagu yang sedang diputar")
-async def pause(ctx):
-    """Jeda lagu yang sedang diputar"""
-    print(f"Menjalankan perintah pause dari {ctx.author}")
-    if not ctx.voice_client or not ctx.voice_client.is_playing():
-        return await ctx.send("Tidak ada lagu yang sedang diputar.")
-        
-    if ctx.voice_client.is_paused():
-        return await ctx.send("Lagu sudah dijeda.")
-        
-    ctx.voice_client.pause()
-    await ctx.send("⏸️ Menjedakan pemutaran")
-
-@bot.command(name="resume", help="Lanjutkan pemutaran lagu yang dijeda")
-async def resume(ctx):
-    """Lanjutkan pemutaran lagu yang dijeda"""
-    print(f"Menjalankan perintah resume dari {ctx.author}")
-    if not ctx.voice_client:
-        return await ctx.send("Bot tidak terhubung ke channel suara.")
-        
-    if not ctx.voice_client.is_paused():
-        return await ctx.send("Lagu tidak dijeda.")
-        
-    ctx.voice_client.resume()
-    await ctx.send("▶️ Melanjutkan pemutaran")
-
-@bot.command(name="skip", help="Lewati lagu yang sedang diputar")
-async def skip(ctx):
-    """Lewati lagu yang sedang diputar"""
-    print(f"Menjalankan perintah skip dari {ctx.author}")
-    if not ctx.voice_client or not ctx.voice_client.is_playing():
-        return await ctx.send("Tidak ada lagu yang sedang diputar.")
-        
-    ctx.voice_client.stop()
-    await ctx.send("⏭️ Melewati lagu")
-
-@bot.command(name="leave", help="Tinggalkan channel suara")
-async def leave(ctx):
-    """Tinggalkan channel suara"""
-    print(f"Menjalankan perintah leave dari {ctx.author}")
-    if not ctx.voice_client:
-        return await ctx.send("Bot tidak dalam channel suara.")
-        
-    await ctx.voice_client.disconnect()
-    await ctx.send("👋 Meninggalkan channel suara")
-
-@bot.command(name="volume", help="Atur volume pemutaran (0-100)")
-async def volume(ctx, volume: int):
-    """Atur volume pemutaran (0-100)"""
-    print(f"Menjalankan perintah volume dari {ctx.author}: {volume}")
-    if not ctx.voice_client or not getattr(ctx.voice_client, 'source', None):
-        return await ctx.send("Tidak ada lagu yang sedang diputar.")
-        
-    if not 0 <= volume <= 100:
-        return await ctx.send("Volume harus antara 0 dan 100.")
-        
-    # Konversi ke float antara 0 dan 1
-    volume_float = volume / 100
-    
-    # Atur volume
-    if hasattr(ctx.voice_client.source, 'volume'):
-        ctx.voice_client.source.volume = volume_float
-        
-    await ctx.send(f"🔊 Volume diatur ke {volume}%")
-
-@bot.command(name="queue", help="Tampilkan antrian lagu")
-async def queue(ctx):
-    """Tampilkan antrian lagu saat ini"""
-    print(f"Menjalankan perintah queue dari {ctx.author}")
-    # Untuk versi sederhana ini, kita belum mengimplementasikan sistem antrian
-    # Kita bisa tambahkan nanti setelah perintah dasar berfungsi
-    await ctx.send("Fitur antrian belum diimplementasikan. Akan ditambahkan segera.")
-
-@bot.command(name="now", help="Tampilkan lagu yang sedang diputar")
-async def now_playing(ctx):
-    """Tampilkan informasi lagu yang sedang diputar"""
-    print(f"Menjalankan perintah now dari {ctx.author}")
-    # Untuk versi sederhana ini, kita belum menyimpan info lagu yang sedang diputar
-    # Kita bisa tambahkan nanti setelah perintah dasar berfungsi
-    if not ctx.voice_client or not ctx.voice_client.is_playing():
-        return await ctx.send("Tidak ada lagu yang sedang diputar.")
-    
-    await ctx.send("Fitur menampilkan lagu yang sedang diputar belum sepenuhnya diimplementasikan.")
+from utils import metrics
+from utils.log import sampler, setup_logging
+from utils.dispatch import RoutedBot, RoutedShardedBot, router_from_env
+from utils.gateway import bot_options
+from utils.ratelimit import Overloaded, RateLimited, limiter
+
+# Logging terstruktur lewat thread listener (lihat utils.log)
+setup_logging()
+log = logging.getLogger("bot")
+message_log = logging.getLogger("bot.message")
+message_sampler = sampler("bot.message")
+command_log = logging.getLogger("bot.command")
+
+# Intent dan cache gateway diatur lewat BOT_PROFILE (lihat utils.gateway).
+# Profil default "lean" hanya memakai intent yang dibutuhkan perintah musik.
+# Worker shard (SHARD_IDS di-set oleh supervisor) memakai AutoShardedBot.
+# Keduanya memberi tahu router setiap perintah berubah (lihat utils.dispatch).
+options = bot_options()
+bot_class = RoutedShardedBot if 'shard_ids' in options else RoutedBot
+bot = bot_class(command_prefix="!", help_command=None, **options)
+
+# Prefix per guild, channel yang dimatikan dan dispatch perintah jalur cepat
+# (COMMAND_PREFIX, GUILD_PREFIXES, DISABLED_CHANNELS; lihat utils.dispatch)
+router = router_from_env(bot)
+bot.command_prefix = router.get_prefix
+
+# Ukur latensi semua perintah untuk endpoint /metrics
+metrics.instrument_bot(bot)
+
+# Token bucket per user/guild/global dan load shedding (lihat utils.ratelimit)
+bot.add_check(limiter.check)
+
+# Perintah musik ada di cog music_commands (dengan backend discord.py voice)
+async def setup_hook():
+    """Muat cog musik sebelum bot terhubung ke gateway"""
+    if 'music_commands' not in bot.extensions:
+        await bot.load_extension('music_commands')
+    # Daftarkan slash command (/play, /search) ke Discord. Sinkronisasi global
+    # dibatasi ketat oleh Discord, jadi hanya dilakukan jika diminta.
+    if os.getenv("SYNC_APP_COMMANDS", "0") == "1":
+        synced = await bot.tree.sync()
+        log.info("Slash command disinkronkan: %s", [c.name for c in synced])
+
+bot.setup_hook = setup_hook
 
 # ----- PERINTAH UMUM -----
 
@@ -174,9 +55,8 @@ async def ping(ctx):
     """Simple command to test if bot is responding"""
     try:
         await ctx.send("Pong! 🏓")
-    except Exception as e:
-        print(f"Error dalam perintah ping: {e}")
-        traceback.print_exc()
+    except Exception:
+        command_log.exception("Error dalam perintah ping")
 
 @bot.command(name="help", help="Menampilkan daftar perintah yang tersedia")
 async def help_command(ctx):
@@ -188,35 +68,38 @@ async def help_command(ctx):
             color=0x7289DA
         )
         
+        p = ctx.prefix
+
         # Perintah musik
         music_commands = [
-            "`!play <url/kata kunci>` - Putar lagu atau tambahkan ke antrian",
-            "`!pause` - Jeda lagu yang sedang diputar",
-            "`!resume` - Lanjutkan pemutaran lagu",
-            "`!skip` - Lewati lagu yang sedang diputar",
-            "`!queue` - Tampilkan antrian lagu",
-            "`!now` - Tampilkan lagu yang sedang diputar",
-            "`!volume <0-100>` - Atur volume pemutaran",
-            "`!join` - Bergabung dengan channel suara",
-            "`!leave` - Tinggalkan channel suara"
+            f"`{p}play <url/kata kunci>` - Putar lagu atau tambahkan ke antrian",
+            f"`{p}search <kata kunci>` - Cari lagu yang pernah diputar",
+            f"`{p}pause` - Jeda lagu yang sedang diputar",
+            f"`{p}resume` - Lanjutkan pemutaran lagu",
+            f"`{p}skip` - Lewati lagu yang sedang diputar",
+            f"`{p}queue` - Tampilkan antrian lagu",
+            f"`{p}now` - Tampilkan lagu yang sedang diputar",
+            f"`{p}volume <0-100>` - Atur volume pemutaran",
+            f"`{p}join` - Bergabung dengan channel suara",
+            f"`{p}leave` - Tinggalkan channel suara"
         ]
         
         # Perintah umum
         general_commands = [
-            "`!help` - Menampilkan pesan bantuan ini",
-            "`!info` - Menampilkan informasi tentang bot",
-            "`!ping` - Menguji respons bot"
+            f"`{p}help` - Menampilkan pesan bantuan ini",
+            f"`{p}info` - Menampilkan informasi tentang bot",
+            f"`{p}ping` - Menguji respons bot",
+            f"`{p}prefix <baru>` - Ganti prefix server ini (perlu izin Manage Server)"
         ]
         
         embed.add_field(name="Perintah Musik", value="\n".join(music_commands), inline=False)
         embed.add_field(name="Perintah Umum", value="\n".join(general_commands), inline=False)
-        embed.set_footer(text="Prefix: ! | Contoh: !play lagu favorit")
+        embed.set_footer(text=f"Prefix: {p} | Contoh: {p}play lagu favorit")
         
         await ctx.send(embed=embed)
     except Exception as e:
-        print(f"Error dalam perintah help: {e}")
+        command_log.exception("Error dalam perintah help")
         await ctx.send(f"Error: {e}")
-        traceback.print_exc()
 
 @bot.command(name="info", help="Menampilkan informasi tentang bot musik")
 async def info(ctx):
@@ -229,67 +112,100 @@ async def info(ctx):
         )
         
         embed.add_field(name="Server", value=f"{len(bot.guilds)}", inline=True)
-        embed.add_field(name="Prefix", value="!", inline=True)
+        embed.add_field(name="Prefix", value=ctx.prefix, inline=True)
         embed.add_field(name="Commands", value=f"{len(bot.commands)}", inline=True)
         embed.set_footer(text=f"ID: {bot.user.id}")
         
         await ctx.send(embed=embed)
     except Exception as e:
-        print(f"Error dalam perintah info: {e}")
+        command_log.exception("Error dalam perintah info")
         await ctx.send(f"Error: {e}")
-        traceback.print_exc()
+
+@bot.command(name="prefix", help="Menampilkan atau mengganti prefix perintah di server ini")
+@commands.guild_only()
+async def prefix(ctx, new_prefix: str = None):
+    """Tampilkan prefix server, atau ganti jika user punya izin Manage Server"""
+    if new_prefix is None:
+        await ctx.send(f"Prefix server ini: `{router.prefix_for(ctx.guild.id)}`")
+        return
+    if not ctx.author.guild_permissions.manage_guild:
+        await ctx.send("❌ Perlu izin Manage Server untuk mengganti prefix.")
+        return
+    try:
+        router.set_prefix(ctx.guild.id, new_prefix)
+    except ValueError as e:
+        await ctx.send(f"❌ {e}")
+        return
+    await ctx.send(f"✅ Prefix server ini sekarang `{new_prefix}`")
 
 # ----- EVENT HANDLERS -----
 
 @bot.event
 async def on_ready():
     """Event triggered when the bot is ready and connected to Discord"""
-    print(f"Logged in as {bot.user.name} (ID: {bot.user.id})")
-    print("------")
-    print(f"Discord API version: {discord.__version__}")
-    print(f"Jumlah server: {len(bot.guilds)}")
-    print(f"Daftar perintah saat ini: {[c.name for c in bot.commands]}")
+    log.info("Logged in as %s (ID: %s)", bot.user.name, bot.user.id,
+             extra={'discord_version': discord.__version__, 'guilds': len(bot.guilds),
+                    'commands': [c.name for c in bot.commands]})
     
     # Tambahkan status custom  
-    print("Mengubah presence bot...")  
     await bot.change_presence(activity=discord.Activity(
         type=discord.ActivityType.listening, 
-        name="!help | !play"
+        name=f"{router.default_prefix}help | {router.default_prefix}play"
     ))
-    print("Presence bot berhasil diubah")
+    log.info("Presence bot berhasil diubah")
 
 @bot.event
 async def on_disconnect():
     """Event triggered when the bot disconnects from Discord"""
-    logging.warning("Bot disconnected from Discord")
+    log.warning("Bot disconnected from Discord")
 
 @bot.event
 async def on_resumed():
     """Event triggered when the bot resumes connection to Discord"""
-    logging.info("Bot resumed connection to Discord")
+    log.info("Bot resumed connection to Discord")
 
 @bot.event
 async def on_message(message):
     """Event triggered when a message is received"""
+    # Log pesan hanya jika kategori bot.message diaktifkan (LOG_LEVELS) dan
+    # masih dalam batas sampling, supaya pesan biasa tidak diformat sama sekali
+    if message_log.isEnabledFor(logging.DEBUG) and not message.author.bot and message_sampler.allow():
+        message_log.debug("Pesan diterima", extra={
+            'content': message.content, 'author': str(message.author),
+            'guild': message.guild.id if message.guild else None, '_sampled': True})
+
+    # Hampir semua pesan bukan perintah: tolak dengan satu lookup set pada
+    # karakter pertamanya sebelum menyentuh apa pun lainnya
+    if message.content[:1] not in router.leading:
+        return
+
     # Ignore messages from bots to prevent potential loops
     if message.author.bot:
         return
-        
-    # Log all messages received for debugging
-    print(f"Pesan diterima: {message.content} dari {message.author}")
-    
-    # Proses perintah bot jika ini adalah perintah
-    if message.content.startswith('!'):
-        print(f"Mencoba menjalankan perintah: {message.content}")
-        await bot.process_commands(message)
+
+    await router.dispatch(message)
 
 @bot.event
 async def on_command_error(ctx, error):
     """Global error handler for command errors"""
-    print(f"Command error detected: {error}")
+    # Penolakan pembatas laju hanya dibalas sekali per jendela, supaya spam
+    # perintah tidak berubah menjadi spam balasan. Perintah yang tidak dikenal
+    # juga memakai token, kalau tidak spam `!asdf` dibalas satu per satu
+    if isinstance(error, commands.CommandNotFound):
+        error = limiter.check_unknown(ctx) or error
+    if isinstance(error, RateLimited):
+        if error.notify:
+            await ctx.send(f"⏳ Terlalu banyak perintah, coba lagi dalam {max(1, round(error.retry_after))} detik.")
+        return
+    if isinstance(error, Overloaded):
+        if error.notify:
+            await ctx.send("🚦 Bot sedang sibuk, coba lagi sebentar lagi.")
+        return
+
+    command_log.info("Command error detected: %s", error)
     
     if isinstance(error, commands.CommandNotFound):
-        await ctx.send(f"Perintah tidak ditemukan. Ketik `!help` untuk melihat daftar perintah.")
+        await ctx.send(f"Perintah tidak ditemukan. Ketik `{ctx.prefix}help` untuk melihat daftar perintah.")
         return
         
     if isinstance(error, commands.MissingRequiredArgument):
@@ -301,14 +217,11 @@ async def on_command_error(ctx, error):
         if "Cannot connect to voice" in str(error):
             await ctx.send("❌ Tidak dapat terhubung ke channel suara. Coba lagi nanti.")
         else:
-            logging.error(f"Command invoke error: {error}", exc_info=True)
+            command_log.error("Command invoke error: %s", error, exc_info=error)
             await ctx.send(f"Terjadi kesalahan: {error}")
     else:
-        logging.error(f"Command error: {error}", exc_info=True)
+        command_log.error("Command error: %s", error, exc_info=error)
         await ctx.send(f"Terjadi kesalahan: {error}")
-    
-    # Cetak traceback untuk semua error
-    traceback.print_exc()
 
 # Additional helper method to check if the bot is connected and ready
 def is_ready():
@@ -1,241 +1,367 @@
-from flask import Flask, render_template, jsonify
-from threading import Thread
-from bot import bot
-import discord
-import os
+import asyncio
+import importlib
 import logging
+import os
+import random
 import signal
 import sys
-import time
-import traceback
 
-# Set up logging for easier debugging
-logging.basicConfig(level=logging.INFO)
+from aiohttp import web
+
+from utils import metrics, startup
+from utils.log import setup_logging
+from utils.shards import ControlClient, ShardSupervisor, worker_command
+from utils.status import StatusSnapshot
+from utils.watchdog import watchdog_from_env
+
+# Startup bertahap (lihat utils.startup): modul di atas cukup untuk server
+# status, jadi /uptime sudah menjawab sebelum discord.py dan bot diimpor.
+# Bot dimuat di thread terpisah setelah server jalan, dan yt-dlp serta
+# libopus disiapkan di background setelah bot online.
+
+# Logging terstruktur lewat thread listener (lihat utils.log)
+setup_logging()
+log = logging.getLogger("main")
 
 # Get token from environment variable
 TOKEN = os.getenv("DISCORD_TOKEN")
 
-# Buat aplikasi Flask
-app = Flask(__name__)
+# Gunakan port 5001 untuk menghindari konflik dengan workflow "Start application"
+PORT = int(os.getenv("PORT", "5001"))
+
+# Batas backoff ketika bot harus dijalankan ulang (detik)
+RESTART_BACKOFF_MIN = 1
+RESTART_BACKOFF_MAX = 60
+
+# Jumlah proses worker shard. Lebih dari 1 berarti proses ini menjadi
+# supervisor yang menjalankan worker `main.py --worker` (lihat utils.shards).
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "1"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or SHARD_WORKERS
+CONTROL_SOCKET = os.getenv("CONTROL_SOCKET", f"/tmp/nero-control-{PORT}.sock")
+
+# Gateway palsu untuk menguji supervisor shard tanpa Discord: worker tidak
+# memuat bot dan melaporkan sejumlah guild ini per shard (0 = nonaktif)
+FAKE_GATEWAY_GUILDS = int(os.getenv("FAKE_GATEWAY_GUILDS", "0"))
 
-# Bot status variable for thread monitoring
-bot_running = True
-bot_thread = None
-bot_connected = False
+# Modul yang diimpor di tahap kedua: bot.py (discord.py) dan dependensi cog
+# musik, supaya setup_hook tidak memblokir event loop saat memuat cog
+BOT_MODULES = ('bot', 'utils.backend', 'utils.player', 'utils.playerstate', 'utils.voice')
+
+# Status bot. Semua diakses dari satu event loop, jadi tidak perlu lock.
 bot_status = "starting"
 
-@app.route('/')
-def home():
+# Diisi load_bot() setelah server status jalan
+bot = None
+discord = None
+audiobuffer = None
+
+# Task warm-up yt-dlp/libopus setelah bot online pertama kali
+warm_task = None
+
+# Klien control plane ketika proses ini berjalan sebagai worker shard
+control = None
+
+# Supervisor worker shard ketika SHARD_WORKERS > 1
+supervisor = None
+
+# Respons status yang sudah dirender, diperbarui oleh event bot
+snapshot = StatusSnapshot()
+
+# Pengukur lag event loop (LOOP_WATCHDOG=0 untuk mematikan, lihat utils.watchdog).
+# Nama perintah untuk laporan stall dipasang setelah bot dimuat.
+watchdog = watchdog_from_env()
+
+# Tolak perintah mahal selama event loop tertinggal (lihat utils.ratelimit)
+SHED_LOOP_LAG = float(os.getenv("SHED_LOOP_LAG_MS", "250")) / 1000
+
+def serve_snapshot(request):
+    """Kirim respons status yang sudah dirender, dengan dukungan ETag/304"""
+    rendered = snapshot.responses[request.path]
+    headers = {'ETag': rendered.etag, 'Cache-Control': 'no-cache'}
+    if request.headers.get('If-None-Match') == rendered.etag:
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=rendered.body, status=rendered.status,
+                        content_type=rendered.content_type, charset='utf-8',
+                        headers=headers)
+
+async def home(request):
     """Tampilkan halaman beranda"""
-    bot_status_class = "online" if bot_connected else "offline"
-    bot_status_text = "Bot Aktif" if bot_connected else "Bot Offline"
-    
-    return f"""
-    <html>
-        <head>
-            <title>Discord Music Bot</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    max-width: 800px;
-                    margin: 0 auto;
-                    padding: 20px;
-                    line-height: 1.6;
-                    background-color: #121212;
-                    color: #eee;
-                }}
-                h1, h2 {{
-                    color: #7289DA;
-                }}
-                .container {{
-                    background-color: #1e1e1e;
-                    border-radius: 8px;
-                    padding: 20px;
-                    box-shadow: 0 2px 10px rgba(0, 0, 0, 0.2);
-                }}
-                ul {{
-                    list-style-type: none;
-                    padding-left: 20px;
-                }}
-                li {{
-                    margin-bottom: 10px;
-                }}
-                code {{
-                    background-color: #2c2c2c;
-                    padding: 2px 6px;
-                    border-radius: 4px;
-                    font-family: monospace;
-                }}
-                .status {{
-                    display: inline-block;
-                    padding: 6px 12px;
-                    border-radius: 4px;
-                    font-weight: bold;
-                }}
-                .online {{
-                    background-color: #43b581;
-                }}
-                .offline {{
-                    background-color: #f04747;
-                }}
-                #status-refresh {{
-                    margin-top: 20px;
-                    font-size: 0.8em;
-                    color: #888;
-                }}
-            </style>
-            <script>
-                // Auto refresh status every 30 seconds
-                setTimeout(function() {{
-                    window.location.reload();
-                }}, 30000);
-            </script>
-        </head>
-        <body>
-            <div class="container">
-                <h1>Discord Music Bot</h1>
-                <p class="status {bot_status_class}">{bot_status_text}</p>
-                <p>Bot musik Discord yang mudah digunakan. Cukup tambahkan bot ke server Discord Anda dan mulai mainkan musik!</p>
-                
-                <h2>Perintah</h2>
-                <ul>
-                    <li><code>!play &lt;url atau kata kunci&gt;</code> - Putar lagu atau tambahkan ke antrian</li>
-                    <li><code>!pause</code> - Jeda lagu yang sedang diputar</li>
-                    <li><code>!resume</code> - Lanjutkan pemutaran lagu yang dijeda</li>
-                    <li><code>!skip</code> - Lewati lagu yang sedang diputar</li>
-                    <li><code>!queue</code> - Tampilkan antrian lagu saat ini</li>
-                    <li><code>!clear</code> - Bersihkan antrian lagu</li>
-                    <li><code>!volume &lt;0-100&gt;</code> - Atur level volume</li>
-                    <li><code>!now</code> - Tampilkan lagu yang sedang diputar</li>
-                    <li><code>!loop</code> - Aktifkan/nonaktifkan mode pengulangan</li>
-                    <li><code>!join</code> - Bergabung dengan channel suara Anda</li>
-                    <li><code>!leave</code> - Tinggalkan channel suara</li>
-                </ul>
-                
-                <h2>Cara Menggunakan</h2>
-                <ol>
-                    <li>Bergabunglah dengan channel suara di server Discord</li>
-                    <li>Ketik <code>!play</code> diikuti dengan URL YouTube atau kata kunci pencarian</li>
-                    <li>Bot akan bergabung dengan channel suara Anda dan mulai memutar musik</li>
-                    <li>Gunakan perintah lain untuk mengontrol pemutaran</li>
-                </ol>
-                
-                <p>Situs ini hanya status web untuk bot. Bot sebenarnya berjalan melalui Discord, bukan di sini.</p>
-                <p id="status-refresh">Status halaman diperbarui setiap 30 detik</p>
-            </div>
-        </body>
-    </html>
-    """
+    return serve_snapshot(request)
 
-@app.route('/status')
-def status():
+async def status(request):
     """Status API untuk bot"""
-    global bot_connected
-    
-    # Update bot connected status
-    bot_connected = bot and bot.is_ready() if hasattr(bot, 'is_ready') else False
-    
-    status_value = "online" if bot_connected else "offline"
-    
-    return jsonify({
-        'status': status_value,
-        'name': bot.user.name if bot.user else 'Unknown',
-        'id': str(bot.user.id) if bot.user and bot.user else 'Unknown',
-        'guilds': len(bot.guilds) if hasattr(bot, 'guilds') else 0
-    })
-
-@app.route('/uptime')
-def uptime():
+    return serve_snapshot(request)
+
+async def uptime(request):
     """Endpoint khusus untuk UptimeRobot"""
-    global bot_connected
-    
-    # Update bot connected status
-    bot_connected = bot and bot.is_ready() if hasattr(bot, 'is_ready') else False
-    
-    if bot_connected:
-        return "OK", 200
-    else:
-        return "Bot not connected", 500
-
-@bot.event
+    return serve_snapshot(request)
+
+async def health(request):
+    """Liveness untuk health check hosting: 200 begitu server status jalan"""
+    return web.json_response({'status': bot_status, 'stages': startup.stages},
+                             headers={'Cache-Control': 'no-cache'})
+
+async def metrics_endpoint(request):
+    """Metrik format Prometheus"""
+    return web.Response(text=metrics.REGISTRY.render(),
+                        content_type='text/plain', charset='utf-8',
+                        headers={'Cache-Control': 'no-cache'})
+
+async def loop_status(request):
+    """Persentil lag event loop dan call site yang paling sering memblokir"""
+    if watchdog is None:
+        return web.json_response({'enabled': False})
+    return web.json_response(dict(watchdog.summary(), enabled=True),
+                             headers={'Cache-Control': 'no-cache'})
+
+async def loop_profile(request):
+    """Sampel profiler event loop dalam format folded (untuk flamegraph)"""
+    if watchdog is None or not watchdog.profile_path:
+        return web.Response(status=404, text="Profiler tidak aktif (LOOP_PROFILE_PATH)")
+    return web.Response(text=watchdog.folded(), content_type='text/plain', charset='utf-8')
+
+async def audio_status(request):
+    """Statistik jitter buffer audio: total dan guild dengan underrun terbanyak"""
+    if audiobuffer is None:
+        return web.json_response({'loading': True}, status=503)
+    return web.json_response(audiobuffer.summary(), headers={'Cache-Control': 'no-cache'})
+
+async def shards(request):
+    """Status tiap worker shard (hanya ada di mode supervisor)"""
+    if supervisor is None:
+        return web.json_response({'workers': []})
+    return web.json_response(supervisor.summary())
+
+def create_app():
+    """Buat aplikasi web status"""
+    app = web.Application()
+    app.router.add_get('/', home)
+    app.router.add_get('/status', status)
+    app.router.add_get('/uptime', uptime)
+    app.router.add_get('/health', health)
+    app.router.add_get('/metrics', metrics_endpoint)
+    app.router.add_get('/shards', shards)
+    app.router.add_get('/loop', loop_status)
+    app.router.add_get('/loop/profile', loop_profile)
+    app.router.add_get('/audio', audio_status)
+    return app
+
+def publish_status(connected=None):
+    """Perbarui snapshot status dan laporkan ke supervisor jika worker"""
+    snapshot.update_from_bot(bot, connected)
+    if control is not None:
+        if connected is None:
+            connected = bot.is_ready() and not bot.is_closed()
+        control.report(
+            ready=connected,
+            guilds=len(bot.guilds),
+            name=bot.user.name if bot.user else None,
+            user_id=bot.user.id if bot.user else None,
+            latency=None if bot.latency != bot.latency else round(bot.latency, 4),
+        )
+
 async def on_ready():
     """Update status when bot connects"""
-    global bot_connected, bot_status
-    bot_connected = True
+    global bot_status, warm_task
     bot_status = "online"
-    print(f"Logged in as {bot.user.name} (ID: {bot.user.id})")
-    print("------")
-
-def run_flask():
-    """Menjalankan server Flask"""
-    # Gunakan port 5001 untuk menghindari konflik dengan workflow "Start application"
-    app.run(host='0.0.0.0', port=5001)
-
-def run_discord_bot():
-    """Menjalankan bot Discord"""
-    global bot_running, bot_status
-    
+    publish_status()
+    log.info("Logged in as %s (ID: %s)", bot.user.name, bot.user.id)
+    startup.mark('ready')
+    if warm_task is None:
+        warm_task = asyncio.create_task(warm_up())
+
+async def on_disconnect():
+    global bot_status
+    bot_status = "reconnecting"
+    publish_status(connected=False)
+
+async def on_resumed():
+    global bot_status
+    bot_status = "online"
+    publish_status()
+
+async def on_guild_join(guild):
+    publish_status()
+
+async def on_guild_remove(guild):
+    publish_status()
+
+def import_modules(names):
+    """Impor modul berat; dijalankan di thread supaya event loop tetap melayani"""
+    for name in names:
+        importlib.import_module(name)
+
+async def load_bot():
+    """Tahap kedua startup: impor discord.py, bot dan cog musik di background"""
+    global bot, discord, audiobuffer
+    if bot is not None:
+        return
+    await asyncio.to_thread(import_modules, BOT_MODULES)
+    import discord
+    from bot import bot as loaded
+    from utils import audiobuffer
+    from utils.ratelimit import limiter
+
+    if watchdog is not None:
+        watchdog.commands = loaded.walk_commands
+        if SHED_LOOP_LAG > 0:
+            limiter.watch('loop_lag', watchdog.recent_lag, SHED_LOOP_LAG)
+
+    # Pakai listener supaya handler event di bot.py tidak tertimpa
+    loaded.add_listener(on_ready)
+    loaded.add_listener(on_disconnect)
+    loaded.add_listener(on_resumed)
+    loaded.add_listener(on_guild_join)
+    loaded.add_listener(on_guild_remove)
+    bot = loaded
+    startup.mark('loaded')
+
+async def warm_up():
+    """Tahap terakhir startup: siapkan yt-dlp dan libopus sebelum !play pertama"""
+    from utils.audio import load_opus
+    from utils.ytdl import YTDLSource
+
+    try:
+        await asyncio.gather(YTDLSource.warm(), asyncio.to_thread(load_opus))
+    except Exception as e:
+        log.warning("Warm-up gagal: %s", e)
+    startup.mark('warm')
+
+async def supervise_bot(stop):
+    """Jalankan bot dan restart dengan exponential backoff jika berhenti
+
+    discord.py sudah menangani reconnect gateway sendiri; supervisor ini hanya
+    bereaksi ketika `bot.start()` benar-benar keluar karena error, tanpa
+    polling. Berhenti ketika event `stop` di-set atau token tidak valid.
+    """
+    global bot_status
+
     if not TOKEN:
-        print("Error: No DISCORD_TOKEN found in environment variables")
-        print("Please set your Discord bot token as an environment variable named DISCORD_TOKEN")
+        log.error("No DISCORD_TOKEN found in environment variables. "
+                  "Please set your Discord bot token as an environment variable named DISCORD_TOKEN")
         bot_status = "error_no_token"
         return
-    
+
+    backoff = RESTART_BACKOFF_MIN
+    stop_task = asyncio.create_task(stop.wait())
     try:
-        print("Starting music bot...")
-        print(f"Discord Token available: {bool(TOKEN)}")
-        print(f"Token length: {len(TOKEN) if TOKEN else 0}")
-        print(f"First 5 chars of token: {TOKEN[:5]}..." if TOKEN and len(TOKEN) > 5 else "Invalid token")
-        
-        bot_status = "starting"
-        bot.run(TOKEN)
-    except discord.errors.LoginFailure as e:
-        print(f"Discord login failed: {e}")
-        print("Please check your Discord token and make sure it's valid")
-        bot_status = "error_login_failed"
-    except Exception as e:
-        print(f"Bot error: {e}")
-        import traceback
-        traceback.print_exc()
-        bot_status = "error"
+        while not stop.is_set():
+            log.info("Starting music bot...")
+            bot_status = "starting"
+            if bot.is_closed():
+                # Client yang sudah ditutup harus di-reset sebelum start lagi,
+                # termasuk connector HTTP yang ikut tertutup bersama sesinya
+                bot.clear()
+                if bot.http.connector is not discord.utils.MISSING and bot.http.connector.closed:
+                    bot.http.connector = discord.utils.MISSING
+
+            bot_task = asyncio.create_task(bot.start(TOKEN))
+            await asyncio.wait({bot_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+            if stop.is_set():
+                break
+
+            # Backoff kembali ke awal jika bot sempat online sebelum berhenti
+            if bot_status == "online":
+                backoff = RESTART_BACKOFF_MIN
+            try:
+                bot_task.result()
+                log.warning("Bot stopped, restarting...")
+                bot_status = "stopped"
+            except discord.errors.LoginFailure as e:
+                log.error("Discord login failed: %s. Please check your Discord token "
+                          "and make sure it's valid", e)
+                bot_status = "error_login_failed"
+                return
+            except Exception as e:
+                log.error("Bot error: %s", e, exc_info=e)
+                bot_status = "error"
+
+            if not bot.is_closed():
+                await bot.close()
+            publish_status()
+            delay = backoff * random.uniform(0.8, 1.2)
+            log.info("Restarting bot in %.1fs...", delay)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
     finally:
-        bot_running = False
+        stop_task.cancel()
+        if not bot.is_closed():
+            await bot.close()
         bot_status = "stopped"
+        publish_status()
+
+def supervisor_changed(sup):
+    """Salin status gabungan semua worker ke snapshot endpoint web"""
+    name, user_id = sup.identity()
+    snapshot.update(connected=sup.ready, name=name, user_id=user_id, guilds=sup.guilds)
+
+async def fake_gateway(stop):
+    """Worker tanpa Discord: laporkan guild sintetis sampai dihentikan"""
+    shard_ids = [int(i) for i in os.environ.get("SHARD_IDS", "").split(',') if i]
+    control.report(ready=True, guilds=len(shard_ids) * FAKE_GATEWAY_GUILDS,
+                   name="fake-gateway", user_id=1, latency=0.0)
+    await stop.wait()
+
+async def run_worker(stop):
+    """Mode worker shard: jalankan bot dan lapor ke supervisor, tanpa server web"""
+    global control
+    control = ControlClient(CONTROL_SOCKET, int(os.environ["WORKER_ID"]))
+    control_task = asyncio.create_task(control.run())
+    try:
+        if FAKE_GATEWAY_GUILDS:
+            await fake_gateway(stop)
+        else:
+            await load_bot()
+            publish_status()
+            await supervise_bot(stop)
+    finally:
+        control_task.cancel()
+        control.close()
 
-def signal_handler(sig, frame):
-    """Handle process termination gracefully"""
-    global bot_running
-    print("Shutting down bot and webserver...")
-    bot_running = False
-    sys.exit(0)
-
-# Set up signal handlers
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
-
-def monitor_bot():
-    """Monitor bot thread and restart if needed"""
-    global bot_thread, bot_running
-    
-    while True:
-        if bot_thread is None or not bot_thread.is_alive():
-            if bot_running:
-                print("Bot thread not running, restarting...")
-                bot_thread = Thread(target=run_discord_bot)
-                bot_thread.daemon = True
-                bot_thread.start()
-        time.sleep(10)  # Check every 10 seconds
+async def run_server(stop):
+    """Jalankan server status, lalu bot atau supervisor worker shard"""
+    global supervisor
+
+    runner = web.AppRunner(create_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '0.0.0.0', PORT).start()
+    log.info("Status server berjalan di port %s", PORT)
+    startup.mark('healthy')
+
+    try:
+        if SHARD_WORKERS > 1:
+            # Supervisor tidak menjalankan bot sendiri, jadi discord.py tidak dimuat
+            supervisor = ShardSupervisor(SHARD_WORKERS, SHARD_COUNT, worker_command(),
+                                         CONTROL_SOCKET, on_change=supervisor_changed)
+            await supervisor.run(stop)
+        else:
+            await load_bot()
+            await supervise_bot(stop)
+            # Tanpa bot (misalnya token kosong) server status tetap hidup
+            await stop.wait()
+    finally:
+        log.info("Shutting down bot and webserver...")
+        await runner.cleanup()
+
+async def main():
+    """Jalankan server status dan bot Discord di satu event loop"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    if watchdog is not None:
+        watchdog.start()
+    try:
+        if "--worker" in sys.argv:
+            return await run_worker(stop)
+        await run_server(stop)
+    finally:
+        if watchdog is not None:
+            watchdog.stop()
 
 if __name__ == "__main__":
-    # Jalankan bot Discord di thread terpisah
-    bot_thread = Thread(target=run_discord_bot)
-    bot_thread.daemon = True  # Make thread a daemon so it exits when the main process exits
-    bot_thread.start()
-    
-    # Start the monitor thread
-    monitor_thread = Thread(target=monitor_bot)
-    monitor_thread.daemon = True
-    monitor_thread.start()
-    
-    # Jalankan server Flask di thread utama
-    run_flask()
+    asyncio.run(main())
@@ -1,115 +1,489 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 import asyncio
 import logging
-import traceback
-from utils.ytdl import YTDLSource
-
-# Fungsi music commands yang akan diimpor langsung ke bot.py
-
-async def join(ctx, *, channel: discord.VoiceChannel = None):
-    """Bergabung dengan channel suara"""
-    if not channel and not ctx.author.voice:
-        return await ctx.send("Kamu tidak terhubung ke channel suara.")
-        
-    channel = channel or ctx.author.voice.channel
-    
-    if ctx.voice_client:
-        if ctx.voice_client.channel.id == channel.id:
+import os
+import time
+
+from utils import metrics
+from utils.backend import DiscordBackend
+from utils.player import Track, get_player, players
+from utils.playerstate import store_from_env
+from utils.ratelimit import limiter
+from utils.voice import sessions_from_env
+
+# Cog perintah musik.
+#
+# Semua perintah musik ada di sini dan hanya bicara dengan PlaybackBackend
+# (lihat utils.backend), jadi cog yang sama dipakai bot produksi (lewat
+# DiscordBackend) dan load test (lewat FakeBackend) tanpa koneksi Discord.
+
+command_log = logging.getLogger("bot.command")
+
+# BOT_DEBUG=1 menampilkan rincian waktu tiap tahap di balasan !play
+DEBUG = os.getenv("BOT_DEBUG", "0") == "1"
+
+# PLAY_FAST_START=0 mematikan ekstraksi paralel dengan koneksi voice di !play
+FAST_START = os.getenv("PLAY_FAST_START", "1") == "1"
+
+# Jumlah guild per detik yang dipulihkan setelah restart, dan jeda (detik)
+# penyimpanan posisi lagu yang sedang diputar (lihat utils.playerstate)
+RESUME_RATE = float(os.getenv("PLAYER_RESUME_RATE", "2"))
+CHECKPOINT_INTERVAL = float(os.getenv("PLAYER_CHECKPOINT_INTERVAL", "10"))
+
+# Jumlah ekstraksi yang menunggu slot sebelum perintah mahal (play, join)
+# ditolak sementara (lihat utils.ratelimit); 0 untuk mematikan
+SHED_EXTRACT_BACKLOG = int(os.getenv("SHED_EXTRACT_BACKLOG", "50"))
+
+# Batas waktu (detik) saran autocomplete slash command; Discord membuang
+# jawaban yang datang setelah 3 detik
+AUTOCOMPLETE_TIMEOUT = float(os.getenv("AUTOCOMPLETE_TIMEOUT", "2"))
+
+# Label tahap time-to-first-audio untuk balasan debug
+STAGE_LABELS = (('connect', 'koneksi'), ('extract', 'ekstraksi'),
+                ('open', 'ffmpeg'), ('total', 'total'))
+
+
+def discard_prefetch(task):
+    """Batalkan resolve fast-start yang tidak jadi dipakai dan tutup source-nya"""
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled() and task.exception() is None:
+        task.result().source.cleanup()
+
+
+def format_duration(seconds):
+    if not seconds:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def format_timings(timings):
+    """Rincian waktu tahap play untuk balasan debug"""
+    parts = [f"{label} {timings[stage] * 1000:.0f}ms"
+             for stage, label in STAGE_LABELS if stage in timings]
+    return "`" + " · ".join(parts) + "`"
+
+
+class Music(commands.Cog):
+    """Perintah musik: join, play, search, pause, resume, skip, leave, volume, queue, now
+
+    Jika `store` (PlayerStore) diisi, state setiap player disimpan ke disk dan
+    dipulihkan setelah bot restart. Koneksi voice dikelola `sessions`
+    (VoiceSessions, default dari env).
+    """
+
+    def __init__(self, bot, backend, store=None, sessions=None):
+        self.bot = bot
+        self.backend = backend
+        self.store = store
+        self.sessions = sessions or sessions_from_env(backend)
+        self.sessions.on_idle = self.reclaim_guild
+        self.sessions.on_reconnect = self.reattach_player
+        self._tasks = []
+
+    async def cog_load(self):
+        if SHED_EXTRACT_BACKLOG > 0:
+            limiter.watch('extract_backlog', self.backend.backlog, SHED_EXTRACT_BACKLOG)
+        if self.store is not None:
+            self._tasks.append(asyncio.create_task(self.restore_players()))
+            self._tasks.append(asyncio.create_task(self.checkpoint_loop()))
+
+    async def cog_unload(self):
+        limiter.unwatch('extract_backlog')
+        self.sessions.close()
+        for task in self._tasks:
+            task.cancel()
+        if self.store is None:
             return
-        await ctx.voice_client.move_to(channel)
-    else:
+        # Bot berhenti (bukan !leave): simpan posisi terakhir lalu lepas player
+        # tanpa menghapus state tersimpannya
+        for player in list(players.values()):
+            self.store.checkpoint(player)
+            player.observer = None
+            player.destroy()
+        # close() menyimpan semua perubahan yang masih antri sebelum menutup
+        # database; extension yang dimuat ulang membuka store baru
+        await asyncio.to_thread(self.store.close)
+
+    # ----- helper -----
+
+    async def resolve_track(self, track, timings=None):
+        """Resolver untuk GuildPlayer: cari dan buka source lewat backend"""
+        player = players.get(track.guild_id)
+        return await self.backend.resolve(track, volume=player.volume if player else 1.0,
+                                          timings=timings)
+
+    async def connect_voice(self, channel, timings=None):
+        """Sambungkan (atau pindahkan) voice ke channel lewat VoiceSessions"""
+        return await self.sessions.ensure(channel, timings)
+
+    def reclaim_guild(self, guild_id):
+        """Sesi voice guild ditutup (idle atau terputus): lepas player dan ekstraksinya"""
+        player = players.get(guild_id)
+        if player is not None:
+            player.destroy()
+        self.backend.cancel_guild(guild_id)
+
+    def reattach_player(self, guild_id, voice):
+        """Voice tersambung lagi: player melanjutkan antrian dengan voice baru"""
+        player = players.get(guild_id)
+        if player is not None:
+            player.attach(voice)
+
+    async def suggest(self, interaction, current, value):
+        """Pilihan autocomplete dari riwayat putar; `value(hasil)` jadi nilai pilihan"""
+        if len(current.strip()) < 2:
+            return []
         try:
-            await channel.connect()
+            results = await asyncio.wait_for(
+                self.backend.search(current, guild_id=interaction.guild_id, limit=25),
+                AUTOCOMPLETE_TIMEOUT)
         except Exception as e:
-            return await ctx.send(f"Tidak dapat terhubung ke channel suara: {e}")
-        
-    await ctx.send(f"Bergabung ke {channel.name}")
-
-async def play(ctx, *, query):
-    """Putar lagu dari URL atau kata kunci pencarian"""
-    # Bergabung dengan channel suara pengguna jika belum terhubung
-    if not ctx.voice_client:
-        if not ctx.author.voice:
-            return await ctx.send("Kamu tidak terhubung ke channel suara.")
+            # Tidak ada saran lebih baik daripada interaksi yang gagal
+            command_log.warning("Autocomplete gagal untuk %r: %s", current, e)
+            return []
+        return [app_commands.Choice(name=result['title'][:100], value=value(result))
+                for result in results if len(value(result)) <= 100]
+
+    def player_for(self, ctx):
+        """Ambil player antrian untuk guild dari context perintah"""
+        return self._player(ctx.guild.id, self.backend.voice_client(ctx))
+
+    def _player(self, guild_id, voice):
+        player = get_player(guild_id, asyncio.get_running_loop(), self.resolve_track, voice)
+        if self.store is not None and player.observer is None:
+            player.observer = self.store.observe
+        return player
+
+    async def ingest_playlist(self, ctx, player, query):
+        """Masukkan entri playlist ke antrian secara bertahap di background"""
+        entries = self.backend.iter_playlist(query, guild_id=ctx.guild.id, owner=ctx.author.id)
+        tracks = (
+            Track(entry['url'], requester=ctx.author, channel=ctx.channel, ctx=ctx,
+                  title=entry['title'])
+            async for entry in entries
+        )
         try:
-            await ctx.author.voice.channel.connect()
+            count = await player.extend(tracks)
+            await ctx.send(f"📃 {count} lagu dari playlist ditambahkan ke antrian")
         except Exception as e:
-            return await ctx.send(f"Tidak dapat terhubung ke channel suara: {e}")
-    
-    # Kirim pesan menunggu
-    async with ctx.typing():
+            await ctx.send(f"Gagal memuat playlist: {e}")
+
+    # ----- state tersimpan -----
+
+    async def restore_players(self):
+        """Masuk lagi ke channel suara dan lanjutkan antrian dari sebelum restart
+
+        Guild dipulihkan satu per satu dengan batas RESUME_RATE per detik
+        supaya restart tidak membanjiri gateway voice dan ekstraksi. Hanya
+        lagu yang sedang diputar yang langsung dibuka; antrian sisanya
+        di-resolve seperti biasa ketika mendekati gilirannya.
+        """
+        await self.bot.wait_until_ready()
+        states = await asyncio.to_thread(self.store.load)
+        if not states:
+            return
+        command_log.info("Memulihkan %d player dari state tersimpan", len(states))
+        restored = 0
+        for guild_id, state in states.items():
+            try:
+                if not await self.restore_player(guild_id, state):
+                    # Tidak ada koneksi voice yang dibuka; tidak perlu dijeda
+                    continue
+                restored += 1
+            except Exception:
+                command_log.exception("Gagal memulihkan player guild %s", guild_id)
+                self.store.forget(guild_id)
+            await asyncio.sleep(1 / RESUME_RATE)
+        command_log.info("%d dari %d player dipulihkan", restored, len(states))
+
+    async def restore_player(self, guild_id, state):
+        """Pulihkan satu guild; False jika tidak ada yang perlu dilanjutkan
+
+        State hanya dihapus untuk guild yang terlihat dan channel suaranya
+        kosong. Guild milik shard lain (store dipakai bersama) atau yang
+        sedang tidak tersedia dilewati tanpa menyentuh state-nya.
+        """
+        guild = self.bot.get_guild(guild_id)
+        if guild is None or guild.unavailable:
+            return False
+        if players.get(guild_id) is not None:
+            # Sudah dipakai lagi sejak bot hidup; state-nya milik player baru
+            return False
+        voice_channel = guild.get_channel(state['voice_channel'] or 0)
+        listeners = voice_channel is not None and any(not m.bot for m in voice_channel.members)
+        rows = ([dict(state['current'], start=state['position'])] if state['current'] else []) \
+            + state['queue']
+        if not listeners or not rows:
+            # Channel kosong (atau sudah dihapus): tidak ada yang dilanjutkan
+            self.store.forget(guild_id)
+            return False
+
+        text_channel = guild.get_channel(state['text_channel'] or 0)
+        # Setelah restart belum ada voice client; bot.close() memutus semuanya
+        voice = await self.connect_voice(voice_channel)
+        player = self._player(guild_id, voice)
+        player.volume = state['volume']
+        tracks = []
+        for row in rows:
+            track = Track(row['query'], requester=row.get('requester'), channel=text_channel,
+                          title=row.get('title'), data=row.get('data'),
+                          start=row.get('start', 0.0), guild_id=guild_id)
+            track.seq = row.get('seq')
+            tracks.append(track)
+        await player.restore(tracks)
+        return True
+
+    async def checkpoint_loop(self):
+        """Simpan posisi lagu yang sedang diputar secara berkala"""
+        while True:
+            await asyncio.sleep(CHECKPOINT_INTERVAL)
+            for player in list(players.values()):
+                if player.observer is not None:
+                    self.store.checkpoint(player)
+
+    # ----- perintah -----
+
+    @commands.command(name="join", help="Bergabung dengan channel suara")
+    async def join(self, ctx, *, channel: discord.VoiceChannel = None):
+        """Bergabung dengan channel suara"""
+        command_log.info("Menjalankan perintah join dari %s", ctx.author)
+        if not channel and not ctx.author.voice:
+            return await ctx.send("Kamu tidak terhubung ke channel suara.")
+
+        channel = channel or ctx.author.voice.channel
+        voice = self.backend.voice_client(ctx)
+        if voice and voice.channel.id == channel.id:
+            return
+
+        # Voice yang sudah tersambung dipindah dengan move_to
         try:
-            # Cari lagu
-            source = await YTDLSource.create_source(ctx, query, loop=ctx.bot.loop)
-            
-            # Tambahkan ke antrian
-            # Untuk sementara kita mainkan langsung saja tanpa antrian
-            
-            if ctx.voice_client.is_playing():
-                await ctx.send(f"Menambahkan ke antrian: **{source.title}**")
-            else:
-                ctx.voice_client.play(
-                    source.source,
-                    after=lambda e: print(f'Player error: {e}') if e else None
-                )
-                await ctx.send(f"▶️ Memutar: **{source.title}**")
-                
+            await self.connect_voice(channel)
         except Exception as e:
-            await ctx.send(f"Terjadi kesalahan: {e}")
-            traceback.print_exc()
-
-async def pause(ctx):
-    """Jeda lagu yang sedang diputar"""
-    if not ctx.voice_client or not ctx.voice_client.is_playing():
-        return await ctx.send("Tidak ada lagu yang sedang diputar.")
-        
-    if ctx.voice_client.is_paused():
-        return await ctx.send("Lagu sudah dijeda.")
-        
-    ctx.voice_client.pause()
-    await ctx.send("⏸️ Menjedakan pemutaran")
-
-async def resume(ctx):
-    """Lanjutkan pemutaran lagu yang dijeda"""
-    if not ctx.voice_client:
-        return await ctx.send("Bot tidak terhubung ke channel suara.")
-        
-    if not ctx.voice_client.is_paused():
-        return await ctx.send("Lagu tidak dijeda.")
-        
-    ctx.voice_client.resume()
-    await ctx.send("▶️ Melanjutkan pemutaran")
-
-async def skip(ctx):
-    """Lewati lagu yang sedang diputar"""
-    if not ctx.voice_client or not ctx.voice_client.is_playing():
-        return await ctx.send("Tidak ada lagu yang sedang diputar.")
-        
-    ctx.voice_client.stop()
-    await ctx.send("⏭️ Melewati lagu")
-
-async def leave(ctx):
-    """Tinggalkan channel suara"""
-    if not ctx.voice_client:
-        return await ctx.send("Bot tidak dalam channel suara.")
-        
-    await ctx.voice_client.disconnect()
-    await ctx.send("👋 Meninggalkan channel suara")
-
-async def volume(ctx, volume: int):
-    """Atur volume pemutaran (0-100)"""
-    if not ctx.voice_client or not getattr(ctx.voice_client, 'source', None):
-        return await ctx.send("Tidak ada lagu yang sedang diputar.")
-        
-    if not 0 <= volume <= 100:
-        return await ctx.send("Volume harus antara 0 dan 100.")
-        
-    # Konversi ke float antara 0 dan 1
-    volume_float = volume / 100
-    
-    # Atur volume
-    if hasattr(ctx.voice_client.source, 'volume'):
-        ctx.voice_client.source.volume = volume_float
-        
-    await ctx.send(f"🔊 Volume diatur ke {volume}%")
\ No newline at end of file
+            return await ctx.send(f"Tidak dapat terhubung ke channel suara: {e}")
+
+        await ctx.send(f"Bergabung ke {channel.name}")
+
+    @commands.hybrid_command(name="play", help="Putar lagu dari URL atau kata kunci")
+    async def play(self, ctx, *, query):
+        """Putar lagu dari URL atau kata kunci pencarian"""
+        command_log.info("Menjalankan perintah play dari %s: %s", ctx.author, query)
+        started = time.perf_counter()
+        timings = {}
+        if not self.backend.voice_client(ctx) and not ctx.author.voice:
+            return await ctx.send("Kamu tidak terhubung ke channel suara.")
+
+        # Kirim pesan menunggu
+        async with ctx.typing():
+            try:
+                is_playlist = self.backend.is_playlist(query)
+                track = None if is_playlist else Track(
+                    query, requester=ctx.author, channel=ctx.channel, ctx=ctx)
+
+                # Fast start: jika tidak ada yang diputar, ekstraksi dan pembukaan
+                # FFmpeg berjalan bersamaan dengan koneksi ke channel suara
+                current = players.get(ctx.guild.id)
+                prefetch = None
+                if FAST_START and track is not None and (current is None or not current.is_active()):
+                    prefetch = asyncio.ensure_future(self.resolve_track(track, timings))
+
+                # Bergabung dengan channel suara pengguna jika belum terhubung
+                if not self.backend.voice_client(ctx):
+                    try:
+                        await self.connect_voice(ctx.author.voice.channel, timings)
+                    except Exception as e:
+                        if prefetch is not None:
+                            discard_prefetch(prefetch)
+                        return await ctx.send(f"Tidak dapat terhubung ke channel suara: {e}")
+
+                player = self.player_for(ctx)
+
+                # Selama menunggu voice, play lain di guild ini bisa sudah mulai
+                # memutar: track ini masuk antrian tanpa source yang terbuka dan
+                # dimuat ulang saat gilirannya
+                if prefetch is not None and player.is_active():
+                    discard_prefetch(prefetch)
+                    prefetch = None
+
+                # Playlist dimuat bertahap, lagu pertama diputar begitu siap
+                if is_playlist:
+                    player.spawn(self.ingest_playlist(ctx, player, query))
+                    return await ctx.send("📃 Memuat playlist...")
+
+                if prefetch is not None:
+                    try:
+                        track.resolved = await prefetch
+                    except Exception as e:
+                        command_log.warning("Gagal memuat %s: %s", query, e)
+                        return await ctx.send(f"Gagal memuat **{query}**: {e}")
+                    track.title = track.resolved.title or track.title
+                    if player.is_active():
+                        track.cleanup()
+
+                # Mainkan langsung jika player idle, selain itu tambahkan ke antrian
+                if await player.add(track):
+                    timings['total'] = time.perf_counter() - started
+                    metrics.TIME_TO_FIRST_AUDIO.observe(timings['total'])
+                    for stage, seconds in timings.items():
+                        metrics.PLAY_STAGE_LATENCY.observe(seconds, stage=stage)
+                    reply = f"▶️ Memutar: **{track.title}**"
+                    if DEBUG:
+                        reply += "\n" + format_timings(timings)
+                    await ctx.send(reply)
+                elif track in player.queue:
+                    await ctx.send(f"Menambahkan ke antrian: **{track.title}**")
+
+            except Exception as e:
+                await ctx.send(f"Terjadi kesalahan: {e}")
+                command_log.exception("Error dalam perintah play")
+
+    @play.autocomplete('query')
+    async def play_autocomplete(self, interaction, current):
+        return await self.suggest(interaction, current, lambda result: result['webpage_url'])
+
+    @commands.hybrid_command(name="search", help="Cari lagu yang pernah diputar")
+    async def search_history(self, ctx, *, query):
+        """Cari lagu di riwayat putar (indeks lokal), tanpa pencarian online"""
+        command_log.info("Menjalankan perintah search dari %s: %s", ctx.author, query)
+        results = await self.backend.search(query, guild_id=ctx.guild.id if ctx.guild else None)
+        if not results:
+            return await ctx.send(f"Tidak ada lagu di riwayat yang cocok dengan **{query}**. "
+                                  f"Pakai `{ctx.prefix}play {query}` untuk mencari online.")
+        lines = [f"🔎 Riwayat untuk **{query}**:"]
+        for i, result in enumerate(results, start=1):
+            lines.append(f"{i}. {result['title']} ({format_duration(result['duration'])})"
+                         f" · diputar {result['plays']}x")
+        await ctx.send("\n".join(lines))
+
+    @search_history.autocomplete('query')
+    async def search_autocomplete(self, interaction, current):
+        return await self.suggest(interaction, current, lambda result: result['title'][:100])
+
+    @commands.command(name="pause", help="Jedakan lagu yang sedang diputar")
+    async def pause(self, ctx):
+        """Jeda lagu yang sedang diputar"""
+        command_log.info("Menjalankan perintah pause dari %s", ctx.author)
+        voice = self.backend.voice_client(ctx)
+        if not voice or not voice.is_playing():
+            return await ctx.send("Tidak ada lagu yang sedang diputar.")
+
+        if voice.is_paused():
+            return await ctx.send("Lagu sudah dijeda.")
+
+        voice.pause()
+        await ctx.send("⏸️ Menjedakan pemutaran")
+
+    @commands.command(name="resume", help="Lanjutkan pemutaran lagu yang dijeda")
+    async def resume(self, ctx):
+        """Lanjutkan pemutaran lagu yang dijeda"""
+        command_log.info("Menjalankan perintah resume dari %s", ctx.author)
+        voice = self.backend.voice_client(ctx)
+        if not voice:
+            return await ctx.send("Bot tidak terhubung ke channel suara.")
+
+        if not voice.is_paused():
+            return await ctx.send("Lagu tidak dijeda.")
+
+        voice.resume()
+        await ctx.send("▶️ Melanjutkan pemutaran")
+
+    @commands.command(name="skip", help="Lewati lagu yang sedang diputar")
+    async def skip(self, ctx):
+        """Lewati lagu yang sedang diputar"""
+        command_log.info("Menjalankan perintah skip dari %s", ctx.author)
+        voice = self.backend.voice_client(ctx)
+        if not voice or not voice.is_playing():
+            return await ctx.send("Tidak ada lagu yang sedang diputar.")
+
+        # Callback after dari player akan memutar lagu berikutnya di antrian
+        self.player_for(ctx).skip()
+        await ctx.send("⏭️ Melewati lagu")
+
+    @commands.command(name="leave", help="Tinggalkan channel suara")
+    async def leave(self, ctx):
+        """Tinggalkan channel suara"""
+        command_log.info("Menjalankan perintah leave dari %s", ctx.author)
+        voice = self.backend.voice_client(ctx)
+        if not voice:
+            return await ctx.send("Bot tidak dalam channel suara.")
+
+        player = players.get(ctx.guild.id)
+        if player:
+            player.destroy()
+        # Ekstraksi yang masih menunggu untuk guild ini tidak diperlukan lagi
+        self.backend.cancel_guild(ctx.guild.id)
+        await self.sessions.release(ctx.guild.id, voice)
+        await ctx.send("👋 Meninggalkan channel suara")
+
+    @commands.command(name="volume", help="Atur volume pemutaran (0-100)")
+    async def volume(self, ctx, volume: int):
+        """Atur volume pemutaran (0-100)"""
+        command_log.info("Menjalankan perintah volume dari %s: %s", ctx.author, volume)
+        voice = self.backend.voice_client(ctx)
+        if not voice or not getattr(voice, 'source', None):
+            return await ctx.send("Tidak ada lagu yang sedang diputar.")
+
+        if not 0 <= volume <= 100:
+            return await ctx.send("Volume harus antara 0 dan 100.")
+
+        # Konversi ke float antara 0 dan 1
+        volume_float = volume / 100
+
+        # Atur volume (juga disimpan untuk lagu berikutnya di antrian)
+        self.player_for(ctx).set_volume(volume_float)
+
+        await ctx.send(f"🔊 Volume diatur ke {volume}%")
+
+    @commands.command(name="queue", help="Tampilkan antrian lagu")
+    async def queue(self, ctx):
+        """Tampilkan antrian lagu saat ini"""
+        command_log.info("Menjalankan perintah queue dari %s", ctx.author)
+        player = players.get(ctx.guild.id)
+        if not player or (not player.current and not player.queue):
+            return await ctx.send("Antrian kosong.")
+
+        lines = []
+        if player.current:
+            lines.append(f"▶️ Sedang diputar: **{player.current.title}**")
+        for i, track in enumerate(player.upcoming(10), start=1):
+            lines.append(f"{i}. {track.title}")
+        if len(player.queue) > 10:
+            lines.append(f"... dan {len(player.queue) - 10} lagu lainnya")
+
+        await ctx.send("\n".join(lines))
+
+    @commands.command(name="now", help="Tampilkan lagu yang sedang diputar")
+    async def now_playing(self, ctx):
+        """Tampilkan informasi lagu yang sedang diputar"""
+        command_log.info("Menjalankan perintah now dari %s", ctx.author)
+        player = players.get(ctx.guild.id)
+        if not self.backend.voice_client(ctx) or not player or not player.current:
+            return await ctx.send("Tidak ada lagu yang sedang diputar.")
+
+        track = player.current
+        requester = f" (diminta oleh {track.requester})" if track.requester else ""
+        await ctx.send(f"▶️ Sedang diputar: **{track.title}**{requester}")
+
+    # ----- event -----
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        """Lacak sesi voice bot dan batalkan ekstraksi milik user yang keluar"""
+        if self.bot.user is not None and member.id == self.bot.user.id:
+            self.sessions.self_update(member.guild.id, before, after)
+            return
+        if before.channel == after.channel:
+            # Hanya mute/deafen
+            return
+        if before.channel is not None and after.channel is None and not member.bot:
+            self.backend.cancel_owner(member.guild.id, member.id)
+        # Pendengar bertambah atau berkurang: mulai/batalkan hitung mundur idle
+        self.sessions.member_update(member.guild.id)
+
+
+async def setup(bot):
+    """Entry point extension: pasang cog musik dengan backend discord.py"""
+    await bot.add_cog(Music(bot, DiscordBackend(bot), store=store_from_env()))
@@ -0,0 +1,184 @@
+import ctypes.util
+import logging
+import mmap
+import os
+import subprocess
+
+import discord
+from discord.oggparse import OggStream
+
+from utils.audiocache import TeeReader
+
+# Pembuatan audio source FFmpeg.
+#
+# Jalur default mengeluarkan Opus langsung dari FFmpeg (FFmpegOpusAudio),
+# sehingga discord.py tidak perlu men-decode ke PCM, mengalikan volume dan
+# meng-encode ulang setiap frame 20 ms di proses bot. Jika stream sumber
+# sudah Opus dan volume 100%, FFmpeg cukup menyalin paket (codec copy) tanpa
+# decode sama sekali. Volume selain 100% diterapkan lewat filter FFmpeg
+# (decode + encode di proses FFmpeg, bukan di Python).
+#
+# AUDIO_MODE=pcm mengembalikan perilaku lama (FFmpegPCMAudio +
+# PCMVolumeTransformer) sebagai cadangan jika FFmpeg tidak mendukung Opus.
+#
+# Output Ogg dari FFmpeg bisa direkam ke cache audio lokal (utils.audiocache);
+# file yang sudah ada di cache diputar lewat LocalOpusSource tanpa FFmpeg.
+
+log = logging.getLogger(__name__)
+
+AUDIO_MODES = ('opus', 'pcm')
+AUDIO_MODE = os.getenv("AUDIO_MODE", "opus")
+
+# Opsi FFmpeg supaya stream tetap tersambung kalau koneksi putus sebentar
+BEFORE_OPTIONS = '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5'
+
+# Probe input sesingkat mungkin: format audio sudah diketahui dari yt-dlp,
+# jadi FFmpeg tidak perlu membaca beberapa detik stream sebelum mulai keluar
+PROBE_OPTIONS = '-probesize 32768 -analyzeduration 0 -fflags +nobuffer'
+
+# Durasi satu paket Opus dari FFmpegOpusAudio (detik)
+FRAME_SECONDS = 0.02
+
+
+class OpusSource(discord.FFmpegOpusAudio):
+    """FFmpegOpusAudio yang mencatat posisi pemutaran
+
+    `gain` adalah volume yang sudah dipasang di filter FFmpeg (tidak bisa
+    diubah setelah proses jalan), `passthrough` True jika paket disalin
+    apa adanya. `position` dipakai untuk membuka ulang stream di titik yang
+    sama ketika volume diganti.
+    """
+
+    def __init__(self, url, *, gain=1.0, passthrough=False, start=0.0, record=None, **kwargs):
+        super().__init__(url, **kwargs)
+        self.url = url
+        self.gain = gain
+        self.passthrough = passthrough
+        self.start = start
+        self.frames = 0
+        self.recorder = record
+        if record is not None:
+            # Belum ada yang dibaca, jadi iterator paket aman diganti
+            self._packet_iter = OggStream(TeeReader(self._stdout, record)).iter_packets()
+
+    @property
+    def position(self):
+        return self.start + self.frames * FRAME_SECONDS
+
+    def read(self):
+        data = super().read()
+        if data:
+            self.frames += 1
+        elif self.recorder is not None:
+            self._finish_recording()
+        return data
+
+    def _finish_recording(self):
+        recorder, self.recorder = self.recorder, None
+        try:
+            ok = self._process.wait(timeout=2) == 0
+        except subprocess.TimeoutExpired:
+            ok = False
+        recorder.finish(ok, self.position)
+
+    def cleanup(self):
+        # Dihentikan sebelum stream habis (skip, leave, ganti volume)
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.abort()
+        super().cleanup()
+
+
+class LocalOpusSource(discord.AudioSource):
+    """Putar file Ogg Opus dari cache audio lokal tanpa FFmpeg
+
+    File di-mmap dan paketnya dibaca langsung dengan parser Ogg discord.py.
+    """
+
+    gain = 1.0
+    passthrough = True
+    start = 0.0
+
+    def __init__(self, path):
+        self.url = path
+        self.frames = 0
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._packet_iter = OggStream(self._map).iter_packets()
+
+    @property
+    def position(self):
+        return self.frames * FRAME_SECONDS
+
+    def read(self):
+        data = next(self._packet_iter, b'')
+        if data:
+            self.frames += 1
+        return data
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        if not self._map.closed:
+            self._map.close()
+
+
+def open_audio(url, *, volume=1.0, acodec=None, start=0.0, mode=None, record=None):
+    """Buka audio source FFmpeg untuk URL stream atau file lokal
+
+    `acodec` adalah codec audio sumber dari yt-dlp; hanya sumber 'opus'
+    dengan volume 100% yang bisa disalin tanpa encode ulang. `start`
+    (detik) dipakai untuk melanjutkan dari posisi tertentu. `record`
+    adalah Recorder cache audio; hanya dipakai untuk source Opus yang
+    diputar dari awal dengan volume 100%, selain itu rekaman dibatalkan.
+    """
+    mode = mode or AUDIO_MODE
+    if mode not in AUDIO_MODES:
+        raise ValueError(f"AUDIO_MODE harus salah satu dari {AUDIO_MODES}, bukan {mode!r}")
+
+    if record is not None and (mode != 'opus' or volume != 1.0 or start):
+        record.abort()
+        record = None
+
+    # Opsi reconnect hanya berlaku untuk input HTTP, bukan file cache lokal
+    before_options = PROBE_OPTIONS
+    if url.startswith(('http://', 'https://')):
+        before_options += ' ' + BEFORE_OPTIONS
+    if start:
+        before_options += f' -ss {start:.2f}'
+
+    if mode == 'pcm':
+        source = discord.FFmpegPCMAudio(url, before_options=before_options, options='-vn')
+        return discord.PCMVolumeTransformer(source, volume=volume)
+
+    passthrough = acodec == 'opus' and volume == 1.0
+    options = '-vn'
+    if volume != 1.0:
+        options += f' -filter:a volume={volume:.2f}'
+    return OpusSource(url, gain=volume, passthrough=passthrough, start=start, record=record,
+                      # discord.py menganggap 'opus'/'libopus' sama dengan copy;
+                      # codec None berarti encode ulang dengan libopus
+                      codec='copy' if passthrough else None,
+                      before_options=before_options, options=options)
+
+
+def load_opus():
+    """Muat libopus sebelum lagu pertama (dipanggil di thread terpisah)
+
+    Encoder Opus hanya dipakai AUDIO_MODE=pcm. Tanpa ini discord.py memuat
+    library saat play() pertama di event loop, termasuk mencarinya lewat
+    ctypes.util.find_library yang menjalankan proses eksternal.
+    """
+    if AUDIO_MODE != 'pcm' or discord.opus.is_loaded():
+        return discord.opus.is_loaded()
+    name = ctypes.util.find_library('opus')
+    if name is None:
+        log.warning("libopus tidak ditemukan, AUDIO_MODE=pcm tidak bisa memutar audio")
+        return False
+    try:
+        discord.opus.load_opus(name)
+    except OSError as e:
+        log.warning("Gagal memuat libopus %s: %s", name, e)
+        return False
+    return True
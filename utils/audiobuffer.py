@@ -0,0 +1,341 @@
+import logging
+import os
+import threading
+import time
+
+import discord
+from discord import voice_state
+
+from utils import metrics
+
+# Jitter buffer untuk audio source FFmpeg.
+#
+# Tanpa buffer, thread AudioPlayer discord.py membaca setiap frame 20 ms
+# langsung dari pipe FFmpeg, jadi setiap jeda stream dari server (FFmpeg
+# menunggu jaringan) langsung terdengar sebagai patah-patah. BufferedSource
+# menjalankan thread pembaca yang mengisi ring buffer frame (Opus atau PCM)
+# sampai AUDIO_BUFFER_MS di depan posisi pemutaran. Buffer dialokasikan
+# sekali per stream; thread player mengambil frame dari slot buffer tanpa
+# menyalin (memoryview), dan pembaca berhenti (backpressure) selama buffer
+# penuh sehingga FFmpeg tidak membaca stream lebih jauh dari yang perlu.
+#
+# Jika buffer kosong di tengah lagu (underrun), player mendapat frame hening
+# alih-alih menunggu, lalu pemutaran dilanjutkan setelah buffer terisi lagi
+# seperempatnya. Statistik underrun/overrun dicatat per guild.
+#
+# Dengan StreamRecovery (utils.streamrecovery), stream yang putus atau macet
+# diganti source baru di posisi yang sama oleh thread pembaca, tanpa
+# AudioPlayer tahu ada pergantian.
+
+log = logging.getLogger(__name__)
+
+# Kedalaman buffer default (ms audio di depan posisi pemutaran); 0 mematikan
+BUFFER_MS = int(os.getenv("AUDIO_BUFFER_MS", "1000"))
+
+# Durasi satu frame dari FFmpegOpusAudio/FFmpegPCMAudio (detik)
+FRAME_SECONDS = 0.02
+
+# Ukuran slot: paket Opus 20 ms maksimal 1275 byte per frame; frame PCM
+# 20 ms 48 kHz stereo 16-bit selalu 3840 byte
+OPUS_SLOT = 4000
+PCM_SLOT = discord.opus.Encoder.FRAME_SIZE
+
+OPUS_SILENCE = b'\xf8\xff\xfe'
+PCM_SILENCE = bytes(PCM_SLOT)
+
+# Lama player menunggu frame sebelum menganggapnya underrun (detik)
+UNDERRUN_WAIT = FRAME_SECONDS
+
+# Batas menunggu frame pertama stream (detik) sebelum lagu dianggap gagal.
+# Selama menunggu player mendapat hening: AudioPlayer discord.py mulai
+# menghitung ritme sebelum read() pertama, jadi read() yang memblokir di awal
+# membuat player mengirim frame beruntun untuk mengejar dan menguras buffer.
+STARTUP_WAIT = 30.0
+
+# DAVE (enkripsi end-to-end voice) meneruskan frame ke library native yang
+# butuh bytes; tanpa DAVE discord.py hanya memanggil bytes(data) saat enkripsi
+ZERO_COPY = not voice_state.has_dave
+
+BUFFER_UNDERRUNS = metrics.counter(
+    'audio_buffer_underruns_total', 'Buffer audio kosong di tengah lagu (patah-patah)')
+BUFFER_SILENCE = metrics.counter(
+    'audio_buffer_silence_frames_total', 'Frame hening yang diputar selama underrun')
+BUFFER_OVERRUNS = metrics.counter(
+    'audio_buffer_overruns_total', 'Buffer audio penuh sehingga pembaca FFmpeg berhenti')
+
+
+class BufferStats:
+    """Statistik buffer audio satu guild"""
+
+    __slots__ = ('streams', 'frames', 'underruns', 'silence', 'overruns', 'oversize',
+                 'stalls', 'recoveries')
+
+    def __init__(self):
+        self.streams = 0
+        self.frames = 0
+        self.underruns = 0
+        self.silence = 0
+        self.overruns = 0
+        self.oversize = 0
+        self.stalls = 0
+        self.recoveries = 0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# guild_id -> BufferStats; diisi dari thread pembaca dan thread player
+guild_stats = {}
+
+
+def stats_for(guild_id):
+    stats = guild_stats.get(guild_id)
+    if stats is None:
+        stats = guild_stats.setdefault(guild_id, BufferStats())
+    return stats
+
+
+def totals():
+    """Jumlah statistik semua guild (untuk gauge /metrics)"""
+    result = dict.fromkeys(BufferStats.__slots__, 0)
+    for stats in list(guild_stats.values()):
+        for name in BufferStats.__slots__:
+            result[name] += getattr(stats, name)
+    return result
+
+
+def summary(limit=20):
+    """Total dan guild dengan underrun terbanyak, untuk endpoint /audio"""
+    worst = sorted(((guild_id, stats) for guild_id, stats in list(guild_stats.items())
+                    if stats.underruns), key=lambda item: item[1].underruns, reverse=True)
+    return {
+        'buffer_ms': BUFFER_MS,
+        'totals': totals(),
+        'guilds': [dict(stats.as_dict(), guild_id=guild_id) for guild_id, stats in worst[:limit]],
+    }
+
+
+class BufferedSource(discord.AudioSource):
+    """AudioSource yang membaca `source` lewat ring buffer `depth` frame
+
+    Atribut lain (`gain`, `passthrough`, `url`, ...) diteruskan ke source
+    asli. `position` adalah posisi frame yang sudah diambil player, bukan
+    posisi pembaca, jadi membuka ulang stream di posisi ini tidak melompati
+    audio yang masih ada di buffer. `recovery` (StreamRecovery, opsional)
+    dipakai untuk mengganti source yang putus atau macet.
+    """
+
+    def __init__(self, source, *, depth, guild_id=None, recovery=None):
+        self.source = source
+        self.depth = depth
+        self.recovery = recovery
+        self.guild_id = guild_id
+        self._base = getattr(source, 'start', 0.0)
+        self.opus = source.is_opus()
+        self.slot_size = OPUS_SLOT if self.opus else PCM_SLOT
+        self.silence_frame = OPUS_SILENCE if self.opus else PCM_SILENCE
+        self.stats = stats_for(guild_id)
+        self.stats.streams += 1
+        self.frames = 0
+        # Satu slot ekstra untuk frame yang sedang dikirim thread player
+        self._slots = depth + 1
+        self._buffer = bytearray(self._slots * self.slot_size)
+        self._view = memoryview(self._buffer)
+        self._lengths = [0] * self._slots
+        self._spill = {}
+        self._head = 0
+        self._tail = 0
+        self._resume = max(1, depth // 4)
+        self._started = False
+        self._opened = None
+        self._starving = False
+        self._eof = False
+        self._closed = False
+        self._stalled = False
+        self._last_write = time.monotonic()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._fill, name=f'audio-buffer-{guild_id}',
+                                        daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        if name == 'source':
+            raise AttributeError(name)
+        return getattr(self.source, name)
+
+    @property
+    def position(self):
+        return self._base + self.frames * FRAME_SECONDS
+
+    @property
+    def buffered(self):
+        """Jumlah frame yang siap diputar"""
+        return self._head - self._tail
+
+    def is_opus(self):
+        return self.opus
+
+    # ----- thread pembaca -----
+
+    def _fill(self):
+        cond = self._cond
+        full = False
+        while True:
+            source = self.source
+            error = None
+            try:
+                data = source.read()
+            except Exception as e:
+                if not self._closed:
+                    log.exception("Gagal membaca audio untuk buffer")
+                data, error = b'', e
+            if not data and not self._closed and self.recovery is not None \
+                    and self._recover(source, error):
+                continue
+            with cond:
+                if not data or self._closed:
+                    self._eof = True
+                    cond.notify_all()
+                    return
+                if self._head - self._tail >= self.depth:
+                    if not full:
+                        # Hitung sekali per kali buffer penuh, bukan per frame tertahan
+                        self.stats.overruns += 1
+                        BUFFER_OVERRUNS.inc()
+                        full = True
+                    while self._head - self._tail >= self.depth and not self._closed:
+                        cond.wait()
+                    if self._closed:
+                        return
+                elif self._head - self._tail < self._resume:
+                    full = False
+                slot = self._head % self._slots
+                size = len(data)
+                if size <= self.slot_size:
+                    start = slot * self.slot_size
+                    self._buffer[start:start + size] = data
+                    self._spill.pop(slot, None)
+                else:
+                    # Paket lebih besar dari slot (jarang): simpan di luar ring
+                    self._spill[slot] = bytes(data)
+                    self.stats.oversize += 1
+                self._lengths[slot] = size
+                self._head += 1
+                self._last_write = time.monotonic()
+                cond.notify_all()
+
+    def _recover(self, source, error):
+        """Ganti source yang habis sebelum waktunya; True jika berhasil"""
+        stalled, self._stalled = self._stalled, False
+        position = self._base + self._head * FRAME_SECONDS
+        if not stalled and not self.recovery.ended_early(position, error):
+            return False
+        reason = 'stall' if stalled else 'error' if error is not None else 'eof'
+        log.warning("Stream guild %s terhenti di %.1f detik (%s), membuka ulang",
+                    self.guild_id, position, reason)
+        # Jeda refresh/buka ulang bukan macet baru
+        self._last_write = time.monotonic()
+        replacement = self.recovery.reopen(position, reason)
+        if replacement is None:
+            return False
+        with self._cond:
+            if self._closed:
+                replacement.cleanup()
+                return False
+            self.source = replacement
+            self._last_write = time.monotonic()
+        source.cleanup()
+        self.stats.recoveries += 1
+        return True
+
+    # ----- thread player -----
+
+    def read(self):
+        cond = self._cond
+        with cond:
+            if self._head == self._tail and self._started and not self._eof \
+                    and not self._starving:
+                # Jeda sesaat masih bisa dikejar oleh AudioPlayer; selama
+                # underrun hening langsung dikembalikan supaya ritme 20 ms terjaga
+                cond.wait(UNDERRUN_WAIT)
+            if self._head == self._tail:
+                if self._eof:
+                    return b''
+                if not self._started:
+                    return self._waiting()
+                return self._underrun()
+            if self._starving and self._head - self._tail < self._resume and not self._eof:
+                # Tunggu buffer terisi lagi supaya tidak patah-patah per frame
+                return self._underrun()
+            self._started = True
+            self._starving = False
+            slot = self._tail % self._slots
+            self._tail += 1
+            cond.notify_all()
+        self.frames += 1
+        self.stats.frames += 1
+        spilled = self._spill.get(slot)
+        if spilled is not None:
+            return spilled
+        start = slot * self.slot_size
+        view = self._view[start:start + self._lengths[slot]]
+        return view if ZERO_COPY and self.opus else bytes(view)
+
+    def _waiting(self):
+        now = time.monotonic()
+        if self._opened is None:
+            self._opened = now
+        elif now - self._opened > STARTUP_WAIT:
+            log.warning("Stream audio tidak mengirim data selama %.0f detik", STARTUP_WAIT)
+            return b''
+        return self.silence_frame
+
+    def _underrun(self):
+        if not self._starving:
+            self._starving = True
+            self.stats.underruns += 1
+            BUFFER_UNDERRUNS.inc()
+        self.stats.silence += 1
+        BUFFER_SILENCE.inc()
+        recovery = self.recovery
+        if recovery is not None and not self._stalled \
+                and time.monotonic() - self._last_write > recovery.stall_timeout:
+            # Pembaca tertahan di read() FFmpeg: matikan prosesnya supaya read()
+            # kembali dan pembaca membuka stream baru
+            self._stalled = True
+            self.stats.stalls += 1
+            threading.Thread(target=self.source.cleanup, name='audio-stall', daemon=True).start()
+        return self.silence_frame
+
+    def cleanup(self):
+        if self.recovery is not None:
+            self.recovery.close()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        # Membunuh FFmpeg juga membangunkan thread pembaca yang menunggu pipe
+        self.source.cleanup()
+
+
+class BufferedPCMSource(BufferedSource):
+    """BufferedSource untuk PCMVolumeTransformer; volume berlaku pada frame
+    yang dibaca berikutnya, jadi terdengar setelah isi buffer habis"""
+
+    @property
+    def volume(self):
+        return self.source.volume
+
+    @volume.setter
+    def volume(self, value):
+        self.source.volume = value
+
+
+def buffered(source, guild_id=None, buffer_ms=None, recovery=None):
+    """Bungkus source dengan jitter buffer, atau kembalikan apa adanya jika
+    buffer dimatikan (AUDIO_BUFFER_MS=0; pemulihan stream ikut mati)"""
+    buffer_ms = BUFFER_MS if buffer_ms is None else buffer_ms
+    depth = int(buffer_ms / 1000 / FRAME_SECONDS)
+    if depth <= 0:
+        return source
+    cls = BufferedPCMSource if hasattr(source, 'volume') else BufferedSource
+    return cls(source, depth=depth, guild_id=guild_id, recovery=recovery)
@@ -0,0 +1,346 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+# Cache audio lokal untuk track yang sering diputar.
+#
+# Output Ogg Opus dari FFmpeg disalin ke file sementara selama track diputar.
+# Jika track selesai diputar sampai habis, file dipindahkan (rename atomik)
+# ke store yang dialamatkan dengan hash identitas track (audio_key, bukan
+# isinya: Ogg dari FFmpeg memakai serial acak sehingga dua rekaman lagu yang
+# sama tidak pernah identik), objects/ab/abcd....ogg. Pemutaran berikutnya
+# membaca file lokal tanpa jaringan dan tanpa FFmpeg. Total ukuran dibatasi
+# kuota byte dengan eviksi LRU atau LFU.
+#
+# Index JSON ditulis oleh thread latar (tidak pernah di event loop atau di
+# thread audio) lewat file sementara + os.replace. File .part yang tertinggal
+# karena crash dibuang saat cache dibuka, begitu juga objek yang belum sempat
+# masuk index, jadi index tidak pernah menunjuk ke file yang belum lengkap.
+
+log = logging.getLogger(__name__)
+
+POLICIES = ('lru', 'lfu')
+INDEX_FILE = 'index.json'
+
+# Track dianggap selesai jika yang terekam minimal sebesar ini dari durasinya
+COMPLETE_RATIO = 0.95
+
+# Hit baru (last_used, hits) ditulis ke index oleh thread latar paling sering
+# sekali per sekian detik; rekaman baru dan eviksi langsung membangunkannya.
+# Sisanya disimpan oleh close() saat proses berhenti
+INDEX_SAVE_INTERVAL = 10.0
+
+
+class AudioCache:
+    """Store audio lokal dengan kuota byte dan index file
+
+    `path` adalah direktori cache, `quota` batas total byte semua objek,
+    `policy` 'lru' (buang yang paling lama tidak diputar) atau 'lfu'
+    (buang yang paling jarang diputar, lalu yang paling lama).
+    """
+
+    def __init__(self, path, quota=1024 ** 3, policy='lru'):
+        if policy not in POLICIES:
+            raise ValueError(f"Policy cache audio harus salah satu dari {POLICIES}, bukan {policy!r}")
+        self.path = path
+        self.quota = quota
+        self.policy = policy
+        self._lock = threading.Lock()
+        # Hanya satu penulis index sekaligus; dipegang tanpa _lock saat fsync
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        # key track -> digest, digest -> {size, last_used, hits}
+        self._keys = {}
+        self._objects = {}
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evictions = 0
+        self.aborted = 0
+        self._dirty = False
+
+        os.makedirs(os.path.join(path, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(path, 'tmp'), exist_ok=True)
+        self._load()
+        self._flusher = threading.Thread(target=self._flush_loop, name='audio-cache-index',
+                                         daemon=True)
+        self._flusher.start()
+
+    # ----- API -----
+
+    def get(self, key):
+        """Path file audio untuk key track, atau None jika belum ada"""
+        with self._lock:
+            digest = self._keys.get(key)
+            info = self._objects.get(digest) if digest else None
+            path = self._object_path(digest) if info else None
+            if path is None or not os.path.exists(path):
+                if digest is not None:
+                    self._drop_object(digest)
+                self.misses += 1
+                return None
+            info['last_used'] = time.time()
+            info['hits'] += 1
+            self.hits += 1
+            # Urutan eviksi bergantung pada hit ini; disimpan oleh thread latar
+            self._dirty = True
+            return path
+
+    def recorder(self, key, expected=None):
+        """Perekam untuk satu pemutaran track, atau None jika disk bermasalah"""
+        try:
+            return Recorder(self, key, expected)
+        except OSError as e:
+            log.warning("Tidak dapat merekam cache audio %s: %s", key, e)
+            return None
+
+    def flush(self):
+        """Tulis index jika ada perubahan yang belum tersimpan"""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = json.dumps({'keys': self._keys, 'objects': self._objects})
+                self._dirty = False
+            if not self._write_index(data):
+                with self._lock:
+                    self._dirty = True
+
+    def close(self):
+        """Hentikan thread latar dan tulis perubahan terakhir"""
+        self._closed = True
+        self._wake.set()
+        self._flusher.join()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'objects': len(self._objects),
+                'keys': len(self._keys),
+                'bytes': self._total_bytes(),
+                'quota': self.quota,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stored': self.stored,
+                'aborted': self.aborted,
+                'evictions': self.evictions,
+            }
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    # ----- internal -----
+
+    def _object_path(self, digest):
+        return os.path.join(self.path, 'objects', digest[:2], digest + '.ogg')
+
+    def _total_bytes(self):
+        return sum(info['size'] for info in self._objects.values())
+
+    def _commit(self, key, part_path, size):
+        """Pindahkan file sementara yang sudah lengkap ke store"""
+        if size > self.quota:
+            os.unlink(part_path)
+            return
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        target = self._object_path(digest)
+        with self._lock:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Track yang sama direkam dua guild bersamaan: rekaman terakhir
+            # menggantikan yang lama, statistik pemutarannya tetap
+            os.replace(part_path, target)
+            info = self._objects.setdefault(digest, {'last_used': time.time(), 'hits': 0})
+            info['size'] = size
+            self._keys[key] = digest
+            self.stored += 1
+            self._evict(keep=digest)
+            self._dirty = True
+        self._wake.set()
+
+    def _evict(self, keep=None):
+        def rank(item):
+            digest, info = item
+            if self.policy == 'lfu':
+                return info['hits'], info['last_used']
+            return info['last_used']
+
+        total = self._total_bytes()
+        for digest, info in sorted(self._objects.items(), key=rank):
+            if total <= self.quota:
+                break
+            if digest == keep:
+                continue
+            total -= info['size']
+            self._drop_object(digest)
+            self.evictions += 1
+
+    def _drop_object(self, digest):
+        self._objects.pop(digest, None)
+        for key in [k for k, d in self._keys.items() if d == digest]:
+            del self._keys[key]
+        try:
+            os.unlink(self._object_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _load(self):
+        """Baca index, buang file sementara dan objek yatim sisa crash"""
+        tmp_dir = os.path.join(self.path, 'tmp')
+        for name in os.listdir(tmp_dir):
+            os.unlink(os.path.join(tmp_dir, name))
+        for name in os.listdir(self.path):
+            if name.endswith('.tmp'):
+                os.unlink(os.path.join(self.path, name))
+
+        try:
+            with open(os.path.join(self.path, INDEX_FILE)) as f:
+                index = json.load(f)
+            self._keys = index.get('keys', {})
+            self._objects = index.get('objects', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            log.warning("Index cache audio %s rusak, dimulai kosong: %s", self.path, e)
+
+        for digest in list(self._objects):
+            if not os.path.exists(self._object_path(digest)):
+                self._drop_object(digest)
+        self._keys = {k: d for k, d in self._keys.items() if d in self._objects}
+
+        objects_dir = os.path.join(self.path, 'objects')
+        for prefix in os.listdir(objects_dir):
+            for name in os.listdir(os.path.join(objects_dir, prefix)):
+                if name[:-len('.ogg')] not in self._objects:
+                    os.unlink(os.path.join(objects_dir, prefix, name))
+
+        self._evict()
+        self._dirty = True
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(INDEX_SAVE_INTERVAL)
+            self._wake.clear()
+            self.flush()
+
+    def _write_index(self, data):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, index_path)
+            return True
+        except OSError as e:
+            log.warning("Gagal menyimpan index cache audio: %s", e)
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return False
+
+
+class Recorder:
+    """Rekam output audio satu pemutaran ke file sementara
+
+    `write()` dipanggil dengan byte mentah (Ogg) yang dibaca dari FFmpeg,
+    `finish(ok, seconds)` di akhir stream. File hanya masuk store jika
+    stream selesai normal dan durasinya mendekati `expected` (detik);
+    selain itu, termasuk `abort()` karena skip, file sementara dibuang.
+    Rekaman yang melebihi kuota cache dihentikan saat itu juga.
+    """
+
+    def __init__(self, cache, key, expected=None):
+        self.cache = cache
+        self.key = key
+        self.expected = expected
+        self._size = 0
+        fd, self._path = tempfile.mkstemp(dir=os.path.join(cache.path, 'tmp'), suffix='.part')
+        self._file = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        if self._file is None:
+            return
+        if self._size + len(data) > self.cache.quota:
+            # Tidak akan pernah muat di cache; berhenti menulis ke disk
+            log.debug("Rekaman cache audio %s melebihi kuota, dihentikan", self.key)
+            self.abort()
+            return
+        try:
+            self._file.write(data)
+        except OSError as e:
+            log.warning("Gagal menulis cache audio %s: %s", self.key, e)
+            self.abort()
+            return
+        self._size += len(data)
+
+    def finish(self, ok, seconds=None):
+        """Selesaikan rekaman; simpan ke store jika lengkap"""
+        if self._file is None:
+            return
+        # Tanpa durasi (misalnya siaran langsung) kelengkapan tidak bisa dipastikan
+        complete = ok and self._size > 0 and bool(self.expected) and (
+            (seconds or 0) >= self.expected * COMPLETE_RATIO)
+        if not complete:
+            self.abort()
+            return
+        file, self._file = self._file, None
+        try:
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+            self.cache._commit(self.key, self._path, self._size)
+        except OSError as e:
+            log.warning("Gagal menyimpan cache audio %s: %s", self.key, e)
+            self._discard()
+
+    def abort(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self.cache.aborted += 1
+        self._discard()
+
+    def _discard(self):
+        try:
+            os.unlink(self._path)
+        except FileNotFoundError:
+            pass
+
+
+class TeeReader:
+    """Bungkus stream baca supaya semua byte juga dikirim ke Recorder"""
+
+    def __init__(self, stream, recorder):
+        self.stream = stream
+        self.recorder = recorder
+
+    def read(self, n=-1):
+        data = self.stream.read(n)
+        if data:
+            self.recorder.write(data)
+        return data
+
+
+def cache_from_env():
+    """AudioCache dari AUDIO_CACHE_PATH, atau None jika tidak diaktifkan"""
+    path = os.getenv("AUDIO_CACHE_PATH")
+    if not path:
+        return None
+    quota = int(float(os.getenv("AUDIO_CACHE_SIZE_MB", "1024")) * 1024 * 1024)
+    cache = AudioCache(path, quota=quota, policy=os.getenv("AUDIO_CACHE_POLICY", "lru"))
+    atexit.register(cache.close)
+    return cache
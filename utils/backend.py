@@ -0,0 +1,319 @@
+import asyncio
+import itertools
+import time
+
+import discord
+
+from utils.ytdl import YTDLSource, scheduler
+
+# Backend pemutaran untuk cog musik.
+#
+# Cog musik (music_commands.py) tidak memanggil discord.py voice atau yt-dlp
+# secara langsung, tetapi lewat PlaybackBackend. DiscordBackend adalah jalur
+# produksi (voice client discord.py + YTDLSource + penjadwal ekstraksi),
+# sedangkan FakeBackend menyimpan semuanya di memori sehingga ribuan guild
+# simulasi bisa menjalankan perintah tanpa koneksi Discord, untuk load test
+# dan benchmark.
+
+
+class PlaybackBackend:
+    """Antarmuka yang dipakai cog musik untuk voice dan resolusi lagu
+
+    Objek voice yang dikembalikan cukup punya `channel`, `play(source,
+    after=...)`, `stop()`, `pause()`, `resume()`, `is_playing()`,
+    `is_paused()`, `is_connected()`, `source` dan `move_to(channel)`, seperti
+    VoiceClient.
+    """
+
+    def voice_client(self, ctx):
+        """Voice client aktif untuk guild ctx, atau None"""
+        raise NotImplementedError
+
+    async def connect(self, channel, *, timeout=None):
+        """Sambungkan ke channel suara dan kembalikan voice client
+
+        Memunculkan asyncio.TimeoutError jika belum tersambung dalam `timeout`
+        detik; koneksi setengah jadi sudah dibersihkan saat itu.
+        """
+        raise NotImplementedError
+
+    async def disconnect(self, voice):
+        raise NotImplementedError
+
+    async def resolve(self, track, *, volume=1.0, timings=None):
+        """Cari track dan buka source-nya; objek hasil punya `title` dan `source`
+
+        Track yang dipulihkan dari state tersimpan membawa `data` (metadata
+        ekstraksi) dan `start` (posisi awal dalam detik).
+        """
+        raise NotImplementedError
+
+    def is_playlist(self, query):
+        return False
+
+    async def search(self, query, *, guild_id=None, limit=10):
+        """Lagu yang pernah diputar dan cocok dengan query, terpopuler dulu
+
+        Setiap hasil berupa dict `title`, `webpage_url`, `duration`, `plays`
+        dan `guild_plays`.
+        """
+        return []
+
+    def iter_playlist(self, query, *, guild_id=None, owner=None):
+        """Async iterator entri playlist berisi `url`, `title`, `duration`"""
+        raise NotImplementedError
+
+    def cancel_guild(self, guild_id):
+        """Batalkan ekstraksi yang masih menunggu untuk guild"""
+
+    def cancel_owner(self, guild_id, user_id):
+        """Batalkan ekstraksi milik user di guild"""
+
+    def backlog(self):
+        """Jumlah ekstraksi yang masih antri; dipakai sebagai sinyal beban"""
+        return 0
+
+
+class SessionVoiceClient(discord.VoiceClient):
+    """VoiceClient yang mencatat apakah putusnya berasal dari koneksinya sendiri
+
+    Saat gateway mengabarkan bot keluar dari channel, koneksi yang masih
+    sehat berarti bot diputus orang (tombol Disconnect, kick). Jika discord.py
+    sudah memutus koneksinya lebih dulu (resume atau koneksi ulang setelah
+    server voice berganti gagal), `dropped` diisi True.
+    """
+
+    dropped = False
+
+    async def on_voice_state_update(self, data):
+        if data['channel_id'] is None:
+            self.dropped = not self.is_connected()
+        await super().on_voice_state_update(data)
+
+
+class DiscordBackend(PlaybackBackend):
+    """Backend produksi: voice client discord.py dan YTDLSource"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def voice_client(self, ctx):
+        return ctx.voice_client
+
+    async def connect(self, channel, *, timeout=None):
+        # discord.py memutus sendiri koneksi yang gagal atau habis waktu
+        return await channel.connect(timeout=timeout or 60.0, reconnect=True,
+                                     cls=SessionVoiceClient)
+
+    async def disconnect(self, voice):
+        await voice.disconnect()
+
+    async def resolve(self, track, *, volume=1.0, timings=None):
+        if track.data is not None:
+            # Track dari state tersimpan: metadata lama dipakai jika masih berlaku
+            return await YTDLSource.restore(track.data, volume=volume, start=track.start,
+                                            guild_id=track.guild_id, timings=timings)
+        return await YTDLSource.create_source(track.ctx, track.query, loop=self.bot.loop,
+                                              volume=volume, timings=timings)
+
+    async def search(self, query, *, guild_id=None, limit=10):
+        return await YTDLSource.search_history(query, guild_id=guild_id, limit=limit)
+
+    def is_playlist(self, query):
+        return YTDLSource.is_playlist(query)
+
+    def iter_playlist(self, query, *, guild_id=None, owner=None):
+        return YTDLSource.iter_playlist(query, guild_id=guild_id, owner=owner)
+
+    def cancel_guild(self, guild_id):
+        YTDLSource.cancel(guild_id)
+
+    def cancel_owner(self, guild_id, user_id):
+        YTDLSource.cancel(guild_id, user_id)
+
+    def backlog(self):
+        return scheduler.backlog()
+
+
+# ----- backend palsu untuk pengujian -----
+
+
+class FakeSource:
+    """Audio source palsu; `volume` bisa diatur seperti PCMVolumeTransformer"""
+
+    __slots__ = ('title', 'volume', 'position', 'closed')
+
+    def __init__(self, title):
+        self.title = title
+        self.volume = 1.0
+        self.position = 0.0
+        self.closed = False
+
+    def cleanup(self):
+        self.closed = True
+
+
+class FakeResolved:
+    __slots__ = ('title', 'source')
+
+    def __init__(self, title, source):
+        self.title = title
+        self.source = source
+
+
+class FakeVoiceClient:
+    """Voice client di memori yang meniru perilaku VoiceClient
+
+    `stop()` memanggil callback `after` seperti discord.py. Jika
+    `track_seconds` diisi, lagu dianggap selesai setelah sekian detik.
+    `dropped` seperti SessionVoiceClient (lihat FakeBackend.drop).
+    """
+
+    dropped = False
+
+    def __init__(self, backend, channel):
+        self.backend = backend
+        self.channel = channel
+        self.guild_id = channel.guild.id
+        self.source = None
+        self.connected = True
+        self._after = None
+        self._paused = False
+        self._timer = None
+
+    def play(self, source, *, after=None):
+        if self.source is not None:
+            raise RuntimeError("Already playing audio.")
+        self.source = source
+        self._after = after
+        self._paused = False
+        self.backend.plays += 1
+        if self.backend.track_seconds is not None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.backend.track_seconds, self._finish)
+
+    def _finish(self, error=None):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        source, after = self.source, self._after
+        self.source = self._after = None
+        self._paused = False
+        if source is not None:
+            source.cleanup()
+            if after is not None:
+                after(error)
+
+    def stop(self):
+        self._finish()
+
+    def pause(self):
+        self._paused = True
+
+    def resume(self):
+        self._paused = False
+
+    def is_playing(self):
+        return self.source is not None and not self._paused
+
+    def is_paused(self):
+        return self.source is not None and self._paused
+
+    def is_connected(self):
+        return self.connected
+
+    async def move_to(self, channel):
+        self.channel = channel
+
+    async def disconnect(self, *, force=False):
+        await self.backend.disconnect(self)
+
+
+class FakeBackend(PlaybackBackend):
+    """Backend di memori untuk load test: tanpa jaringan, voice atau FFmpeg
+
+    `connect_delay` dan `resolve_delay` (detik, atau callable tanpa argumen
+    yang mengembalikan detik) mensimulasikan latensi koneksi voice dan
+    ekstraksi. Query yang mengandung `fail_marker` gagal di-resolve.
+    Channel yang diberikan ke `connect` perlu punya `guild` dan `members`
+    seperti VoiceChannel agar sesi voice tidak langsung dianggap menganggur.
+    """
+
+    def __init__(self, connect_delay=0, resolve_delay=0, track_seconds=None,
+                 fail_marker='!gagal'):
+        self.connect_delay = connect_delay
+        self.resolve_delay = resolve_delay
+        self.track_seconds = track_seconds
+        self.fail_marker = fail_marker
+        self.voice_clients = {}
+        self.connects = 0
+        self.resolves = 0
+        self.plays = 0
+        self.pending = 0
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    async def _delay(value):
+        value = value() if callable(value) else value
+        if value:
+            await asyncio.sleep(value)
+        else:
+            await asyncio.sleep(0)
+
+    def voice_client(self, ctx):
+        return self.voice_clients.get(ctx.guild.id)
+
+    async def connect(self, channel, *, timeout=None):
+        await asyncio.wait_for(self._delay(self.connect_delay), timeout)
+        if channel.guild.id in self.voice_clients:
+            # Sama seperti discord.py jika dua perintah connect bersamaan
+            raise discord.ClientException('Already connected to a voice channel.')
+        voice = FakeVoiceClient(self, channel)
+        self.voice_clients[voice.guild_id] = voice
+        self.connects += 1
+        return voice
+
+    async def disconnect(self, voice):
+        voice.stop()
+        voice.connected = False
+        if self.voice_clients.get(voice.guild_id) is voice:
+            del self.voice_clients[voice.guild_id]
+
+    def drop(self, guild_id, lost=True):
+        """Putus voice guild dari luar seperti gateway Discord
+
+        `lost` True meniru koneksi yang hilang (server voice berganti),
+        False meniru bot yang diputus orang. Kembalikan voice client lama.
+        """
+        voice = self.voice_clients.pop(guild_id)
+        voice.stop()
+        voice.connected = False
+        voice.dropped = lost
+        return voice
+
+    async def resolve(self, track, *, volume=1.0, timings=None):
+        started = time.perf_counter()
+        self.pending += 1
+        try:
+            await self._delay(self.resolve_delay)
+        finally:
+            self.pending -= 1
+        if timings is not None:
+            timings['extract'] = time.perf_counter() - started
+        if self.fail_marker and self.fail_marker in track.query:
+            raise ValueError(f"Tidak ada hasil untuk: {track.query}")
+        self.resolves += 1
+        source = FakeSource(track.query)
+        source.volume = volume
+        return FakeResolved(f"Lagu {next(self._ids)}: {track.query}", source)
+
+    def is_playlist(self, query):
+        return query.startswith('playlist:')
+
+    def backlog(self):
+        return self.pending
+
+    async def iter_playlist(self, query, *, guild_id=None, owner=None):
+        count = int(query.split(':', 1)[1] or 0)
+        for i in range(count):
+            yield {'url': f"{query}/{i}", 'title': f"Entri {i}", 'duration': 180}
@@ -0,0 +1,230 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# Cache hasil resolusi yt-dlp.
+#
+# Query pencarian dan URL dinormalisasi lalu dipetakan ke metadata hasil
+# ekstraksi (judul, durasi, URL halaman, URL stream). Metadata bertahan lama,
+# sedangkan URL stream punya TTL sendiri karena URL dari YouTube ditandatangani
+# dan kedaluwarsa. Cache dibatasi ukurannya dengan LRU dan bisa disimpan ke
+# SQLite supaya tetap ada setelah bot direstart.
+
+log = logging.getLogger(__name__)
+
+# Field yang disimpan dari hasil extract_info
+CACHED_FIELDS = ('id', 'title', 'duration', 'webpage_url', 'url', 'extractor',
+                 'http_headers', 'acodec', 'is_live')
+
+# Parameter URL yang tidak mempengaruhi hasil ekstraksi
+IGNORED_PARAMS = {'si', 'feature', 'pp', 'ab_channel', 'utm_source',
+                  'utm_medium', 'utm_campaign', 'fbclid'}
+
+_YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com',
+                  'music.youtube.com'}
+
+
+def normalize_query(query):
+    """Normalisasi query/URL menjadi kunci cache"""
+    query = ' '.join(query.split())
+    if not re.match(r'^https?://', query, re.IGNORECASE):
+        return 'search:' + query.casefold()
+
+    parsed = urlparse(query)
+    host = parsed.netloc.lower()
+    params = parse_qs(parsed.query)
+
+    # Samakan semua bentuk link video YouTube
+    if host == 'youtu.be' and parsed.path.strip('/'):
+        return 'youtube:' + parsed.path.strip('/').split('/')[0]
+    if host in _YOUTUBE_HOSTS and parsed.path == '/watch' and 'v' in params \
+            and 'list' not in params:
+        return 'youtube:' + params['v'][0]
+
+    kept = sorted((k, v) for k, vs in params.items()
+                  if k not in IGNORED_PARAMS for v in vs)
+    path = parsed.path.rstrip('/') or '/'
+    url = f"{parsed.scheme.lower()}://{host}{path}"
+    if kept:
+        url += '?' + urlencode(kept)
+    return 'url:' + url
+
+
+def stream_expiry(url, default_ttl, now=None):
+    """Waktu kedaluwarsa URL stream, dari parameter `expire` jika ada"""
+    now = time.time() if now is None else now
+    if url:
+        match = re.search(r'[?&/]expire[=/](\d+)', url)
+        if match:
+            return float(match.group(1))
+    return now + default_ttl
+
+
+class CacheEntry:
+    """Metadata hasil resolusi satu query"""
+
+    __slots__ = ('data', 'created', 'stream_expires')
+
+    def __init__(self, data, created, stream_expires):
+        self.data = data
+        self.created = created
+        self.stream_expires = stream_expires
+
+    def stream_fresh(self, margin=0, now=None):
+        """True jika URL stream masih berlaku (dengan margin detik)"""
+        now = time.time() if now is None else now
+        return bool(self.data.get('url')) and now + margin < self.stream_expires
+
+
+class ResolutionCache:
+    """Cache LRU query -> metadata dengan TTL terpisah untuk URL stream
+
+    `maxsize` membatasi jumlah entri, `ttl` umur metadata, `stream_ttl`
+    umur default URL stream bila URL tidak membawa parameter `expire`, dan
+    `stream_margin` jarak aman sebelum URL stream dianggap basi. Jika `path`
+    diisi, entri juga ditulis ke database SQLite di path tersebut.
+    """
+
+    def __init__(self, maxsize=1024, ttl=24 * 3600, stream_ttl=5 * 3600,
+                 stream_margin=10 * 60, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stream_ttl = stream_ttl
+        self.stream_margin = stream_margin
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+        if path:
+            self._open_db(path)
+
+    # ----- API -----
+
+    def get(self, key):
+        """Ambil entri untuk kunci yang sudah dinormalisasi
+
+        Mengembalikan None jika tidak ada atau metadata sudah kedaluwarsa.
+        Entri dengan URL stream basi tetap dikembalikan (dihitung sebagai
+        `stale`) supaya pemanggil cukup me-refresh stream dari `webpage_url`
+        tanpa mengulang pencarian.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.created > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry.stream_fresh(self.stream_margin, now):
+                self.hits += 1
+            else:
+                self.stale += 1
+            return entry
+
+    def put(self, key, data):
+        """Simpan hasil extract_info untuk kunci tertentu"""
+        now = time.time()
+        data = {k: data[k] for k in CACHED_FIELDS if data.get(k) is not None}
+        entry = CacheEntry(data, now, stream_expiry(data.get('url'), self.stream_ttl, now))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                old_key, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                self._db_delete(old_key)
+            self._db_write(key, entry)
+        return entry
+
+    def invalidate(self, key):
+        """Hapus satu entri, misalnya ketika URL stream ternyata gagal diputar"""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM resolutions")
+                self._db.commit()
+
+    def stats(self):
+        """Counter cache untuk monitoring"""
+        lookups = self.hits + self.misses + self.stale
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    # ----- penyimpanan SQLite -----
+
+    def _open_db(self, path):
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS resolutions ("
+                " key TEXT PRIMARY KEY, data TEXT NOT NULL,"
+                " created REAL NOT NULL, stream_expires REAL NOT NULL)")
+            rows = self._db.execute(
+                "SELECT key, data, created, stream_expires FROM resolutions"
+                " WHERE created > ? ORDER BY created DESC LIMIT ?",
+                (time.time() - self.ttl, self.maxsize)).fetchall()
+        except sqlite3.Error as e:
+            log.warning("Cache SQLite %s tidak bisa dibuka: %s", path, e)
+            self._db = None
+            return
+
+        # Entri terbaru masuk terakhir supaya menjadi yang paling baru di LRU
+        for key, data, created, stream_expires in reversed(rows):
+            self._entries[key] = CacheEntry(json.loads(data), created, stream_expires)
+        log.info("Memuat %d entri cache resolusi dari %s", len(rows), path)
+
+    def _db_write(self, key, entry):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?)",
+                (key, json.dumps(entry.data), entry.created, entry.stream_expires))
+            self._db.commit()
+        except sqlite3.Error as e:
+            log.warning("Gagal menulis cache resolusi: %s", e)
+
+    def _db_delete(self, key):
+        if self._db is None:
+            return
+        try:
+            self._db.execute("DELETE FROM resolutions WHERE key = ?", (key,))
+            self._db.commit()
+        except sqlite3.Error as e:
+            log.warning("Gagal menghapus cache resolusi: %s", e)
+
+    def _remove(self, key):
+        if self._entries.pop(key, None) is not None:
+            self._db_delete(key)
@@ -0,0 +1,99 @@
+import asyncio
+
+from utils.extractor import ExtractionCancelled
+
+# Single-flight untuk lookup yang identik.
+#
+# Ketika banyak user memutar link yang sama dalam waktu berdekatan, semua
+# permintaan dengan kunci yang sama berbagi satu future ekstraksi, sehingga
+# N permintaan hanya menghasilkan satu panggilan yt-dlp. Setiap penunggu
+# membawa tag (misalnya guild dan user peminta) supaya pembatalan hanya
+# melepas penunggu milik guild/user itu, bukan ekstraksi bersamanya.
+
+
+class SingleFlight:
+    """Gabungkan pemanggilan bersamaan dengan kunci yang sama"""
+
+    def __init__(self):
+        self._inflight = {}
+        # task ekstraksi -> {task penunggu: tag}
+        self._waiters = {}
+        # Penunggu yang dilepas lewat cancel(), bukan dibatalkan pemanggilnya
+        self._released = set()
+        self.unique = 0
+        self.coalesced = 0
+
+    async def do(self, key, func, tag=None):
+        """Jalankan `func()` untuk `key`, atau ikut menunggu yang sedang jalan
+
+        Hasil (atau exception) dibagikan ke semua pemanggil. Jika pemanggil
+        yang ikut menunggu dibatalkan, ekstraksi tetap berjalan untuk yang
+        lain. Penunggu yang dilepas lewat `cancel()` mendapat
+        ExtractionCancelled. Jika `func` pemilik ekstraksi gagal dengan
+        ExtractionCancelled, pemanggil lain mengulang dengan `func` miliknya.
+        """
+        task = self._inflight.get(key)
+        joined = task is not None
+        if joined:
+            self.coalesced += 1
+        else:
+            self.unique += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            self._waiters[task] = {}
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        waiter = asyncio.current_task()
+        waiters = self._waiters[task]
+        waiters[waiter] = tag
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if waiter not in self._released:
+                raise
+            waiter.uncancel()
+            raise ExtractionCancelled(f"Ekstraksi dibatalkan: {key}") from None
+        except ExtractionCancelled:
+            if not joined or waiter in self._released:
+                raise
+            return await self.do(key, func, tag)
+        finally:
+            waiters.pop(waiter, None)
+            self._released.discard(waiter)
+
+    def cancel(self, predicate):
+        """Lepas penunggu yang `predicate(tag)`-nya benar; kembalikan jumlahnya
+
+        Ekstraksi bersama tetap berjalan selama masih ada penunggu lain, dan
+        baru dibatalkan jika semua penunggunya dilepas.
+        """
+        count = 0
+        for key, task in list(self._inflight.items()):
+            waiters = self._waiters[task]
+            for waiter, tag in list(waiters.items()):
+                if waiter in self._released or not predicate(tag):
+                    continue
+                self._released.add(waiter)
+                waiter.cancel()
+                count += 1
+            if waiters and all(waiter in self._released for waiter in waiters):
+                # Permintaan baru untuk kunci ini memulai ekstraksi sendiri
+                del self._inflight[key]
+                task.cancel()
+        return count
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        self._waiters.pop(task, None)
+        # Hindari peringatan "exception was never retrieved" jika semua
+        # penunggu sudah dibatalkan
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {
+            'inflight': len(self._inflight),
+            'unique': self.unique,
+            'coalesced': self.coalesced,
+        }
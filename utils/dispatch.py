@@ -0,0 +1,186 @@
+import os
+
+from discord.ext import commands
+from discord.ext.commands.view import StringView
+
+# Jalur cepat on_message.
+#
+# Bot menerima semua pesan di semua guild, dan hampir semuanya bukan perintah.
+# CommandRouter menolak pesan seperti itu dengan pemeriksaan termurah dulu:
+# karakter pertama pesan dicocokkan dengan himpunan karakter awal semua
+# prefix, jadi pesan biasa berhenti di satu lookup set tanpa menyentuh guild,
+# author atau membuat Context. Baru setelah itu prefix guild dicek, pasangan
+# guild/channel yang dimatikan difilter dengan lookup set, dan perintah
+# diambil dari tabel nama -> perintah yang sudah disiapkan, lalu Context
+# dibuat langsung tanpa lewat bot.get_context.
+
+DEFAULT_PREFIX = "!"
+
+
+class RouterMixin:
+    """Mixin bot yang membuang tabel CommandRouter setiap kali perintah berubah
+
+    Cog yang dimuat/dilepas dan perintah yang ditambah/dihapus selalu lewat
+    add_command/remove_command bot, jadi cukup dua method ini yang di-override.
+    """
+
+    router = None
+
+    def add_command(self, command):
+        super().add_command(command)
+        if self.router is not None:
+            self.router.invalidate()
+
+    def remove_command(self, name):
+        command = super().remove_command(name)
+        if self.router is not None:
+            self.router.invalidate()
+        return command
+
+
+class RoutedBot(RouterMixin, commands.Bot):
+    pass
+
+
+class RoutedShardedBot(RouterMixin, commands.AutoShardedBot):
+    pass
+
+
+class CommandRouter:
+    """Prefix per guild, channel yang dimatikan dan dispatch perintah
+
+    `prefixes` memetakan guild_id ke prefix (guild lain memakai
+    `default_prefix`). `disabled` berisi pasangan (guild_id, channel_id);
+    channel_id None berarti seluruh guild. `get_prefix` bisa dipasang sebagai
+    `command_prefix` bot supaya jalur bawaan discord.py tetap konsisten.
+    Bot sebaiknya RoutedBot/RoutedShardedBot supaya perintah yang berubah
+    setelah router dibuat ikut terlihat.
+    """
+
+    def __init__(self, bot, default_prefix=DEFAULT_PREFIX, prefixes=None, disabled=()):
+        self.bot = bot
+        self.default_prefix = default_prefix
+        self.prefixes = {}
+        self.disabled = set(disabled)
+        # Karakter pertama semua prefix yang dipakai, untuk penolakan tercepat
+        self.leading = frozenset()
+        # None berarti tabel perlu disusun ulang sebelum dipakai
+        self._table = None
+        # RouterMixin memanggil invalidate() setiap perintah bot berubah
+        bot.router = self
+        for guild_id, prefix in (prefixes or {}).items():
+            self.set_prefix(guild_id, prefix)
+        self._update_leading()
+
+    # ----- konfigurasi -----
+
+    def prefix_for(self, guild_id):
+        return self.prefixes.get(guild_id, self.default_prefix)
+
+    def set_prefix(self, guild_id, prefix):
+        """Ganti prefix guild; prefix default menghapus entrinya"""
+        if not prefix or any(c.isspace() for c in prefix):
+            raise ValueError("Prefix tidak boleh kosong atau berisi spasi")
+        if prefix == self.default_prefix:
+            self.prefixes.pop(guild_id, None)
+        else:
+            self.prefixes[guild_id] = prefix
+        self._update_leading()
+
+    def disable(self, guild_id, channel_id=None):
+        """Abaikan perintah di channel (atau seluruh guild jika channel_id None)"""
+        self.disabled.add((guild_id, channel_id))
+
+    def enable(self, guild_id, channel_id=None):
+        self.disabled.discard((guild_id, channel_id))
+
+    def get_prefix(self, bot, message):
+        """Untuk `command_prefix` bot"""
+        guild = message.guild
+        return self.prefix_for(guild.id) if guild is not None else self.default_prefix
+
+    def refresh(self):
+        """Susun ulang tabel nama -> perintah (termasuk alias) dari bot"""
+        self._table = dict(self.bot.all_commands)
+
+    def invalidate(self):
+        """Perintah bot berubah; tabel disusun ulang saat pesan berikutnya"""
+        self._table = None
+
+    def _update_leading(self):
+        self.leading = frozenset(p[0] for p in (self.default_prefix, *self.prefixes.values()))
+
+    # ----- jalur pesan -----
+
+    def match(self, message):
+        """(prefix, nama, perintah) untuk pesan perintah, atau None
+
+        Perintah None berarti nama tidak dikenal (dibalas CommandNotFound).
+        """
+        content = message.content
+        if not content or content[0] not in self.leading:
+            return None
+        guild = message.guild
+        if guild is None:
+            prefix = self.default_prefix
+        else:
+            prefix = self.prefixes.get(guild.id, self.default_prefix)
+        if not content.startswith(prefix):
+            return None
+        if guild is not None and self.disabled and (
+                (guild.id, None) in self.disabled
+                or (guild.id, message.channel.id) in self.disabled):
+            return None
+        rest = content[len(prefix):]
+        if not rest or rest[0].isspace():
+            return None
+        name = rest.split(None, 1)[0]
+        if self._table is None:
+            # Perintah berubah sejak tabel terakhir disusun
+            self.refresh()
+        return prefix, name, self._table.get(name)
+
+    async def dispatch(self, message):
+        """Jalankan perintah dalam pesan; kembalikan True jika pesan berisi perintah"""
+        matched = self.match(message)
+        if matched is None:
+            return False
+        prefix, name, command = matched
+        view = StringView(message.content)
+        view.skip_string(prefix)
+        view.get_word()
+        ctx = commands.Context(prefix=prefix, view=view, bot=self.bot, message=message,
+                               invoked_with=name, command=command)
+        await self.bot.invoke(ctx)
+        return True
+
+
+def _parse_prefixes(value):
+    """Parse '123=?,456=$$' menjadi {guild_id: prefix}"""
+    prefixes = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            guild_id, prefix = item.split('=', 1)
+            prefixes[int(guild_id)] = prefix.strip()
+    return prefixes
+
+
+def _parse_disabled(value):
+    """Parse '123:789,456' menjadi {(123, 789), (456, None)}"""
+    disabled = set()
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        guild_id, _, channel_id = item.partition(':')
+        disabled.add((int(guild_id), int(channel_id) if channel_id else None))
+    return disabled
+
+
+def router_from_env(bot):
+    """CommandRouter dari COMMAND_PREFIX, GUILD_PREFIXES dan DISABLED_CHANNELS"""
+    return CommandRouter(
+        bot,
+        default_prefix=os.getenv("COMMAND_PREFIX", DEFAULT_PREFIX),
+        prefixes=_parse_prefixes(os.getenv("GUILD_PREFIXES")),
+        disabled=_parse_disabled(os.getenv("DISABLED_CHANNELS")))
@@ -0,0 +1,275 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+from collections import deque
+
+# Penjadwal ekstraksi yt-dlp.
+#
+# extract_info yt-dlp berat di CPU dan IO, jadi dijalankan di process pool
+# terpisah supaya event loop gateway tidak tersendat. Penjadwal membatasi
+# jumlah ekstraksi global dan per guild (supaya satu guild tidak menghabiskan
+# semua worker), dan ekstraksi yang masih menunggu bisa dibatalkan ketika
+# peminta keluar dari voice atau player guild ditutup.
+
+log = logging.getLogger(__name__)
+
+# Instance YoutubeDL per proses worker, dibuat sekali per set opsi
+_worker_ytdl = {}
+
+# Field entri playlist flat yang dikirim balik dari worker
+FLAT_FIELDS = ('id', 'url', 'webpage_url', 'title', 'duration')
+
+# Field besar hasil ekstraksi penuh yang tidak dipakai bot; dibuang di worker
+# supaya tidak ikut di-pickle ke proses utama
+HEAVY_FIELDS = ('formats', 'requested_formats', 'thumbnails', 'automatic_captions',
+                'subtitles', 'heatmap', 'chapters', 'description', 'tags',
+                'categories', 'requested_subtitles')
+
+
+class ExtractionError(Exception):
+    """Ekstraksi gagal di worker"""
+
+
+class ExtractionCancelled(Exception):
+    """Ekstraksi dibatalkan sebelum selesai"""
+
+
+def _worker_instance(options):
+    """YoutubeDL untuk opsi ini di proses worker; yt-dlp baru diimpor di sini"""
+    import yt_dlp
+
+    key = repr(sorted(options.items()))
+    ytdl = _worker_ytdl.get(key)
+    if ytdl is None:
+        # Opsi playlist berubah tiap halaman, jangan biarkan cache membengkak
+        if len(_worker_ytdl) >= 8:
+            _worker_ytdl.clear()
+        ytdl = _worker_ytdl[key] = yt_dlp.YoutubeDL(options)
+    return ytdl
+
+
+def _warm(options):
+    """Dijalankan di proses worker: impor yt-dlp dan siapkan YoutubeDL"""
+    _worker_instance(options)
+    return os.getpid()
+
+
+def _extract(query, options):
+    """Dijalankan di proses worker: extract_info tanpa download"""
+    ytdl = _worker_instance(options)
+    try:
+        data = ytdl.extract_info(query, download=False)
+    except Exception as e:
+        # Error yt-dlp membawa traceback yang tidak bisa di-pickle
+        raise ExtractionError(str(e)) from None
+    if data is None:
+        return None
+    if options.get('extract_flat') and data.get('entries') is not None:
+        # Playlist besar: kirim hanya field yang diperlukan ke proses utama
+        data = {
+            'title': data.get('title'),
+            'entries': [{k: e.get(k) for k in FLAT_FIELDS} if e else None
+                        for e in data['entries']],
+        }
+    else:
+        data = _trim(data)
+        if data.get('entries') is not None:
+            data['entries'] = [_trim(e) if e else None for e in data['entries']]
+    # sanitize_info membuang objek yang tidak bisa di-pickle
+    return ytdl.sanitize_info(data)
+
+
+def _trim(info):
+    return {k: v for k, v in info.items() if k not in HEAVY_FIELDS}
+
+
+class _Job:
+    __slots__ = ('query', 'guild_id', 'owner', 'submitted', 'started',
+                 'cancelled', 'task')
+
+    def __init__(self, query, guild_id, owner, submitted, task):
+        self.query = query
+        self.guild_id = guild_id
+        self.owner = owner
+        self.submitted = submitted
+        self.started = False
+        self.cancelled = False
+        self.task = task
+
+
+class ExtractionScheduler:
+    """Process pool untuk ekstraksi dengan batas global dan per guild
+
+    `workers` adalah jumlah proses worker, `max_concurrent` batas ekstraksi
+    yang berjalan bersamaan dan `per_guild` batas per guild. Dengan
+    `mode="thread"` dipakai thread pool, berguna di lingkungan yang tidak
+    mendukung multiprocessing. `extract` dan `warmer` bisa diganti untuk
+    pengujian.
+    """
+
+    def __init__(self, workers=2, max_concurrent=None, per_guild=2,
+                 mode="process", extract=_extract, warmer=_warm):
+        self.workers = workers
+        self.max_concurrent = max_concurrent or workers * 2
+        self.per_guild = per_guild
+        self.mode = mode
+        self.extract = extract
+        self.warmer = warmer
+        self._warmed = set()
+        self._executor = None
+        self._global = None
+        self._guild_slots = {}
+        self._jobs = set()
+        self._waiting = 0
+        self._wait_times = deque(maxlen=512)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            if self.mode == "thread":
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="ytdl")
+            else:
+                self._executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+        return self._executor
+
+    async def run(self, query, options, *, guild_id=None, owner=None, shared=False):
+        """Jalankan ekstraksi dan kembalikan dict hasil extract_info
+
+        Memunculkan ExtractionCancelled jika dibatalkan lewat `cancel_guild`
+        atau `cancel_owner`. Ekstraksi `shared` (dipakai bersama beberapa
+        penunggu lewat SingleFlight) tidak dibatalkan di sini; yang dilepas
+        adalah penunggunya (SingleFlight.cancel).
+        """
+        loop = asyncio.get_running_loop()
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrent)
+
+        # Ekstraksi bersama tidak punya satu task pemanggil yang boleh dibatalkan
+        task = None if shared else asyncio.current_task()
+        job = _Job(query, guild_id, owner, loop.time(), task)
+        self._jobs.add(job)
+        self._waiting += 1
+        self.submitted += 1
+        slot = self._acquire_guild_slot(guild_id)
+        try:
+            async with slot[0], self._global:
+                job.started = True
+                self._waiting -= 1
+                self._wait_times.append(loop.time() - job.submitted)
+                result = await loop.run_in_executor(
+                    self.executor, self.extract, query, options)
+            self.completed += 1
+            return result
+        except asyncio.CancelledError:
+            if not job.cancelled:
+                raise
+            # Pembatalan dari penjadwal, bukan dari task pemanggil
+            if job.task is not None and hasattr(job.task, 'uncancel'):
+                job.task.uncancel()
+            raise ExtractionCancelled(f"Ekstraksi dibatalkan: {query}") from None
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            if not job.started:
+                self._waiting -= 1
+            self._jobs.discard(job)
+            self._release_guild_slot(guild_id, slot)
+
+    async def warm(self, options):
+        """Siapkan yt-dlp di worker sebelum ekstraksi pertama
+
+        Impor yt-dlp dan pembuatan YoutubeDL (daftar extractor) memakan
+        ratusan ms per proses worker; tanpa warm-up biaya ini ditanggung
+        !play pertama setelah restart. Satu tugas per worker dikirim
+        bersamaan sehingga setiap proses worker ikut dijalankan.
+        """
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self.executor, self.warmer, options)
+              for _ in range(self.workers)), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            log.warning("Warm-up yt-dlp gagal: %s", errors[0])
+        # Hasil warmer adalah pid worker yang sudah siap
+        self._warmed.update(r for r in results if not isinstance(r, BaseException))
+        return len(self._warmed)
+
+    def cancel_guild(self, guild_id):
+        """Batalkan semua ekstraksi milik guild; kembalikan jumlahnya"""
+        return self._cancel(lambda job: job.guild_id == guild_id)
+
+    def cancel_owner(self, guild_id, owner):
+        """Batalkan ekstraksi yang diminta user tertentu di guild"""
+        return self._cancel(lambda job: job.guild_id == guild_id and job.owner == owner)
+
+    def _cancel(self, predicate):
+        count = 0
+        for job in list(self._jobs):
+            if job.cancelled or job.task is None or not predicate(job):
+                continue
+            # Proses worker yang sudah berjalan tidak bisa dihentikan, tapi
+            # pemanggil langsung dilepas dan hasilnya dibuang
+            job.cancelled = True
+            job.task.cancel()
+            count += 1
+        self.cancelled += count
+        return count
+
+    def _acquire_guild_slot(self, guild_id):
+        slot = self._guild_slots.get(guild_id)
+        if slot is None:
+            slot = self._guild_slots[guild_id] = [asyncio.Semaphore(self.per_guild), 0]
+        slot[1] += 1
+        return slot
+
+    def _release_guild_slot(self, guild_id, slot):
+        slot[1] -= 1
+        if slot[1] == 0 and self._guild_slots.get(guild_id) is slot:
+            del self._guild_slots[guild_id]
+
+    def backlog(self):
+        """Jumlah ekstraksi yang belum mendapat slot; cukup murah untuk tiap perintah"""
+        return self._waiting
+
+    def stats(self):
+        """Kedalaman antrian dan waktu tunggu untuk menentukan ukuran pool"""
+        waits = sorted(self._wait_times)
+        waiting = sum(1 for job in self._jobs if not job.started)
+        return {
+            'workers': self.workers,
+            'max_concurrent': self.max_concurrent,
+            'per_guild': self.per_guild,
+            'waiting': waiting,
+            'running': len(self._jobs) - waiting,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+            'wait_avg': sum(waits) / len(waits) if waits else 0.0,
+            'wait_p95': waits[int(len(waits) * 0.95)] if waits else 0.0,
+            'wait_max': waits[-1] if waits else 0.0,
+            'warmed': len(self._warmed),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def scheduler_from_env():
+    """Buat penjadwal dari environment variable YTDL_WORKERS dkk."""
+    workers = int(os.getenv("YTDL_WORKERS", str(min(4, os.cpu_count() or 1))))
+    return ExtractionScheduler(
+        workers=workers,
+        max_concurrent=int(os.getenv("YTDL_MAX_CONCURRENT", "0")) or None,
+        per_guild=int(os.getenv("YTDL_GUILD_LIMIT", "2")),
+        mode=os.getenv("YTDL_POOL", "process"),
+    )
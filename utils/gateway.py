@@ -0,0 +1,72 @@
+import os
+
+import discord
+
+# Profil runtime gateway.
+#
+# Profil "lean" hanya menyalakan intent yang dipakai perintah musik (guild,
+# voice state, pesan guild dan isi pesan), hanya menyimpan member yang sedang
+# berada di voice, mematikan cache pesan dan tidak melakukan chunking member
+# saat startup. Memori tidak lagi tumbuh mengikuti total member semua guild.
+# Profil "full" adalah perilaku lama: semua intent dan cache bawaan discord.py.
+
+PROFILES = ('lean', 'full')
+
+
+def shard_options():
+    """shard_ids/shard_count dari env SHARD_IDS dan SHARD_COUNT (mode worker)"""
+    shard_ids = os.getenv("SHARD_IDS")
+    if not shard_ids:
+        return {}
+    return {
+        'shard_ids': [int(i) for i in shard_ids.split(',')],
+        'shard_count': int(os.getenv("SHARD_COUNT")),
+    }
+
+
+def bot_options(profile=None, max_messages=None):
+    """Keyword argument untuk commands.Bot sesuai profil
+
+    `profile` default dari env BOT_PROFILE (lean). `max_messages` default
+    dari env BOT_MAX_MESSAGES; di profil lean cache pesan mati jika kosong.
+    Jika proses dijalankan sebagai worker shard, shard_ids dan shard_count
+    ikut disertakan (pakai commands.AutoShardedBot).
+    """
+    options = _profile_options(profile, max_messages)
+    options.update(shard_options())
+    return options
+
+
+def _profile_options(profile, max_messages):
+    profile = profile or os.getenv("BOT_PROFILE", "lean")
+    if profile not in PROFILES:
+        raise ValueError(f"BOT_PROFILE harus salah satu dari {PROFILES}, bukan {profile!r}")
+
+    if max_messages is None and os.getenv("BOT_MAX_MESSAGES"):
+        max_messages = int(os.getenv("BOT_MAX_MESSAGES")) or None
+
+    if profile == "full":
+        intents = discord.Intents.all()
+        intents.message_content = True
+        return {
+            'intents': intents,
+            'max_messages': max_messages if max_messages is not None else 1000,
+        }
+
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    # Perintah lewat DM (misalnya !help) tetap dijawab
+    intents.dm_messages = True
+    intents.message_content = True
+    intents.voice_states = True
+
+    member_cache_flags = discord.MemberCacheFlags.none()
+    member_cache_flags.voice = True
+
+    return {
+        'intents': intents,
+        'member_cache_flags': member_cache_flags,
+        'max_messages': max_messages,
+        'chunk_guilds_at_startup': False,
+    }
@@ -0,0 +1,177 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+# Logging terstruktur dan asinkron.
+#
+# Semua record masuk ke QueueHandler (murah, tidak menyentuh IO) dan ditulis
+# oleh thread listener terpisah sebagai JSON per baris, jadi event loop tidak
+# pernah tertahan oleh terminal atau pipe yang lambat. Level bisa diatur per
+# kategori (nama logger) dan event yang ramai bisa di-sampling dengan batas
+# jumlah record per detik; WARNING ke atas tidak pernah di-sampling.
+
+# Level default per kategori; bisa ditimpa lewat LOG_LEVELS
+DEFAULT_LEVELS = {
+    'bot.message': logging.WARNING,
+    'bot.command': logging.INFO,
+    'discord': logging.INFO,
+    'discord.gateway': logging.WARNING,
+}
+
+# Batas record per detik untuk kategori yang ramai; bisa ditimpa lewat LOG_RATES
+DEFAULT_RATES = {
+    'bot.message': 20,
+    'bot.command': 50,
+}
+
+# Atribut bawaan LogRecord yang tidak ikut dikirim sebagai field tambahan
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_listener = None
+_lock = threading.Lock()
+_samplers = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format record sebagai satu objek JSON per baris"""
+
+    def format(self, record):
+        data = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'category': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Batasi jumlah record per detik untuk satu kategori
+
+    Record DEBUG/INFO di atas batas dibuang dan dihitung; jumlah yang dibuang
+    dicatat di field `suppressed` pada record berikutnya yang lolos. WARNING
+    ke atas selalu lolos dan tidak memakai jatah. Untuk jalur
+    yang sangat ramai, panggil `allow()` sebelum membuat record (lihat
+    `sampler()`) supaya record yang akan dibuang tidak pernah dibuat.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self.suppressed = 0
+
+    def allow(self):
+        """Ambil satu token; False jika batas per detik sudah terlampaui"""
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < 1:
+            self.suppressed += 1
+            return False
+        self._tokens -= 1
+        return True
+
+    def filter(self, record):
+        if (record.levelno < logging.WARNING and not getattr(record, '_sampled', False)
+                and not self.allow()):
+            return False
+        if self.suppressed:
+            record.suppressed = self.suppressed
+            self.suppressed = 0
+        return True
+
+
+class _AlwaysAllow:
+    suppressed = 0
+
+    def allow(self):
+        return True
+
+
+class LoopSafeQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang tidak memformat record di thread pemanggil
+
+    QueueHandler bawaan memformat pesan (termasuk traceback) sebelum masuk
+    antrian, artinya di event loop. Karena antriannya in-process, record bisa
+    diteruskan apa adanya dan diformat oleh thread listener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def _parse_mapping(value, convert):
+    """Parse 'kategori=nilai,kategori=nilai' dari environment variable"""
+    result = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, raw = item.split('=', 1)
+            result[name.strip()] = convert(raw.strip())
+    return result
+
+
+def _level(value):
+    return int(value) if value.isdigit() else logging.getLevelName(value.upper())
+
+
+def sampler(name):
+    """Rate limiter untuk kategori `name`, untuk dicek sebelum membuat record
+
+    Record yang lolos harus diberi `extra={'_sampled': True}` supaya tidak
+    dihitung dua kali oleh filter kategori.
+    """
+    return _samplers.get(name) or _AlwaysAllow()
+
+
+def setup_logging(level=None, levels=None, rates=None, stream=None):
+    """Pasang QueueHandler + listener thread untuk root logger
+
+    Aman dipanggil berkali-kali; hanya panggilan pertama yang berpengaruh.
+    `LOG_LEVEL`, `LOG_LEVELS`, `LOG_RATES` dan `LOG_FORMAT` (json/text)
+    dibaca dari environment jika argumen tidak diisi.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        level = level or _level(os.getenv('LOG_LEVEL', 'INFO'))
+        levels = dict(DEFAULT_LEVELS, **(levels or _parse_mapping(os.getenv('LOG_LEVELS'), _level)))
+        rates = dict(DEFAULT_RATES, **(rates or _parse_mapping(os.getenv('LOG_RATES'), float)))
+
+        handler = logging.StreamHandler(stream or sys.stdout)
+        if os.getenv('LOG_FORMAT', 'json') == 'text':
+            handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
+        else:
+            handler.setFormatter(JsonFormatter())
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for old in list(root.handlers):
+            root.removeHandler(old)
+        root.addHandler(LoopSafeQueueHandler(log_queue))
+        root.setLevel(level)
+
+        for name, category_level in levels.items():
+            logging.getLogger(name).setLevel(category_level)
+        for name, rate in rates.items():
+            _samplers[name] = RateLimitFilter(rate)
+            logging.getLogger(name).addFilter(_samplers[name])
+
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
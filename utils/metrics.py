@@ -0,0 +1,226 @@
+import bisect
+import time
+from contextlib import contextmanager
+
+# Metrik sederhana dengan format teks Prometheus.
+#
+# Tidak memakai prometheus_client supaya tidak menambah dependency; cukup
+# counter, gauge dan histogram dengan label, yang dirender oleh
+# `render()` untuk endpoint /metrics di main.py.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Label {self.name} harus {self.labelnames}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}",
+                f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield self.name + _format_labels(self.labelnames, key), value
+
+
+class Counter(_Metric):
+    """Nilai yang hanya bertambah"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Nilai yang bisa naik turun, atau dihitung saat scrape lewat `func`"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), func=None):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.func is None:
+            yield from super().samples()
+            return
+        # func mengembalikan angka atau dict {tuple label: nilai}
+        result = self.func()
+        if isinstance(result, dict):
+            for key, value in sorted(result.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                yield self.name + _format_labels(self.labelnames, key), value
+        else:
+            yield self.name, result
+
+
+class Histogram(_Metric):
+    """Distribusi nilai (misalnya latensi dalam detik) per bucket"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # [jumlah per bucket..., +Inf], total, count
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                yield f"{self.name}_bucket{labels}", cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels}", total
+            yield f"{self.name}_count{labels}", count
+
+
+class Registry:
+    """Kumpulan metrik yang dirender bersama"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metrik {metric.name} sudah terdaftar")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Render semua metrik dalam format teks Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            for name, value in metric.samples():
+                lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=(), func=None):
+    return REGISTRY.register(Gauge(name, documentation, labelnames, func))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ----- metrik bot musik -----
+
+COMMAND_LATENCY = histogram(
+    'bot_command_duration_seconds', 'Waktu eksekusi perintah dari pre-invoke sampai selesai',
+    ('command', 'outcome'))
+EXTRACT_LATENCY = histogram(
+    'ytdl_extract_duration_seconds', 'Waktu ekstraksi yt-dlp', ('outcome',))
+TIME_TO_FIRST_AUDIO = histogram(
+    'play_time_to_first_audio_seconds', 'Waktu dari perintah play sampai audio mulai diputar')
+PLAY_STAGE_LATENCY = histogram(
+    'play_stage_duration_seconds', 'Durasi tiap tahap perintah play sampai audio mulai',
+    ('stage',))
+VOICE_CONNECT_LATENCY = histogram(
+    'voice_connect_duration_seconds', 'Waktu koneksi ke channel suara (ok/move/timeout/error)',
+    ('outcome',))
+PLAYER_ERRORS = counter(
+    'player_errors_total', 'Error dari player audio per jenis', ('type',))
+
+
+def instrument_bot(bot):
+    """Pasang pengukur latensi ke semua perintah yang terdaftar di bot
+
+    Memakai hook before_invoke/after_invoke global milik bot karena keduanya
+    dipanggil langsung di jalur eksekusi perintah (bukan lewat dispatch event).
+    """
+
+    async def before_invoke(ctx):
+        ctx.metrics_started = time.perf_counter()
+
+    async def after_invoke(ctx):
+        started = getattr(ctx, 'metrics_started', None)
+        if started is not None and ctx.command is not None:
+            COMMAND_LATENCY.observe(
+                time.perf_counter() - started, command=ctx.command.qualified_name,
+                outcome='error' if ctx.command_failed else 'ok')
+
+    bot.before_invoke(before_invoke)
+    bot.after_invoke(after_invoke)
+
+    gauge('bot_voice_clients', 'Jumlah voice client aktif',
+          func=lambda: len(bot.voice_clients))
+    gauge('bot_guilds', 'Jumlah guild', func=lambda: len(bot.guilds))
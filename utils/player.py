@@ -0,0 +1,397 @@
+import asyncio
+import logging
+from collections import deque
+
+from utils import metrics
+from utils.extractor import ExtractionCancelled
+
+# Player antrian per guild.
+#
+# Setiap guild punya satu GuildPlayer yang menyimpan deque berisi Track.
+# Pergantian lagu digerakkan oleh callback `after=` dari voice_client.play,
+# dan selama lagu saat ini diputar, lagu berikutnya sudah di-resolve dan
+# dibuka (FFmpeg sudah jalan) di background supaya tidak ada jeda.
+
+log = logging.getLogger(__name__)
+
+
+class Track:
+    """Satu entri antrian"""
+
+    # Playlist bisa berisi ribuan track, jadi simpan sehemat mungkin
+    __slots__ = ('query', 'title', 'requester', 'channel', 'ctx', 'guild_id', 'resolved',
+                 'data', 'start', 'seq')
+
+    def __init__(self, query, requester=None, channel=None, ctx=None, title=None,
+                 data=None, start=0.0, guild_id=None):
+        self.query = query
+        self.title = title or query
+        self.requester = requester
+        self.channel = channel
+        self.ctx = ctx
+        # Disimpan langsung: track yang dipulihkan bisa tanpa ctx dan tanpa
+        # channel teks (channel-nya sudah dihapus)
+        if guild_id is None:
+            guild = getattr(ctx or channel, 'guild', None)
+            guild_id = guild.id if guild is not None else None
+        self.guild_id = guild_id
+        # Hasil resolver (objek dengan atribut .title dan .source)
+        self.resolved = None
+        # Metadata ekstraksi dan posisi awal (detik) untuk track yang
+        # dipulihkan dari state tersimpan (lihat utils.playerstate)
+        self.data = data
+        self.start = start
+        # Nomor baris di state tersimpan
+        self.seq = None
+
+    def cleanup(self):
+        """Tutup source yang sudah dibuka tapi tidak jadi diputar"""
+        resolved, self.resolved = self.resolved, None
+        source = getattr(resolved, 'source', None)
+        if source is not None and hasattr(source, 'cleanup'):
+            try:
+                source.cleanup()
+            except Exception:
+                log.exception("Gagal membersihkan source %s", self.title)
+
+
+class GuildPlayer:
+    """Mesin antrian pemutaran untuk satu guild
+
+    `resolver` adalah coroutine function `resolver(track)` yang mengembalikan
+    objek dengan atribut `title` dan `source` (AudioSource yang siap diputar),
+    misalnya hasil `YTDLSource.create_source`. `voice_client` cukup objek
+    yang punya `play(source, after=...)`, `stop()`, `is_playing()` dan
+    `is_paused()`, jadi player ini bisa diuji dengan voice client palsu.
+    Selama `is_connected()` (jika ada) False, antrian tidak dijalankan.
+
+    `observer(player, event, track)` dipanggil untuk setiap perubahan state
+    ('queued', 'resolved', 'started', 'dropped', 'finished', 'cleared',
+    'volume', 'closed'), misalnya untuk menyimpannya ke disk.
+    """
+
+    def __init__(self, guild_id, loop, resolver, voice_client=None):
+        self.guild_id = guild_id
+        self.loop = loop
+        self.resolver = resolver
+        self.voice_client = voice_client
+        self.queue = deque()
+        self.current = None
+        self.volume = 1.0
+        self._prefetch = None
+        self._advancing = False
+        self._closed = False
+        self._tasks = set()
+        self.observer = None
+
+    # ----- status -----
+
+    def is_active(self):
+        """True jika ada lagu yang sedang diputar atau sedang disiapkan"""
+        return self.current is not None or self._advancing
+
+    def upcoming(self, limit=None):
+        """Daftar track berikutnya (tanpa lagu yang sedang diputar)"""
+        items = list(self.queue)
+        return items if limit is None else items[:limit]
+
+    # ----- operasi antrian -----
+
+    async def add(self, track):
+        """Tambahkan track ke antrian
+
+        Jika player sedang idle, track langsung di-resolve dan diputar, lalu
+        dikembalikan True bila track itu berhasil mulai diputar. Jika ada lagu
+        yang sedang diputar, track masuk antrian, prefetch dijalankan bila
+        perlu, lalu dikembalikan False.
+        """
+        if self._closed:
+            raise RuntimeError("Player sudah ditutup")
+
+        self.queue.append(track)
+        self._notify('queued', track)
+        if self.is_active():
+            self._schedule_prefetch()
+            return False
+
+        await self._advance()
+        return self.current is track
+
+    async def extend(self, tracks):
+        """Masukkan track dari async iterator ke antrian satu per satu
+
+        Track pertama langsung diputar jika player idle, sisanya masuk antrian
+        dan baru di-resolve ketika mendekati giliran diputar. Mengembalikan
+        jumlah track yang ditambahkan.
+        """
+        count = 0
+        async for track in tracks:
+            if self._closed:
+                break
+            await self.add(track)
+            count += 1
+        return count
+
+    async def restore(self, tracks):
+        """Isi antrian dengan track dari state tersimpan lalu mulai lagu pertama
+
+        Track tidak dilaporkan ulang sebagai 'queued' karena sudah tersimpan.
+        """
+        if self._closed:
+            raise RuntimeError("Player sudah ditutup")
+        self.queue.extend(tracks)
+        await self._advance(announce=True)
+
+    def attach(self, voice_client):
+        """Pakai voice client baru (misalnya setelah koneksi ulang) dan lanjutkan antrian"""
+        self.voice_client = voice_client
+        if not self._closed and not self.is_active() and self.queue:
+            self.spawn(self._advance(announce=True))
+
+    def spawn(self, coro):
+        """Jalankan task background milik player; dibatalkan saat destroy"""
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def clear(self):
+        """Kosongkan antrian tanpa menghentikan lagu saat ini"""
+        self._cancel_prefetch()
+        while self.queue:
+            self.queue.popleft().cleanup()
+        self._notify('cleared')
+
+    def skip(self):
+        """Hentikan lagu saat ini; callback after akan memutar lagu berikutnya"""
+        if self.voice_client is not None and (
+                self.voice_client.is_playing() or self.voice_client.is_paused()):
+            self.voice_client.stop()
+            return True
+        return False
+
+    def set_volume(self, volume):
+        """Simpan volume (0.0-1.0) dan terapkan ke source yang sedang diputar
+
+        Source PCM diatur langsung lewat atribut `volume`; source Opus yang
+        volumenya terpasang di FFmpeg dibuka ulang dari posisi saat ini.
+        """
+        self.volume = volume
+        self._notify('volume')
+        source = getattr(self.voice_client, 'source', None)
+        if source is not None and hasattr(source, 'volume'):
+            source.volume = volume
+        elif source is not None and self.current is not None:
+            self._reopen(self.current)
+
+    def destroy(self):
+        """Tutup player: batalkan prefetch dan bersihkan semua source"""
+        self._notify('closed')
+        self.observer = None
+        self._closed = True
+        for task in list(self._tasks):
+            task.cancel()
+        self.clear()
+        self.current = None
+        players.pop(self.guild_id, None)
+
+    # ----- internal -----
+
+    def _disconnected(self):
+        is_connected = getattr(self.voice_client, 'is_connected', None)
+        return is_connected is not None and not is_connected()
+
+    def _notify(self, event, track=None):
+        if self.observer is None:
+            return
+        try:
+            self.observer(self, event, track)
+        except Exception:
+            log.exception("Observer player gagal memproses %s", event)
+
+    def _schedule_prefetch(self):
+        """Mulai resolve lagu berikutnya di background jika belum berjalan"""
+        if self._closed or not self.queue or self._prefetch is not None:
+            return
+        head = self.queue[0]
+        if head.resolved is not None:
+            return
+        self._prefetch = self.loop.create_task(self._resolve(head))
+        self._prefetch.add_done_callback(self._prefetch_done)
+
+    def _prefetch_done(self, task):
+        if self._prefetch is task:
+            self._prefetch = None
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and not isinstance(error, ExtractionCancelled):
+            log.warning("Prefetch gagal: %s", error)
+
+    def _cancel_prefetch(self):
+        task, self._prefetch = self._prefetch, None
+        if task is not None and not task.done():
+            task.cancel()
+
+    async def _resolve(self, track):
+        resolved = await self.resolver(track)
+        if self._closed or (track not in self.queue and track is not self.current):
+            # Track sudah dibuang (clear/skip) selama resolve berjalan
+            source = getattr(resolved, 'source', None)
+            if source is not None and hasattr(source, 'cleanup'):
+                source.cleanup()
+            return None
+        track.resolved = resolved
+        track.title = getattr(resolved, 'title', track.title)
+        self._notify('resolved', track)
+        return resolved
+
+    async def _advance(self, announce=False):
+        """Ambil track berikutnya dari antrian dan mulai memutarnya
+
+        `announce` menentukan apakah judul lagu dikirim ke channel track;
+        pemanggilan dari perintah play tidak perlu karena sudah dibalas.
+        """
+        if self._advancing or self._closed:
+            return
+        self._advancing = True
+        try:
+            while self.queue and not self._closed:
+                if self._disconnected():
+                    # Antrian disimpan sampai voice tersambung lagi (attach)
+                    break
+                track = self.queue[0]
+                if track.resolved is None:
+                    try:
+                        if self._prefetch is not None:
+                            await asyncio.shield(self._prefetch)
+                        if track.resolved is None:
+                            await self._resolve(track)
+                    except (asyncio.CancelledError, ExtractionCancelled) as e:
+                        if isinstance(e, asyncio.CancelledError) and (
+                                self._closed or asyncio.current_task().cancelling()):
+                            raise
+                        # Yang dibatalkan hanya ekstraksinya (misalnya pemiliknya
+                        # keluar dari voice): buang track itu tanpa pesan gagal. Prefetch yang sudah
+                        # batal harus dilepas, kalau tidak shield() langsung
+                        # raise lagi dan loop ini berputar tanpa pernah yield.
+                        if self._prefetch is not None and self._prefetch.done():
+                            self._prefetch = None
+                        if self.queue and self.queue[0] is track:
+                            self.queue.popleft()
+                            track.cleanup()
+                            self._notify('dropped', track)
+                        continue
+                    except Exception as e:
+                        log.error("Gagal memuat %s: %s", track.query, e)
+                        if self.queue and self.queue[0] is track:
+                            self.queue.popleft()
+                            self._notify('dropped', track)
+                        self._announce(track, f"Gagal memuat **{track.query}**: {e}")
+                        continue
+
+                if not self.queue or self.queue[0] is not track:
+                    continue
+                self.queue.popleft()
+                if self._start(track):
+                    self._notify('started', track)
+                    if announce:
+                        self._announce(track, f"▶️ Memutar: **{track.title}**")
+                    break
+                self._notify('dropped', track)
+        finally:
+            self._advancing = False
+
+    def _start(self, track):
+        """Serahkan source ke voice client; kembalikan True jika berhasil"""
+        if self.voice_client is None:
+            track.cleanup()
+            return False
+
+        resolved = track.resolved
+        if hasattr(resolved.source, 'volume'):
+            resolved.source.volume = self.volume
+        elif hasattr(resolved, 'reopen') and resolved.volume != self.volume:
+            # Di-prefetch dengan volume lama; belum diputar jadi mulai dari awal
+            resolved.reopen(self.volume).cleanup()
+        source = resolved.source
+
+        try:
+            self.voice_client.play(source, after=self._after)
+        except Exception as e:
+            log.error("Tidak dapat memutar %s: %s", track.title, e)
+            track.cleanup()
+            return False
+
+        self.current = track
+        # Lagu baru sudah jalan, siapkan lagu berikutnya di background
+        self._schedule_prefetch()
+        return True
+
+    def _reopen(self, track):
+        """Ganti source yang sedang diputar dengan source bervolume baru"""
+        resolved = track.resolved
+        if not hasattr(resolved, 'reopen') or resolved.volume == self.volume:
+            return
+        try:
+            old = resolved.reopen(self.volume)
+        except Exception as e:
+            log.error("Gagal membuka ulang %s: %s", track.title, e)
+            return
+        try:
+            self.voice_client.source = resolved.source
+        except Exception as e:
+            log.error("Gagal mengganti volume %s: %s", track.title, e)
+            resolved.source, new = old, resolved.source
+            new.cleanup()
+            return
+        # Thread player mungkin masih membaca frame terakhir dari source lama
+        self.loop.call_later(1, old.cleanup)
+
+    def _after(self, error):
+        """Callback dari thread player discord.py"""
+        if error:
+            log.error("Player error: %s", error)
+            metrics.PLAYER_ERRORS.inc(type=type(error).__name__)
+        self.loop.call_soon_threadsafe(self._on_track_end)
+
+    def _on_track_end(self):
+        self.current = None
+        self._notify('finished')
+        if not self._closed:
+            self.loop.create_task(self._advance(announce=True))
+
+    def _announce(self, track, message):
+        """Kirim pesan ke channel teks milik track (jika ada)"""
+        if track.channel is None:
+            return
+        task = self.loop.create_task(track.channel.send(message))
+        task.add_done_callback(_log_send_error)
+
+
+def _log_send_error(task):
+    if not task.cancelled() and task.exception() is not None:
+        log.warning("Gagal mengirim pesan antrian: %s", task.exception())
+
+
+# Registry player per guild
+players = {}
+
+
+def get_player(guild_id, loop, resolver, voice_client=None):
+    """Ambil player untuk guild, buat baru jika belum ada"""
+    player = players.get(guild_id)
+    if player is None:
+        player = GuildPlayer(guild_id, loop, resolver, voice_client)
+        players[guild_id] = player
+    elif voice_client is not None:
+        player.voice_client = voice_client
+    return player
+
+
+metrics.gauge('player_active', 'Jumlah player guild yang sedang memutar',
+              func=lambda: sum(1 for p in players.values() if p.current is not None))
+metrics.gauge('player_queue_tracks', 'Total track di semua antrian guild',
+              func=lambda: sum(len(p.queue) for p in players.values()))
+metrics.gauge('player_queue_max', 'Panjang antrian guild terpanjang',
+              func=lambda: max((len(p.queue) for p in players.values()), default=0))
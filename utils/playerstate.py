@@ -0,0 +1,237 @@
+import itertools
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# State player guild yang bertahan setelah restart.
+#
+# Setiap perubahan pada GuildPlayer (track masuk antrian, mulai diputar,
+# dilewati, volume diganti, dsb.) dikirim lewat `PlayerStore.observe` sebagai
+# perubahan kecil ke SQLite (WAL): satu baris per track di antrian dan satu
+# baris per guild untuk lagu saat ini, posisi, volume dan channel. Penulisan
+# dilakukan thread terpisah yang menggabungkan beberapa perubahan dalam satu
+# transaksi, jadi event loop tidak pernah menunggu disk.
+#
+# Saat bot start ulang, `load()` mengembalikan state semua guild sehingga cog
+# musik bisa masuk lagi ke channel suara dan melanjutkan lagu dari posisi
+# terakhir. Metadata hasil ekstraksi ikut disimpan, jadi track yang URL
+# stream-nya masih berlaku tidak perlu dicari ulang.
+
+log = logging.getLogger(__name__)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS players ("
+    " guild_id INTEGER PRIMARY KEY, voice_channel INTEGER, text_channel INTEGER,"
+    " volume REAL NOT NULL DEFAULT 1.0, current TEXT, position REAL NOT NULL DEFAULT 0,"
+    " updated REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS queue ("
+    " guild_id INTEGER NOT NULL, seq INTEGER NOT NULL, track TEXT NOT NULL,"
+    " PRIMARY KEY (guild_id, seq))",
+)
+
+# Kolom tabel players yang boleh diubah lewat save_player
+PLAYER_FIELDS = ('voice_channel', 'text_channel', 'volume', 'current', 'position')
+
+
+def track_row(track):
+    """Data track yang disimpan: query, judul, peminta dan metadata ekstraksi"""
+    requester = track.requester
+    return {
+        'query': track.query,
+        'title': track.title,
+        'requester': str(requester) if requester is not None else None,
+        'data': getattr(track.resolved, 'data', None) or track.data,
+    }
+
+
+class PlayerStore:
+    """Penyimpanan state player per guild di SQLite
+
+    Semua method tulis hanya memasukkan perintah ke antrian thread penulis,
+    jadi aman dipanggil dari event loop. `flush()` menunggu sampai semua
+    perubahan sebelumnya tersimpan.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.writes = 0
+        self.batches = 0
+        self.errors = 0
+        self._queue = queue.SimpleQueue()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+        last = self._db.execute("SELECT MAX(seq) FROM queue").fetchone()[0]
+        self._seq = itertools.count((last or 0) + 1)
+        self._thread = threading.Thread(target=self._writer, name='player-state', daemon=True)
+        self._thread.start()
+
+    # ----- baca -----
+
+    def load(self):
+        """State tersimpan: {guild_id: {voice_channel, text_channel, volume,
+        current, position, queue}}"""
+        self.flush()
+        states = {}
+        for guild_id, voice, text, volume, current, position in self._read(
+                "SELECT guild_id, voice_channel, text_channel, volume, current, position"
+                " FROM players"):
+            states[guild_id] = {
+                'voice_channel': voice, 'text_channel': text, 'volume': volume,
+                'current': json.loads(current) if current else None,
+                'position': position, 'queue': [],
+            }
+        for guild_id, seq, track in self._read(
+                "SELECT guild_id, seq, track FROM queue ORDER BY guild_id, seq"):
+            state = states.setdefault(guild_id, {
+                'voice_channel': None, 'text_channel': None, 'volume': 1.0,
+                'current': None, 'position': 0.0, 'queue': []})
+            state['queue'].append(dict(json.loads(track), seq=seq))
+        return states
+
+    def _read(self, sql):
+        # Dipanggil setelah flush(), saat thread penulis sedang menunggu antrian
+        try:
+            return self._db.execute(sql).fetchall()
+        except sqlite3.Error as e:
+            log.warning("Gagal membaca state player %s: %s", self.path, e)
+            return []
+
+    # ----- tulis -----
+
+    def save_player(self, guild_id, **fields):
+        """Ubah sebagian kolom state guild (dibuat jika belum ada)"""
+        unknown = set(fields) - set(PLAYER_FIELDS)
+        if unknown:
+            raise ValueError(f"Kolom state player tidak dikenal: {sorted(unknown)}")
+        if 'current' in fields and fields['current'] is not None:
+            fields['current'] = json.dumps(fields['current'])
+        columns = ', '.join(fields)
+        updates = ', '.join(f"{name} = excluded.{name}" for name in fields)
+        self._put(
+            f"INSERT INTO players (guild_id, updated{', ' if fields else ''}{columns})"
+            f" VALUES ({', '.join('?' * (len(fields) + 2))})"
+            f" ON CONFLICT(guild_id) DO UPDATE SET updated = excluded.updated"
+            f"{', ' if fields else ''}{updates}",
+            (guild_id, time.time(), *fields.values()))
+
+    def push(self, guild_id, seq, row):
+        self._put("INSERT OR REPLACE INTO queue VALUES (?, ?, ?)",
+                  (guild_id, seq, json.dumps(row)))
+
+    def pop(self, guild_id, seq):
+        self._put("DELETE FROM queue WHERE guild_id = ? AND seq = ?", (guild_id, seq))
+
+    def clear_queue(self, guild_id):
+        self._put("DELETE FROM queue WHERE guild_id = ?", (guild_id,))
+
+    def forget(self, guild_id):
+        """Hapus semua state guild (misalnya setelah !leave)"""
+        self.clear_queue(guild_id)
+        self._put("DELETE FROM players WHERE guild_id = ?", (guild_id,))
+
+    def flush(self, timeout=5):
+        """Tunggu sampai semua perubahan yang sudah diantrikan tersimpan"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._thread = None
+        self._db.close()
+
+    def stats(self):
+        return {'writes': self.writes, 'batches': self.batches, 'errors': self.errors,
+                'pending': self._queue.qsize()}
+
+    # ----- observer GuildPlayer -----
+
+    def observe(self, player, event, track=None):
+        """Terjemahkan event GuildPlayer menjadi perubahan state tersimpan"""
+        guild_id = player.guild_id
+        if event == 'queued':
+            track.seq = next(self._seq)
+            self.push(guild_id, track.seq, track_row(track))
+            if track.channel is not None:
+                self.save_player(guild_id, text_channel=track.channel.id)
+        elif event == 'resolved':
+            if track.seq is not None and track is not player.current:
+                self.push(guild_id, track.seq, track_row(track))
+        elif event == 'started':
+            if track.seq is not None:
+                self.pop(guild_id, track.seq)
+            voice = getattr(getattr(player.voice_client, 'channel', None), 'id', None)
+            self.save_player(guild_id, current=track_row(track), position=track.start,
+                             voice_channel=voice, volume=player.volume)
+        elif event == 'dropped':
+            if track.seq is not None:
+                self.pop(guild_id, track.seq)
+        elif event == 'finished':
+            self.save_player(guild_id, current=None, position=0.0)
+        elif event == 'cleared':
+            self.clear_queue(guild_id)
+        elif event == 'volume':
+            self.save_player(guild_id, volume=player.volume)
+        elif event == 'closed':
+            self.forget(guild_id)
+
+    def checkpoint(self, player):
+        """Simpan posisi pemutaran lagu saat ini"""
+        source = getattr(player.voice_client, 'source', None)
+        position = getattr(source, 'position', None)
+        if player.current is not None and position is not None:
+            self.save_player(player.guild_id, position=round(position, 2))
+
+    # ----- thread penulis -----
+
+    def _put(self, sql, params):
+        self._queue.put((sql, params))
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            # Gabungkan semua perubahan yang sudah menunggu dalam satu transaksi
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            statements = [item for item in batch if isinstance(item, tuple)]
+            if statements:
+                try:
+                    with self._db:
+                        for sql, params in statements:
+                            self._db.execute(sql, params)
+                    self.writes += len(statements)
+                    self.batches += 1
+                except sqlite3.Error as e:
+                    self.errors += 1
+                    log.warning("Gagal menyimpan state player: %s", e)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if None in batch:
+                return
+
+
+def store_from_env():
+    """PlayerStore dari PLAYER_STATE_PATH, atau None jika tidak diaktifkan"""
+    path = os.getenv("PLAYER_STATE_PATH")
+    if not path:
+        return None
+    try:
+        return PlayerStore(path)
+    except sqlite3.Error as e:
+        log.warning("State player %s tidak bisa dibuka: %s", path, e)
+        return None
@@ -0,0 +1,263 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from discord.ext import commands
+
+from utils import metrics
+
+# Pembatas laju perintah bot.
+#
+# Setiap perintah punya biaya token (play mahal, ping murah) yang diambil
+# sekaligus dari tiga token bucket: milik user, milik guild dan global.
+# Perintah hanya jalan jika ketiganya cukup, jadi satu user yang spam tidak
+# menghabiskan jatah guild, dan raid di satu guild tidak menghabiskan jatah
+# guild lain. Selain itu perintah mahal ditolak lebih awal (load shedding)
+# ketika sinyal beban seperti antrian ekstraksi atau lag event loop melewati
+# batasnya. Pembatas dipasang sebagai global check bot, jadi berjalan
+# sebelum argumen di-parse dan sebelum hook before_invoke.
+
+log = logging.getLogger(__name__)
+
+SCOPES = ('user', 'guild', 'global')
+
+# Laju isi ulang (token/detik) dan kapasitas per scope; bisa ditimpa lewat
+# COMMAND_LIMITS="user=1/15,guild=3/40,global=200/1000"
+DEFAULT_LIMITS = {
+    'user': (1.0, 15.0),
+    'guild': (3.0, 40.0),
+    'global': (200.0, 1000.0),
+}
+
+# Biaya token per perintah (default 1); bisa ditimpa lewat COMMAND_COSTS
+DEFAULT_COSTS = {
+    'play': 5.0,
+    'join': 3.0,
+    'leave': 2.0,
+    'help': 0.5,
+    'info': 0.5,
+    'ping': 0.2,
+}
+
+# Nama untuk perintah yang tidak dikenal (typo, spam `!asdf`); biayanya bisa
+# diatur lewat COMMAND_COSTS seperti perintah lain
+UNKNOWN_COMMAND = '<unknown>'
+
+# Perintah dengan biaya minimal ini yang ditolak ketika bot kelebihan beban
+SHED_COST = 3.0
+
+# Jumlah bucket per scope yang disimpan; bucket paling lama tidak dipakai dibuang
+MAX_BUCKETS = 50000
+
+DECISIONS = metrics.counter(
+    'command_limiter_decisions_total', 'Keputusan pembatas laju per perintah',
+    ('command', 'decision'))
+
+
+class RateLimited(commands.CheckFailure):
+    """Perintah ditolak karena token bucket `scope` habis"""
+
+    def __init__(self, scope, retry_after, notify=True):
+        super().__init__(f"Batas perintah {scope} tercapai, coba lagi dalam {retry_after:.1f} detik")
+        self.scope = scope
+        self.retry_after = retry_after
+        # False jika user sudah diberi tahu dan belum lewat waktunya
+        self.notify = notify
+
+
+class Overloaded(commands.CheckFailure):
+    """Perintah mahal ditolak karena sinyal beban `signal` melewati batas"""
+
+    def __init__(self, signal, value, notify=True):
+        super().__init__(f"Bot sedang sibuk ({signal}={value:.2f})")
+        self.signal = signal
+        self.value = value
+        self.notify = notify
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst, now):
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, rate, burst, now):
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        return self.tokens
+
+
+class CommandLimiter:
+    """Token bucket per user, per guild dan global dengan biaya per perintah
+
+    `limits` memetakan scope ke (laju token/detik, kapasitas); scope yang
+    tidak ada berarti tidak dibatasi. `costs` memetakan nama perintah ke
+    biayanya. Sinyal beban didaftarkan lewat `watch()`.
+    """
+
+    def __init__(self, limits=None, costs=None, shed_cost=SHED_COST, max_buckets=MAX_BUCKETS):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.costs = dict(DEFAULT_COSTS if costs is None else costs)
+        self.shed_cost = shed_cost
+        self.max_buckets = max_buckets
+        self.enabled = True
+        self._buckets = {scope: OrderedDict() for scope in SCOPES}
+        self._signals = {}
+        # user/guild -> waktu sampai penolakan berikutnya tidak perlu dibalas
+        self._notified = OrderedDict()
+
+    def cost(self, command):
+        return self.costs.get(command, 1.0)
+
+    def watch(self, name, func, threshold):
+        """Tolak perintah mahal selama `func()` lebih dari `threshold`"""
+        self._signals[name] = (func, threshold)
+
+    def unwatch(self, name):
+        self._signals.pop(name, None)
+
+    def overloaded(self):
+        """(nama sinyal, nilai) pertama yang melewati batas, atau None"""
+        for name, (func, threshold) in self._signals.items():
+            try:
+                value = func()
+            except Exception:
+                log.exception("Sinyal beban %s gagal dibaca", name)
+                continue
+            if value > threshold:
+                return name, value
+        return None
+
+    def acquire(self, command, user_id, guild_id=None, now=None):
+        """Ambil token untuk satu perintah
+
+        Mengembalikan None jika diizinkan, atau (scope, retry_after) untuk
+        scope pertama yang tokennya tidak cukup. Token hanya diambil jika
+        semua scope cukup.
+        """
+        now = time.monotonic() if now is None else now
+        cost = self.cost(command)
+        buckets = []
+        for scope, key in (('user', user_id), ('guild', guild_id), ('global', 0)):
+            limit = self.limits.get(scope)
+            if limit is None or key is None:
+                continue
+            rate, burst = limit
+            bucket = self._bucket(scope, key, burst, now)
+            tokens = bucket.refill(rate, burst, now)
+            # Perintah yang lebih mahal dari burst dihitung seharga burst;
+            # kalau tidak, perintah itu tidak akan pernah diizinkan
+            charge = min(cost, burst)
+            if tokens < charge:
+                retry_after = (charge - tokens) / rate if rate else float('inf')
+                return scope, retry_after
+            buckets.append((bucket, charge))
+        for bucket, charge in buckets:
+            bucket.tokens -= charge
+        return None
+
+    def _bucket(self, scope, key, burst, now):
+        buckets = self._buckets[scope]
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(burst, now)
+            if len(buckets) > self.max_buckets:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+        return bucket
+
+    def _should_notify(self, key, until, now):
+        """Balas penolakan sekali per `key` sampai `until`, supaya spam tidak dibalas spam
+
+        Penolakan scope user dihitung per user; penolakan guild, global dan
+        shed per guild, jadi raid banyak akun di satu guild cukup dibalas sekali.
+        """
+        if self._notified.get(key, 0) > now:
+            return False
+        self._notified[key] = until
+        self._notified.move_to_end(key)
+        if len(self._notified) > self.max_buckets:
+            self._notified.popitem(last=False)
+        return True
+
+    def decide(self, command, user_id, guild_id=None, now=None):
+        """Putuskan satu perintah: None jika boleh, atau exception penolakannya"""
+        if not self.enabled:
+            return None
+        now = time.monotonic() if now is None else now
+        if self.cost(command) >= self.shed_cost:
+            overload = self.overloaded()
+            if overload is not None:
+                DECISIONS.inc(command=command, decision='shed')
+                notify = self._should_notify(('guild', guild_id or user_id), now + 5, now)
+                return Overloaded(*overload, notify=notify)
+        denied = self.acquire(command, user_id, guild_id, now)
+        if denied is not None:
+            scope, retry_after = denied
+            DECISIONS.inc(command=command, decision=scope)
+            key = ('user', user_id) if scope == 'user' else ('guild', guild_id or user_id)
+            notify = self._should_notify(key, now + retry_after, now)
+            return RateLimited(scope, retry_after, notify=notify)
+        DECISIONS.inc(command=command, decision='allowed')
+        return None
+
+    async def check(self, ctx):
+        """Global check discord.py: raise RateLimited/Overloaded jika ditolak"""
+        if ctx.command is None:
+            return True
+        error = self.decide(ctx.command.qualified_name, ctx.author.id,
+                            ctx.guild.id if ctx.guild else None)
+        if error is not None:
+            raise error
+        return True
+
+    def check_unknown(self, ctx, now=None):
+        """Penolakan untuk perintah yang tidak dikenal, atau None
+
+        discord.py tidak menjalankan global check untuk CommandNotFound, jadi
+        on_command_error memanggil ini sebelum membalas.
+        """
+        return self.decide(UNKNOWN_COMMAND, ctx.author.id, ctx.guild.id if ctx.guild else None, now)
+
+    def stats(self):
+        return {scope: len(buckets) for scope, buckets in self._buckets.items()}
+
+
+def _parse_limits(value):
+    """Parse 'user=1/15,guild=3/40' menjadi {scope: (laju, kapasitas)}; 'off' = tanpa batas"""
+    limits = dict(DEFAULT_LIMITS)
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        scope, raw = (part.strip() for part in item.split('=', 1))
+        if scope not in SCOPES:
+            raise ValueError(f"Scope batas perintah harus salah satu dari {SCOPES}, bukan {scope!r}")
+        if raw == 'off':
+            limits.pop(scope, None)
+        else:
+            rate, burst = raw.split('/')
+            limits[scope] = (float(rate), float(burst))
+    return limits
+
+
+def limiter_from_env():
+    """CommandLimiter dari COMMAND_LIMITS, COMMAND_COSTS dan COMMAND_LIMITER"""
+    costs = dict(DEFAULT_COSTS)
+    for item in os.getenv("COMMAND_COSTS", "").split(','):
+        if '=' in item:
+            name, raw = item.split('=', 1)
+            costs[name.strip()] = float(raw)
+    limiter = CommandLimiter(limits=_parse_limits(os.getenv("COMMAND_LIMITS")), costs=costs,
+                             shed_cost=float(os.getenv("COMMAND_SHED_COST", str(SHED_COST))))
+    limiter.enabled = os.getenv("COMMAND_LIMITER", "1") == "1"
+    return limiter
+
+
+# Dipasang ke bot di bot.py; sinyal beban didaftarkan oleh cog musik dan main.py
+limiter = limiter_from_env()
+
+metrics.gauge('command_limiter_buckets', 'Jumlah token bucket aktif per scope', ('scope',),
+              func=limiter.stats)
@@ -0,0 +1,262 @@
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from utils import metrics
+
+# Indeks pencarian lokal dari riwayat pemutaran.
+#
+# Setiap lagu yang berhasil di-resolve dicatat ke SQLite: judul, URL halaman,
+# durasi, jumlah putar global dan per guild, serta query yang menghasilkannya.
+# Judul diindeks dengan FTS5 (token unicode61 tanpa diakritik, indeks prefix
+# 2-3 huruf) sebagai tabel external content, jadi yang disimpan hanya posting
+# list yang terkompresi, bukan salinan judul kedua.
+#
+# `lookup()` dipakai !play sebelum pencarian yt-dlp: query yang persis sama
+# dengan query lama, atau yang semua katanya ada di judul lagu yang pernah
+# diputar, langsung dijawab dengan URL lagu tersebut. `search()` melayani
+# !search dan autocomplete slash command dengan pencocokan prefix kata
+# terakhir. Penulisan dilakukan thread terpisah seperti utils.playerstate.
+
+log = logging.getLogger(__name__)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS tracks ("
+    " id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, title TEXT NOT NULL,"
+    " url TEXT NOT NULL, duration REAL, plays INTEGER NOT NULL DEFAULT 0,"
+    " last_played REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS guild_plays ("
+    " guild_id INTEGER NOT NULL, track_id INTEGER NOT NULL, plays INTEGER NOT NULL,"
+    " PRIMARY KEY (guild_id, track_id)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS queries ("
+    " query TEXT PRIMARY KEY, track_id INTEGER NOT NULL) WITHOUT ROWID",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS titles USING fts5("
+    " title, content='tracks', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+)
+
+# Jumlah kecocokan FTS pertama yang diberi skor popularitas per query, supaya
+# kata yang sangat umum ("music", "official") tidak mengurutkan ratusan ribu
+# judul; query yang lebih spesifik jarang punya kecocokan sebanyak ini
+CANDIDATES = 2000
+
+# Bobot putar di guild yang sama dibanding putar global
+GUILD_WEIGHT = 4
+
+LOOKUPS = metrics.counter(
+    'search_index_lookups_total', 'Lookup indeks pencarian lokal untuk !play', ('result',))
+
+_TOKEN = re.compile(r'\w+')
+_URL = re.compile(r'^\s*https?://', re.IGNORECASE)
+
+
+def normalize(query):
+    return ' '.join(_TOKEN.findall(query.casefold()))
+
+
+def _fts_query(tokens, prefix=False):
+    """Query FTS5 yang aman: tiap kata dikutip, kata terakhir opsional prefix"""
+    parts = ['"' + token.replace('"', '""') + '"' for token in tokens]
+    if prefix:
+        parts[-1] += '*'
+    return ' '.join(parts)
+
+
+class SearchIndex:
+    """Indeks lagu yang pernah diputar di SQLite (FTS5)
+
+    `record()` hanya memasukkan perubahan ke antrian thread penulis, jadi
+    aman dipanggil dari event loop. `lookup()` dan `search()` membaca lewat
+    koneksi sendiri; panggil lewat `asyncio.to_thread` dari event loop.
+    """
+
+    def __init__(self, path, candidates=CANDIDATES):
+        self.path = path
+        self.candidates = candidates
+        self.writes = 0
+        self.errors = 0
+        self._queue = queue.SimpleQueue()
+        self._db = self._connect()
+        for statement in SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+        # Jumlah lagu dan putar dihitung sekali saat dibuka, lalu diperbarui
+        # thread penulis, supaya gauge /metrics tidak memindai tabel
+        self.tracks, self.plays = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(plays), 0) FROM tracks").fetchone()
+        self._reader = self._connect()
+        self._read_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._writer, name='search-index', daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # ----- baca -----
+
+    def lookup(self, query, guild_id=None):
+        """Lagu untuk query !play dari riwayat, atau None
+
+        Query yang pernah di-resolve dijawab dengan lagu yang sama; selain
+        itu dipilih lagu terpopuler yang judulnya memuat semua kata query.
+        Hasil berupa dict `title`, `webpage_url` dan `duration`.
+        """
+        normalized = normalize(query)
+        if not normalized:
+            return None
+        row = self._read_one(
+            "SELECT t.title, t.url, t.duration FROM queries q"
+            " JOIN tracks t ON t.id = q.track_id WHERE q.query = ?", (normalized,))
+        if row is not None:
+            LOOKUPS.inc(result='query')
+            return {'title': row[0], 'webpage_url': row[1], 'duration': row[2]}
+        rows = self._ranked(normalized.split(), guild_id, 1, prefix=False)
+        if rows:
+            LOOKUPS.inc(result='title')
+            title, url, duration = rows[0][:3]
+            return {'title': title, 'webpage_url': url, 'duration': duration}
+        LOOKUPS.inc(result='miss')
+        return None
+
+    def search(self, query, guild_id=None, limit=10):
+        """Lagu terpopuler yang cocok dengan query (kata terakhir boleh belum lengkap)
+
+        Hasil berupa list dict `title`, `webpage_url`, `duration`, `plays`,
+        `guild_plays`.
+        """
+        tokens = normalize(query).split()
+        if not tokens:
+            return []
+        return [
+            {'title': title, 'webpage_url': url, 'duration': duration,
+             'plays': plays, 'guild_plays': guild_plays}
+            for title, url, duration, plays, guild_plays
+            in self._ranked(tokens, guild_id, limit, prefix=True)
+        ]
+
+    def _ranked(self, tokens, guild_id, limit, prefix):
+        return self._read_all(
+            "SELECT t.title, t.url, t.duration, t.plays, COALESCE(g.plays, 0) AS gp"
+            " FROM (SELECT rowid FROM titles WHERE titles MATCH ? LIMIT ?) m"
+            " JOIN tracks t ON t.id = m.rowid"
+            " LEFT JOIN guild_plays g ON g.guild_id = ? AND g.track_id = t.id"
+            " ORDER BY gp * ? + t.plays DESC, t.last_played DESC LIMIT ?",
+            (_fts_query(tokens, prefix), self.candidates, guild_id, GUILD_WEIGHT, limit))
+
+    def _read_one(self, sql, params):
+        rows = self._read_all(sql, params)
+        return rows[0] if rows else None
+
+    def _read_all(self, sql, params):
+        try:
+            with self._read_lock:
+                return self._reader.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            log.warning("Gagal membaca indeks pencarian %s: %s", self.path, e)
+            return []
+
+    # ----- tulis -----
+
+    def record(self, key, data, query=None, guild_id=None):
+        """Catat satu pemutaran lagu hasil resolve (dan query yang menghasilkannya)
+
+        `key` adalah kunci unik lagu (lihat utils.ytdl.audio_key).
+        """
+        url = data.get('webpage_url')
+        if not key or not url or not data.get('title'):
+            return
+        normalized = normalize(query) if query and not _URL.match(query) else None
+        self._queue.put((key, data['title'], url, data.get('duration'), normalized,
+                         guild_id, time.time()))
+
+    def flush(self, timeout=5):
+        """Tunggu sampai semua pemutaran yang sudah diantrikan tersimpan"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._thread = None
+        self._db.close()
+        self._reader.close()
+
+    def stats(self):
+        return {'tracks': self.tracks, 'plays': self.plays, 'writes': self.writes,
+                'errors': self.errors, 'pending': self._queue.qsize()}
+
+    # ----- thread penulis -----
+
+    def _write(self, key, title, url, duration, query, guild_id, now):
+        """Tulis satu pemutaran; True jika lagunya baru"""
+        db = self._db
+        row = db.execute("SELECT id, title FROM tracks WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            track_id = db.execute(
+                "INSERT INTO tracks (key, title, url, duration, plays, last_played)"
+                " VALUES (?, ?, ?, ?, 1, ?)", (key, title, url, duration, now)).lastrowid
+            db.execute("INSERT INTO titles (rowid, title) VALUES (?, ?)", (track_id, title))
+        else:
+            track_id, old_title = row
+            db.execute("UPDATE tracks SET plays = plays + 1, last_played = ?, title = ?,"
+                       " url = ? WHERE id = ?", (now, title, url, track_id))
+            if old_title != title:
+                db.execute("INSERT INTO titles (titles, rowid, title) VALUES ('delete', ?, ?)",
+                           (track_id, old_title))
+                db.execute("INSERT INTO titles (rowid, title) VALUES (?, ?)", (track_id, title))
+        if guild_id is not None:
+            db.execute("INSERT INTO guild_plays VALUES (?, ?, 1) ON CONFLICT(guild_id, track_id)"
+                       " DO UPDATE SET plays = plays + 1", (guild_id, track_id))
+        if query:
+            db.execute("INSERT OR REPLACE INTO queries VALUES (?, ?)", (query, track_id))
+        return row is None
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            # Gabungkan semua pemutaran yang sudah menunggu dalam satu transaksi
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in batch if isinstance(item, tuple)]
+            if records:
+                try:
+                    with self._db:
+                        added = sum(self._write(*record) for record in records)
+                    # Counter baru diubah setelah transaksi berhasil
+                    self.tracks += added
+                    self.plays += len(records)
+                    self.writes += len(records)
+                except sqlite3.Error as e:
+                    self.errors += 1
+                    log.warning("Gagal menyimpan indeks pencarian: %s", e)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if None in batch:
+                return
+
+
+def index_from_env():
+    """SearchIndex dari SEARCH_INDEX_PATH, atau None jika tidak diaktifkan"""
+    path = os.getenv("SEARCH_INDEX_PATH")
+    if not path:
+        return None
+    try:
+        return SearchIndex(path)
+    except sqlite3.Error as e:
+        # Misalnya SQLite tanpa FTS5
+        log.warning("Indeks pencarian %s tidak bisa dibuka: %s", path, e)
+        return None
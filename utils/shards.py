@@ -0,0 +1,319 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import signal
+import sys
+import time
+
+# Runner multi-proses dengan shard.
+#
+# Supervisor membagi shard ke N proses worker (masing-masing menjalankan
+# AutoShardedBot dengan SHARD_IDS sendiri), lalu menunggu laporan status
+# dari worker lewat Unix socket lokal. Worker yang mati atau berhenti
+# melapor di-restart sendirian tanpa mengganggu worker lain, dan status
+# gabungan (jumlah guild, kesehatan tiap worker) dipakai endpoint web.
+
+log = logging.getLogger(__name__)
+
+# Interval laporan worker dan batas diam sebelum worker dianggap macet (detik)
+HEARTBEAT_INTERVAL = 5
+HEARTBEAT_TIMEOUT = 30
+
+RESTART_BACKOFF_MIN = 1
+RESTART_BACKOFF_MAX = 60
+
+# Backoff worker saat membuka ulang control socket; batas atasnya jauh di
+# bawah HEARTBEAT_TIMEOUT supaya worker tersambung lagi sebelum dianggap macet
+RECONNECT_BACKOFF_MIN = 0.2
+RECONNECT_BACKOFF_MAX = 5
+
+
+def shard_ranges(shard_count, workers):
+    """Bagi shard 0..shard_count-1 serata mungkin ke sejumlah worker"""
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+class WorkerState:
+    """Status terakhir yang dilaporkan satu worker"""
+
+    def __init__(self, worker_id, shard_ids):
+        self.worker_id = worker_id
+        self.shard_ids = shard_ids
+        self.pid = None
+        self.ready = False
+        self.guilds = 0
+        self.name = None
+        self.user_id = None
+        self.latency = None
+        self.restarts = 0
+        self.last_seen = 0.0
+        self.process = None
+
+    def to_dict(self):
+        return {
+            'worker': self.worker_id,
+            'shards': self.shard_ids,
+            'pid': self.pid,
+            'ready': self.ready,
+            'guilds': self.guilds,
+            'latency': self.latency,
+            'restarts': self.restarts,
+            'last_seen_ago': round(time.monotonic() - self.last_seen, 1),
+        }
+
+
+class ShardSupervisor:
+    """Jalankan dan awasi proses worker, kumpulkan statusnya lewat IPC
+
+    `command` adalah argv untuk menjalankan satu worker; worker menerima
+    WORKER_ID, SHARD_IDS, SHARD_COUNT dan CONTROL_SOCKET lewat environment.
+    Untuk pengujian, `command` bisa diarahkan ke skrip gateway palsu yang
+    memakai ControlClient. `on_change` dipanggil dengan supervisor setiap
+    kali status gabungan berubah.
+    """
+
+    def __init__(self, workers, shard_count, command, socket_path, on_change=None):
+        self.shard_count = shard_count
+        self.command = command
+        self.socket_path = socket_path
+        self.on_change = on_change
+        self.workers = {
+            i: WorkerState(i, shard_ids)
+            for i, shard_ids in enumerate(shard_ranges(shard_count, workers))
+        }
+        self._server = None
+        self._stopping = False
+
+    # ----- status gabungan -----
+
+    @property
+    def guilds(self):
+        return sum(w.guilds for w in self.workers.values())
+
+    @property
+    def ready(self):
+        """True jika semua worker sudah ready"""
+        return all(w.ready for w in self.workers.values())
+
+    def identity(self):
+        """Nama dan ID bot dari worker mana pun yang sudah login"""
+        for worker in self.workers.values():
+            if worker.user_id:
+                return worker.name, worker.user_id
+        return None, None
+
+    def summary(self):
+        return {
+            'ready': self.ready,
+            'guilds': self.guilds,
+            'shard_count': self.shard_count,
+            'workers': [w.to_dict() for w in self.workers.values()],
+        }
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    # ----- IPC -----
+
+    async def _handle_client(self, reader, writer):
+        worker = None
+        try:
+            while line := await reader.readline():
+                report = json.loads(line)
+                worker = self.workers.get(report.get('worker'))
+                if worker is None:
+                    continue
+                changed = (worker.ready, worker.guilds) != (report.get('ready'), report.get('guilds'))
+                worker.pid = report.get('pid')
+                worker.ready = bool(report.get('ready'))
+                worker.guilds = int(report.get('guilds') or 0)
+                worker.name = report.get('name') or worker.name
+                worker.user_id = report.get('user_id') or worker.user_id
+                worker.latency = report.get('latency')
+                worker.last_seen = time.monotonic()
+                if changed:
+                    self._changed()
+        except (ConnectionError, ValueError) as e:
+            log.warning("Koneksi control worker terputus: %s", e)
+        finally:
+            writer.close()
+            if worker is not None and worker.ready:
+                worker.ready = False
+                self._changed()
+
+    # ----- proses worker -----
+
+    async def _spawn(self, worker):
+        env = dict(os.environ,
+                   WORKER_ID=str(worker.worker_id),
+                   SHARD_IDS=','.join(map(str, worker.shard_ids)),
+                   SHARD_COUNT=str(self.shard_count),
+                   CONTROL_SOCKET=self.socket_path)
+        worker.process = await asyncio.create_subprocess_exec(*self.command, env=env)
+        worker.pid = worker.process.pid
+        worker.last_seen = time.monotonic()
+        log.info("Worker %s dimulai (pid %s, shard %s)",
+                 worker.worker_id, worker.pid, worker.shard_ids)
+
+    async def _run_worker(self, worker):
+        """Jalankan satu worker dan restart dengan backoff jika mati"""
+        backoff = RESTART_BACKOFF_MIN
+        while not self._stopping:
+            started = time.monotonic()
+            try:
+                await self._spawn(worker)
+            except Exception:
+                # Misalnya fork gagal karena memori habis; worker lain tetap
+                # diawasi dan worker ini dicoba lagi dengan backoff
+                log.exception("Worker %s gagal dijalankan", worker.worker_id)
+                code = None
+            else:
+                code = await worker.process.wait()
+            worker.ready = False
+            worker.guilds = 0
+            self._changed()
+            if self._stopping:
+                break
+
+            # Worker yang sempat berjalan lama dianggap sehat, backoff di-reset
+            if time.monotonic() - started > RESTART_BACKOFF_MAX:
+                backoff = RESTART_BACKOFF_MIN
+            worker.restarts += 1
+            delay = backoff * random.uniform(0.8, 1.2)
+            log.warning("Worker %s berhenti (exit %s), restart dalam %.1fs",
+                        worker.worker_id, code, delay)
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+
+    async def _watch_heartbeats(self):
+        """Matikan worker yang terlalu lama tidak melapor (macet)"""
+        while not self._stopping:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            now = time.monotonic()
+            for worker in self.workers.values():
+                process = worker.process
+                if process is None or process.returncode is not None:
+                    continue
+                if now - worker.last_seen > HEARTBEAT_TIMEOUT:
+                    log.error("Worker %s tidak melapor selama %ds, dihentikan",
+                              worker.worker_id, HEARTBEAT_TIMEOUT)
+                    process.kill()
+
+    async def run(self, stop):
+        """Jalankan semua worker sampai event `stop` di-set"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle_client, self.socket_path)
+
+        tasks = [asyncio.create_task(self._run_worker(w)) for w in self.workers.values()]
+        tasks.append(asyncio.create_task(self._watch_heartbeats()))
+        try:
+            await stop.wait()
+        finally:
+            self._stopping = True
+            await self._terminate_all()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._server.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _terminate_all(self, timeout=10):
+        processes = [w.process for w in self.workers.values()
+                     if w.process is not None and w.process.returncode is None]
+        for process in processes:
+            process.send_signal(signal.SIGTERM)
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(p.wait() for p in processes)), timeout)
+        except asyncio.TimeoutError:
+            for process in processes:
+                if process.returncode is None:
+                    process.kill()
+
+
+class ControlClient:
+    """Sisi worker: kirim status ke supervisor lewat Unix socket
+
+    `run()` menjaga koneksi: jika supervisor belum siap, di-restart atau
+    socket putus, koneksi dibuka lagi dengan backoff dan status terakhir
+    dikirim ulang. `report()` boleh dipanggil kapan saja dari event loop.
+    """
+
+    def __init__(self, socket_path, worker_id):
+        self.socket_path = socket_path
+        self.worker_id = worker_id
+        self.connects = 0
+        self._writer = None
+        self._last = {}
+        self._wake = asyncio.Event()
+
+    def report(self, **status):
+        """Kirim status terbaru (ready, guilds, name, user_id, latency)"""
+        self._last = status
+        self._wake.set()
+
+    async def run(self):
+        """Sambungkan ke supervisor dan kirim laporan sampai dibatalkan"""
+        backoff = RECONNECT_BACKOFF_MIN
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+            except OSError as e:
+                delay = backoff * random.uniform(0.8, 1.2)
+                log.warning("Control socket %s belum bisa dibuka (%s), coba lagi dalam %.1fs",
+                            self.socket_path, e, delay)
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+                continue
+            backoff = RECONNECT_BACKOFF_MIN
+            self.connects += 1
+            try:
+                await self._send(reader, self._writer)
+            except (ConnectionError, OSError) as e:
+                log.warning("Koneksi ke supervisor terputus: %s", e)
+            finally:
+                self.close()
+
+    async def _send(self, reader, writer):
+        # Laporan dikirim saat status berubah, dan diulang sebagai heartbeat
+        # setiap HEARTBEAT_INTERVAL detik. Supervisor tidak pernah mengirim
+        # apa pun, jadi read() baru selesai ketika koneksinya ditutup.
+        closed = asyncio.ensure_future(reader.read())
+        try:
+            while True:
+                self._wake.clear()
+                message = dict(self._last, worker=self.worker_id, pid=os.getpid())
+                writer.write(json.dumps(message).encode() + b'\n')
+                await writer.drain()
+                wake = asyncio.ensure_future(self._wake.wait())
+                await asyncio.wait({wake, closed}, timeout=HEARTBEAT_INTERVAL,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                wake.cancel()
+                if closed.done():
+                    raise ConnectionResetError("supervisor menutup koneksi")
+        finally:
+            closed.cancel()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def worker_command():
+    """argv default untuk menjalankan worker: main.py --worker"""
+    main_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+    return [sys.executable, main_path, '--worker']
@@ -0,0 +1,46 @@
+import logging
+import os
+import time
+
+from utils import metrics
+
+# Tahapan startup proses.
+#
+# main.py menyalakan server status lebih dulu (healthy), lalu mengimpor
+# discord.py dan bot di thread terpisah (loaded), menyambung ke gateway
+# (ready) dan terakhir menyiapkan yt-dlp serta library voice di background
+# (warm). Waktu tiap tahap dihitung sejak proses dimulai, termasuk start
+# interpreter dan impor modul, dan tersedia di /metrics.
+
+log = logging.getLogger(__name__)
+
+
+def _process_start():
+    """Waktu monotonic saat proses dimulai (dari /proc), atau saat ini"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Field setelah nama proses; starttime adalah field ke-22
+            fields = f.read().rsplit(')', 1)[1].split()
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic()
+    return time.monotonic() - max(0.0, age)
+
+
+STARTED = _process_start()
+
+# tahap -> detik sejak proses dimulai
+stages = {}
+
+metrics.gauge('startup_stage_seconds', 'Detik sejak proses dimulai sampai tiap tahap startup',
+              ('stage',), func=lambda: dict(stages))
+
+
+def mark(stage):
+    """Catat tahap startup yang baru tercapai (hanya yang pertama kali)"""
+    if stage in stages:
+        return stages[stage]
+    elapsed = stages[stage] = time.monotonic() - STARTED
+    log.info("Startup: %s setelah %.0f ms", stage, elapsed * 1000)
+    return elapsed
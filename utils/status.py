@@ -0,0 +1,158 @@
+import json
+import zlib
+from collections import namedtuple
+
+# Snapshot status bot untuk endpoint web.
+#
+# Halaman dan JSON status dirender sekali setiap kali event bot terjadi
+# (ready, disconnect, resumed, join/leave guild), bukan setiap request.
+# Server web cukup mengirim bytes yang sudah jadi beserta ETag-nya, jadi
+# latensi endpoint tidak bergantung pada jumlah guild.
+
+Rendered = namedtuple('Rendered', 'status content_type body etag')
+
+HOME_TEMPLATE = """
+    <html>
+        <head>
+            <title>Discord Music Bot</title>
+            <style>
+                body {{
+                    font-family: Arial, sans-serif;
+                    max-width: 800px;
+                    margin: 0 auto;
+                    padding: 20px;
+                    line-height: 1.6;
+                    background-color: #121212;
+                    color: #eee;
+                }}
+                h1, h2 {{
+                    color: #7289DA;
+                }}
+                .container {{
+                    background-color: #1e1e1e;
+                    border-radius: 8px;
+                    padding: 20px;
+                    box-shadow: 0 2px 10px rgba(0, 0, 0, 0.2);
+                }}
+                ul {{
+                    list-style-type: none;
+                    padding-left: 20px;
+                }}
+                li {{
+                    margin-bottom: 10px;
+                }}
+                code {{
+                    background-color: #2c2c2c;
+                    padding: 2px 6px;
+                    border-radius: 4px;
+                    font-family: monospace;
+                }}
+                .status {{
+                    display: inline-block;
+                    padding: 6px 12px;
+                    border-radius: 4px;
+                    font-weight: bold;
+                }}
+                .online {{
+                    background-color: #43b581;
+                }}
+                .offline {{
+                    background-color: #f04747;
+                }}
+                #status-refresh {{
+                    margin-top: 20px;
+                    font-size: 0.8em;
+                    color: #888;
+                }}
+            </style>
+            <script>
+                // Auto refresh status every 30 seconds
+                setTimeout(function() {{
+                    window.location.reload();
+                }}, 30000);
+            </script>
+        </head>
+        <body>
+            <div class="container">
+                <h1>Discord Music Bot</h1>
+                <p class="status {status_class}">{status_text}</p>
+                <p>Bot musik Discord yang mudah digunakan. Cukup tambahkan bot ke server Discord Anda dan mulai mainkan musik!</p>
+                
+                <h2>Perintah</h2>
+                <ul>
+                    <li><code>!play &lt;url atau kata kunci&gt;</code> - Putar lagu atau tambahkan ke antrian</li>
+                    <li><code>!pause</code> - Jeda lagu yang sedang diputar</li>
+                    <li><code>!resume</code> - Lanjutkan pemutaran lagu yang dijeda</li>
+                    <li><code>!skip</code> - Lewati lagu yang sedang diputar</li>
+                    <li><code>!queue</code> - Tampilkan antrian lagu saat ini</li>
+                    <li><code>!clear</code> - Bersihkan antrian lagu</li>
+                    <li><code>!volume &lt;0-100&gt;</code> - Atur level volume</li>
+                    <li><code>!now</code> - Tampilkan lagu yang sedang diputar</li>
+                    <li><code>!loop</code> - Aktifkan/nonaktifkan mode pengulangan</li>
+                    <li><code>!join</code> - Bergabung dengan channel suara Anda</li>
+                    <li><code>!leave</code> - Tinggalkan channel suara</li>
+                </ul>
+                
+                <h2>Cara Menggunakan</h2>
+                <ol>
+                    <li>Bergabunglah dengan channel suara di server Discord</li>
+                    <li>Ketik <code>!play</code> diikuti dengan URL YouTube atau kata kunci pencarian</li>
+                    <li>Bot akan bergabung dengan channel suara Anda dan mulai memutar musik</li>
+                    <li>Gunakan perintah lain untuk mengontrol pemutaran</li>
+                </ol>
+                
+                <p>Situs ini hanya status web untuk bot. Bot sebenarnya berjalan melalui Discord, bukan di sini.</p>
+                <p id="status-refresh">Status halaman diperbarui setiap 30 detik</p>
+            </div>
+        </body>
+    </html>
+"""
+
+
+def _render(status, content_type, body):
+    return Rendered(status, content_type, body, '"%08x"' % zlib.crc32(body))
+
+
+class StatusSnapshot:
+    """Respons status yang sudah dirender untuk setiap path"""
+
+    def __init__(self):
+        self.responses = {}
+        self.update(connected=False)
+
+    def update(self, connected, name=None, user_id=None, guilds=0):
+        """Render ulang semua respons dari data status terbaru"""
+        html = HOME_TEMPLATE.format(
+            status_class="online" if connected else "offline",
+            status_text="Bot Aktif" if connected else "Bot Offline",
+        )
+        status = json.dumps({
+            'status': "online" if connected else "offline",
+            'name': name or 'Unknown',
+            'id': str(user_id) if user_id else 'Unknown',
+            'guilds': guilds,
+        })
+        uptime = (200, "OK") if connected else (500, "Bot not connected")
+
+        # Ganti dict sekaligus supaya request tidak melihat status setengah jadi
+        self.responses = {
+            '/': _render(200, 'text/html', html.encode()),
+            '/status': _render(200, 'application/json', status.encode()),
+            '/uptime': _render(uptime[0], 'text/plain', uptime[1].encode()),
+        }
+
+    def update_from_bot(self, bot, connected=None):
+        """Ambil data status dari instance bot (dipanggil dari event loop bot)
+
+        `connected` bisa diisi langsung oleh event disconnect, karena
+        `bot.is_ready()` tetap True selama discord.py mencoba reconnect.
+        """
+        user = bot.user
+        if connected is None:
+            connected = bot.is_ready() and not bot.is_closed()
+        self.update(
+            connected=connected,
+            name=user.name if user else None,
+            user_id=user.id if user else None,
+            guilds=len(bot.guilds),
+        )
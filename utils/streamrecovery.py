@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import math
+import os
+import time
+
+from utils import metrics
+from utils.cache import stream_expiry
+
+# Pemulihan stream yang putus di tengah lagu.
+#
+# URL stream YouTube ditandatangani dan kedaluwarsa (parameter `expire`),
+# dan koneksi ke server stream bisa putus kapan saja. Tanpa pemulihan,
+# FFmpeg berhenti, AudioPlayer menganggap lagu selesai dan user harus
+# menjalankan !play lagi; untuk video panjang dan livestream ini hampir pasti
+# terjadi.
+#
+# StreamRecovery dipasang pada BufferedSource (utils.audiobuffer). Selama
+# lagu diputar, URL di-refresh di background sebelum kedaluwarsa. Jika thread
+# pembaca mendapati stream habis sebelum durasi lagu (atau tidak ada data
+# sama sekali selama `stall_timeout`), FFmpeg baru dibuka di posisi frame
+# berikutnya yang belum masuk buffer, jadi isi buffer menutupi jeda restart
+# dan AudioPlayer tidak pernah melihat lagu berakhir.
+
+log = logging.getLogger(__name__)
+
+# STREAM_RECOVERY=0 mematikan pemulihan (stream yang putus mengakhiri lagu)
+ENABLED = os.getenv("STREAM_RECOVERY", "1") == "1"
+
+# Detik sebelum URL kedaluwarsa saat refresh background dijalankan
+REFRESH_MARGIN = float(os.getenv("STREAM_REFRESH_MARGIN", "300"))
+
+# Detik tanpa data dari stream (saat buffer sudah kosong) sebelum FFmpeg
+# dianggap macet dan dibuka ulang
+STALL_TIMEOUT = float(os.getenv("STREAM_STALL_SECONDS", "8"))
+
+# Percobaan buka ulang berturut-turut per lagu sebelum menyerah
+MAX_ATTEMPTS = int(os.getenv("STREAM_RECOVERY_ATTEMPTS", "5"))
+
+# Stream yang berakhir kurang dari sekian detik sebelum durasi dianggap selesai
+END_TOLERANCE = 3.0
+
+# Stream yang maju sekian detik audio sejak buka ulang terakhir dianggap pulih,
+# jadi jatah percobaan dikembalikan
+RESET_AFTER = 5.0
+
+# Batas waktu refresh URL dari thread pembaca (detik)
+RESOLVE_TIMEOUT = 30.0
+
+STREAM_RECOVERIES = metrics.counter(
+    'stream_recoveries_total', 'Stream yang dibuka ulang di tengah lagu', ('reason', 'outcome'))
+STREAM_REFRESHES = metrics.counter(
+    'stream_url_refreshes_total', 'Refresh URL stream sebelum kedaluwarsa atau saat pemulihan',
+    ('trigger', 'outcome'))
+
+
+class StreamRecovery:
+    """Refresh URL dan buka ulang stream satu lagu
+
+    `data` adalah metadata yt-dlp (`url`, `duration`, `is_live`).
+    `open_source(data, start)` membuka AudioSource baru mulai `start` detik
+    (None untuk livestream: langsung ke siaran terkini). `refresh()` adalah
+    coroutine function yang mengembalikan metadata dengan URL stream baru.
+    `loop` adalah event loop tempat `refresh()` dijalankan.
+    """
+
+    def __init__(self, loop, data, open_source, refresh, *, margin=REFRESH_MARGIN,
+                 stall_timeout=STALL_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+        self.loop = loop
+        self.data = data
+        self.open_source = open_source
+        self.refresh = refresh
+        self.margin = margin
+        self.stall_timeout = stall_timeout
+        self.max_attempts = max_attempts
+        self.live = bool(data.get('is_live'))
+        self.duration = data.get('duration')
+        self.attempts = 0
+        self.recoveries = 0
+        self.refreshes = 0
+        self._reopened = None
+        self._task = None
+        self._closed = False
+
+    def expires(self):
+        """Waktu kedaluwarsa URL stream saat ini (inf jika tidak diketahui)"""
+        return stream_expiry(self.data.get('url'), math.inf)
+
+    # ----- refresh background (event loop) -----
+
+    def start(self):
+        """Mulai refresh URL di background; dipanggil dari event loop"""
+        if self._task is None and not self._closed and self.expires() < math.inf:
+            self._task = self.loop.create_task(self._refresh_loop())
+
+    def close(self):
+        """Hentikan refresh background; aman dipanggil dari thread mana pun"""
+        self._closed = True
+        task, self._task = self._task, None
+        if task is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(task.cancel)
+
+    async def _refresh_loop(self):
+        while not self._closed:
+            expires = self.expires()
+            if expires == math.inf:
+                return
+            await asyncio.sleep(max(0.0, expires - self.margin - time.time()))
+            try:
+                await self._refresh('expiry')
+            except Exception as e:
+                log.warning("Refresh URL stream gagal: %s", e)
+                await asyncio.sleep(min(60.0, max(1.0, self.margin / 4)))
+                continue
+            if self.expires() <= expires:
+                # URL baru tidak lebih lama dari yang lama: jangan berputar
+                return
+
+    async def _refresh(self, trigger):
+        try:
+            data = await self.refresh()
+        except Exception:
+            STREAM_REFRESHES.inc(trigger=trigger, outcome='error')
+            raise
+        if not data or not data.get('url'):
+            STREAM_REFRESHES.inc(trigger=trigger, outcome='error')
+            raise ValueError("Refresh tidak menghasilkan URL stream")
+        STREAM_REFRESHES.inc(trigger=trigger, outcome='ok')
+        self.refreshes += 1
+        self.data = data
+        return data
+
+    # ----- pemulihan (thread pembaca) -----
+
+    def ended_early(self, position, error=None):
+        """True jika stream yang habis di `position` detik berarti putus, bukan selesai"""
+        if error is not None or self.live:
+            return True
+        return bool(self.duration) and position < self.duration - END_TOLERANCE
+
+    def reopen(self, position, reason):
+        """Buka source baru di `position`; dipanggil dari thread pembaca (blocking)
+
+        URL di-refresh dulu jika hampir kedaluwarsa atau jika percobaan
+        sebelumnya dengan URL yang sama gagal lagi. Mengembalikan None jika
+        jatah percobaan habis atau stream tidak bisa dibuka.
+        """
+        if self._reopened is not None and position - self._reopened >= RESET_AFTER:
+            self.attempts = 0
+        if self._closed or self.attempts >= self.max_attempts:
+            STREAM_RECOVERIES.inc(reason=reason, outcome='exhausted')
+            return None
+        self.attempts += 1
+        if self.attempts > 1:
+            # Backoff singkat supaya server yang menolak tidak dibanjiri
+            time.sleep(min(5.0, 0.5 * 2 ** (self.attempts - 2)))
+        if self.attempts > 1 or self.expires() - time.time() < self.margin:
+            try:
+                future = asyncio.run_coroutine_threadsafe(self._refresh('recovery'), self.loop)
+                future.result(RESOLVE_TIMEOUT)
+            except Exception as e:
+                # Masih dicoba dengan URL lama
+                log.warning("Refresh URL untuk pemulihan gagal: %s", e)
+        if self._closed:
+            return None
+        try:
+            source = self.open_source(self.data, None if self.live else position)
+        except Exception as e:
+            log.warning("Gagal membuka ulang stream di %.1f detik: %s", position, e)
+            STREAM_RECOVERIES.inc(reason=reason, outcome='error')
+            return None
+        self._reopened = position
+        self.recoveries += 1
+        STREAM_RECOVERIES.inc(reason=reason, outcome='ok')
+        log.info("Stream dibuka ulang di %.1f detik (%s, percobaan %d)",
+                 position, reason, self.attempts)
+        return source
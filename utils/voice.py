@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import os
+import random
+import time
+
+from utils import metrics
+from utils.coalesce import SingleFlight
+
+# Sesi voice per guild.
+#
+# Semua koneksi voice cog musik lewat VoiceSessions: connect memakai timeout
+# dan diulang dengan backoff + jitter, connect bersamaan untuk guild yang sama
+# digabung (SingleFlight), dan pindah channel memakai move_to pada koneksi
+# yang sudah ada alih-alih memutus lalu connect dari nol.
+#
+# Dari on_voice_state_update, sesi di channel yang tidak lagi punya pendengar
+# diputus setelah masa tenggang sehingga socket UDP dan thread encoder tidak
+# tertinggal di guild yang kosong. Jika koneksi voice hilang sendiri
+# (misalnya server voice berganti dan koneksi ulang discord.py gagal), sesi
+# langsung disambungkan lagi ke channel terakhir selama masih ada pendengar.
+# Bot yang diputus orang (tombol Disconnect, kick) tidak kembali: sesinya
+# ditutup seperti idle.
+
+log = logging.getLogger(__name__)
+
+VOICE_CONNECT_ATTEMPTS = metrics.counter(
+    'voice_connect_attempts_total', 'Percobaan koneksi voice per hasil', ('outcome',))
+VOICE_IDLE_DISCONNECTS = metrics.counter(
+    'voice_idle_disconnects_total', 'Sesi voice yang diputus karena channel tidak ada pendengar')
+VOICE_RECONNECTS = metrics.counter(
+    'voice_reconnects_total', 'Koneksi ulang voice setelah terputus tiba-tiba', ('outcome',))
+
+
+class VoiceConnectError(Exception):
+    """Koneksi voice gagal setelah semua percobaan"""
+
+
+def _has_listeners(channel):
+    # Channel tanpa daftar member (misalnya objek palsu) dianggap kosong
+    return channel is not None and any(
+        not member.bot for member in getattr(channel, 'members', ()))
+
+
+class VoiceSessions:
+    """Koneksi voice per guild dengan timeout, retry, move_to dan idle reclaim
+
+    `backend` adalah PlaybackBackend. `on_idle(guild_id)` dipanggil sebelum
+    sesi yang menganggur atau terputus permanen ditutup (misalnya untuk
+    menghancurkan player), dan `on_reconnect(guild_id, voice)` setelah sesi
+    yang terputus berhasil disambungkan lagi.
+    """
+
+    def __init__(self, backend, timeout=10.0, retries=2, backoff=0.5,
+                 idle_grace=120.0, reconnect=True):
+        self.backend = backend
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.idle_grace = idle_grace
+        self.reconnect = reconnect
+        self.on_idle = None
+        self.on_reconnect = None
+        self.sessions = {}
+        self._connects = SingleFlight()
+        self._idle = {}
+        self._reconnects = {}
+        self._discards = set()
+        self._closed = False
+
+    # ----- koneksi -----
+
+    def get(self, guild_id):
+        """Voice client aktif untuk guild, atau None"""
+        voice = self.sessions.get(guild_id)
+        if voice is not None and not voice.is_connected():
+            self.sessions.pop(guild_id, None)
+            return None
+        return voice
+
+    async def ensure(self, channel, timings=None):
+        """Voice client di `channel`: pakai yang ada, pindahkan, atau connect baru
+
+        Memunculkan VoiceConnectError jika semua percobaan gagal.
+        """
+        started = time.perf_counter()
+        guild_id = channel.guild.id
+        voice = self.get(guild_id)
+        if voice is None:
+            voice = await self._connects.do(guild_id, lambda: self._connect(channel))
+        elif voice.channel.id != channel.id:
+            voice = await self._move(voice, channel)
+        if timings is not None:
+            timings['connect'] = time.perf_counter() - started
+        return voice
+
+    async def release(self, guild_id, voice=None):
+        """Putus sesi guild atas permintaan (misalnya !leave); tidak disambung ulang"""
+        self._cancel_idle(guild_id)
+        voice = self.sessions.pop(guild_id, None) or voice
+        if voice is not None:
+            await self.backend.disconnect(voice)
+
+    def close(self):
+        """Hentikan timer idle dan koneksi ulang; dipanggil saat cog dilepas"""
+        self._closed = True
+        for task in (*self._idle.values(), *self._reconnects.values()):
+            task.cancel()
+        self._idle.clear()
+        self._reconnects.clear()
+
+    async def _connect(self, channel, immediate=False):
+        guild_id = channel.guild.id
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                voice = await self.backend.connect(channel, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                outcome, error = 'timeout', f"waktu habis setelah {self.timeout:g} detik"
+            except Exception as e:
+                outcome, error = 'error', str(e) or type(e).__name__
+            else:
+                metrics.VOICE_CONNECT_LATENCY.observe(time.perf_counter() - started, outcome='ok')
+                VOICE_CONNECT_ATTEMPTS.inc(outcome='ok')
+                self.sessions[guild_id] = voice
+                try:
+                    self.check_idle(guild_id)
+                except Exception:
+                    # Koneksi sudah jadi dan tercatat; jangan sampai bocor
+                    # karena pemeriksaan pendengar gagal
+                    log.exception("Gagal memeriksa pendengar voice guild %s", guild_id)
+                return voice
+            metrics.VOICE_CONNECT_LATENCY.observe(time.perf_counter() - started, outcome=outcome)
+            VOICE_CONNECT_ATTEMPTS.inc(outcome=outcome)
+            if attempt == self.retries or self._closed:
+                break
+            # Backoff eksponensial dengan jitter supaya banyak guild yang gagal
+            # bersamaan (gangguan gateway voice) tidak mencoba di detik yang sama
+            delay = 0 if immediate and attempt == 0 else \
+                self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            log.warning("Koneksi voice guild %s gagal (%s), coba lagi dalam %.1f detik",
+                        guild_id, error, delay)
+            await asyncio.sleep(delay)
+        raise VoiceConnectError(error)
+
+    async def _move(self, voice, channel):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(voice.move_to(channel), self.timeout)
+        except Exception as e:
+            # Koneksi lama bermasalah: putus dan connect dari awal
+            log.warning("Pindah voice ke %s gagal (%s), connect ulang", channel.id, e)
+            await self.release(channel.guild.id, voice)
+            return await self._connects.do(channel.guild.id, lambda: self._connect(channel))
+        metrics.VOICE_CONNECT_LATENCY.observe(time.perf_counter() - started, outcome='move')
+        self.check_idle(channel.guild.id)
+        return voice
+
+    # ----- event voice state -----
+
+    def member_update(self, guild_id):
+        """Member (bukan bot ini) masuk/keluar channel voice di guild"""
+        if guild_id in self.sessions:
+            self.check_idle(guild_id)
+
+    def self_update(self, guild_id, before, after):
+        """Voice state bot ini berubah"""
+        if self._closed or guild_id not in self.sessions or guild_id in self._reconnects:
+            return
+        if after.channel is not None:
+            # Dipindah (misalnya oleh admin): periksa pendengar di channel baru
+            self.check_idle(guild_id)
+            return
+        # Terputus tanpa lewat release(). Hanya koneksi yang hilang sendiri
+        # (`dropped`, lihat utils.backend.SessionVoiceClient) yang disambung
+        # lagi; diputus orang berarti bot memang tidak diinginkan di sana
+        voice = self.sessions.pop(guild_id, None)
+        self._cancel_idle(guild_id)
+        if self.reconnect and getattr(voice, 'dropped', False) \
+                and _has_listeners(before.channel):
+            self._reconnects[guild_id] = asyncio.create_task(
+                self._reconnect(guild_id, before.channel))
+        else:
+            self._notify_idle(guild_id)
+            if voice is not None:
+                task = asyncio.create_task(self._discard(guild_id, voice))
+                self._discards.add(task)
+                task.add_done_callback(self._discards.discard)
+
+    def check_idle(self, guild_id):
+        """Mulai atau batalkan hitung mundur idle sesuai ada tidaknya pendengar"""
+        voice = self.sessions.get(guild_id)
+        if voice is None or self._closed or not self.idle_grace:
+            return
+        if _has_listeners(voice.channel):
+            self._cancel_idle(guild_id)
+        elif guild_id not in self._idle:
+            self._idle[guild_id] = asyncio.create_task(self._reap(guild_id, voice))
+
+    def _cancel_idle(self, guild_id):
+        task = self._idle.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def _reap(self, guild_id, voice):
+        await asyncio.sleep(self.idle_grace)
+        if self._idle.get(guild_id) is asyncio.current_task():
+            del self._idle[guild_id]
+        if self.sessions.get(guild_id) is not voice or _has_listeners(voice.channel):
+            return
+        log.info("Memutus voice guild %s: tidak ada pendengar selama %.0f detik",
+                 guild_id, self.idle_grace)
+        VOICE_IDLE_DISCONNECTS.inc()
+        self._notify_idle(guild_id)
+        await self.release(guild_id, voice)
+
+    async def _reconnect(self, guild_id, channel):
+        try:
+            voice = await self._connects.do(guild_id, lambda: self._connect(channel, immediate=True))
+        except VoiceConnectError as e:
+            VOICE_RECONNECTS.inc(outcome='error')
+            log.warning("Koneksi ulang voice guild %s gagal: %s", guild_id, e)
+            self._notify_idle(guild_id)
+            return
+        finally:
+            self._reconnects.pop(guild_id, None)
+        VOICE_RECONNECTS.inc(outcome='ok')
+        log.info("Voice guild %s tersambung lagi ke %s", guild_id, channel.id)
+        if self.on_reconnect is not None:
+            self.on_reconnect(guild_id, voice)
+
+    async def _discard(self, guild_id, voice):
+        """Lepas sisa voice client yang sudah diputus dari luar
+
+        Sesi guild tidak disentuh karena bisa saja sudah ada koneksi baru.
+        """
+        try:
+            await self.backend.disconnect(voice)
+        except Exception:
+            log.exception("Gagal melepas voice guild %s", guild_id)
+
+    def _notify_idle(self, guild_id):
+        if self.on_idle is None:
+            return
+        try:
+            self.on_idle(guild_id)
+        except Exception:
+            log.exception("Gagal membersihkan guild %s", guild_id)
+
+
+def sessions_from_env(backend):
+    """VoiceSessions dari VOICE_CONNECT_TIMEOUT, VOICE_CONNECT_RETRIES,
+    VOICE_IDLE_GRACE dan VOICE_RECONNECT"""
+    return VoiceSessions(
+        backend,
+        timeout=float(os.getenv("VOICE_CONNECT_TIMEOUT", "10")),
+        retries=int(os.getenv("VOICE_CONNECT_RETRIES", "2")),
+        idle_grace=float(os.getenv("VOICE_IDLE_GRACE", "120")),
+        reconnect=os.getenv("VOICE_RECONNECT", "1") == "1")
@@ -0,0 +1,305 @@
+import asyncio
+import collections
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+
+from utils import metrics
+
+# Watchdog event loop.
+#
+# Task heartbeat di event loop tidur `interval` detik berulang-ulang dan
+# mencatat seberapa terlambat ia dibangunkan (lag penjadwalan). Thread
+# pembantu memeriksa heartbeat tersebut; jika loop tidak kembali lebih lama
+# dari `threshold`, thread mengambil stack thread event loop saat itu juga
+# (sys._current_frames), jadi yang tercatat adalah kode yang sedang memblokir,
+# bukan kode yang kebetulan jalan sesudahnya. Stall dikelompokkan per call
+# site untuk endpoint /loop.
+#
+# Mode profiler (LOOP_PROFILE_PATH) mengambil sampel stack thread loop secara
+# berkala dan menulis format "folded" (frame;frame;frame jumlah) yang bisa
+# langsung dipakai flamegraph.pl, speedscope atau inferno.
+
+log = logging.getLogger(__name__)
+
+# Direktori proyek; frame di dalamnya dipakai sebagai call site pelaku
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Jumlah sampel lag dan stall terakhir yang disimpan untuk /loop
+LAG_SAMPLES = 2048
+RECENT_STALLS = 20
+MAX_STACK = 40
+
+LOOP_LAG = metrics.histogram(
+    'event_loop_lag_seconds', 'Keterlambatan event loop membangunkan task heartbeat',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+LOOP_STALLS = metrics.counter(
+    'event_loop_stalls_total', 'Jumlah event loop tertahan melebihi batas watchdog')
+
+
+def _frame_label(filename, lineno, name):
+    if filename.startswith(ROOT + os.sep):
+        filename = os.path.relpath(filename, ROOT)
+    return f"{filename}:{lineno} {name}"
+
+
+def _walk(frame):
+    """Daftar (filename, lineno, nama fungsi) dari frame terluar ke terdalam"""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append((code.co_filename, frame.f_lineno, code.co_name, code))
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+class LoopWatchdog:
+    """Ukur lag event loop dan tangkap stack ketika loop tertahan
+
+    `threshold` (detik) adalah batas lag yang dianggap stall, `interval`
+    jeda heartbeat. `commands` adalah callable opsional yang mengembalikan
+    perintah bot (misalnya `bot.walk_commands`) supaya stall di dalam
+    perintah bisa ditandai dengan nama perintahnya. `profile_path` mengaktifkan
+    sampling profiler yang menulis output folded ke file tersebut.
+    """
+
+    def __init__(self, threshold=0.1, interval=0.05, commands=None,
+                 profile_path=None, profile_hz=100):
+        self.threshold = threshold
+        self.interval = interval
+        self.commands = commands
+        self.profile_path = profile_path
+        self.profile_hz = profile_hz
+        self.lags = collections.deque(maxlen=LAG_SAMPLES)
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._lock = threading.Lock()
+        # call site -> {count, total, max, commands, tasks}
+        self._offenders = {}
+        self._recent = collections.deque(maxlen=RECENT_STALLS)
+        self._profile = collections.Counter()
+        self._profile_samples = 0
+        self._loop = None
+        self._loop_thread = None
+        self._beat = None
+        self._captured = None
+        self._pending = None
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    # ----- siklus hidup -----
+
+    def start(self):
+        """Mulai heartbeat dan thread pemantau; dipanggil dari dalam event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = self._loop.create_task(self._heartbeat(), name='loop-watchdog')
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+        if self.profile_path:
+            log.info("Profiler event loop aktif, output ke %s", self.profile_path)
+
+    def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        self._task = None
+        self._thread.join(timeout=2)
+        self._thread = None
+        if self.profile_path:
+            self.write_profile()
+
+    # ----- laporan -----
+
+    def summary(self, limit=10):
+        """Ringkasan untuk endpoint /loop: persentil lag, pelaku dan stall terakhir"""
+        with self._lock:
+            values = sorted(self.lags)
+            offenders = sorted(self._offenders.items(), key=lambda item: item[1]['total'],
+                               reverse=True)[:limit]
+            recent = list(self._recent)
+
+        def pct(p):
+            return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 2) if values else 0.0
+
+        return {
+            'threshold_ms': round(self.threshold * 1000, 1),
+            'samples': len(values),
+            'lag_ms': {'p50': pct(0.50), 'p90': pct(0.90), 'p99': pct(0.99),
+                       'max': round(self.max_lag * 1000, 2)},
+            'stalls': self.stalls,
+            'offenders': [
+                {'site': site, 'count': info['count'],
+                 'total_ms': round(info['total'] * 1000, 1),
+                 'max_ms': round(info['max'] * 1000, 1),
+                 'commands': dict(info['commands'].most_common(5)),
+                 'tasks': dict(info['tasks'].most_common(5))}
+                for site, info in offenders
+            ],
+            'recent': recent,
+            'profiling': bool(self.profile_path),
+            'profile_samples': self._profile_samples,
+        }
+
+    def recent_lag(self, window=20):
+        """Lag terbesar (detik) dari `window` sampel terakhir, untuk load shedding"""
+        lags = self.lags
+        return max(itertools.islice(reversed(lags), window), default=0.0)
+
+    def folded(self):
+        """Sampel profiler dalam format folded (satu stack per baris + jumlah)"""
+        with self._lock:
+            return ''.join(f"{stack} {count}\n" for stack, count in self._profile.most_common())
+
+    def write_profile(self, path=None):
+        """Tulis sampel profiler ke file (atomik) untuk flamegraph.pl/speedscope"""
+        path = path or self.profile_path
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.folded())
+        os.replace(tmp_path, path)
+
+    # ----- di event loop -----
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - started - self.interval)
+            self._record_lag(lag)
+
+    def _record_lag(self, lag):
+        LOOP_LAG.observe(lag)
+        with self._lock:
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            stall, self._pending = self._pending, None
+            if lag < self.threshold:
+                return
+            self.stalls += 1
+            if stall is not None:
+                # Stall sudah ditangkap thread pemantau; sekarang durasinya diketahui
+                stall['lag_ms'] = round(lag * 1000, 1)
+                info = self._offenders[stall['site']]
+                info['total'] += lag
+                info['max'] = max(info['max'], lag)
+        LOOP_STALLS.inc()
+        if stall is not None:
+            log.warning("Event loop tertahan %.0fms di %s", lag * 1000, stall['site'],
+                        extra={'lag_ms': round(lag * 1000, 1), 'site': stall['site'],
+                               'task': stall['task'], 'command': stall['command']})
+        else:
+            log.warning("Event loop tertahan %.0fms", lag * 1000,
+                        extra={'lag_ms': round(lag * 1000, 1)})
+
+    # ----- di thread pemantau -----
+
+    def _watch(self):
+        period = min(self.threshold / 4, 1 / self.profile_hz if self.profile_path else 1)
+        last_flush = time.monotonic()
+        while not self._stopped.wait(period):
+            now = time.monotonic()
+            beat = self._beat
+            if self.profile_path:
+                self._sample()
+                if now - last_flush >= 60:
+                    last_flush = now
+                    try:
+                        self.write_profile()
+                    except OSError as e:
+                        log.warning("Gagal menulis profil event loop: %s", e)
+            if now - beat > self.interval + self.threshold and self._captured != beat:
+                self._captured = beat
+                self._capture(now - beat - self.interval)
+
+    def _loop_frames(self):
+        frame = sys._current_frames().get(self._loop_thread)
+        return _walk(frame) if frame is not None else []
+
+    def _sample(self):
+        frames = self._loop_frames()
+        if not frames:
+            return
+        stack = ';'.join(f"{name} ({os.path.basename(filename)}:{lineno})"
+                         for filename, lineno, name, _ in frames)
+        with self._lock:
+            self._profile[stack] += 1
+            self._profile_samples += 1
+
+    def _capture(self, blocked):
+        """Simpan stack loop yang sedang tertahan dan kelompokkan per call site"""
+        frames = self._loop_frames()
+        if not frames or (frames[-1][2] == 'select' and frames[-1][0].endswith('selectors.py')):
+            # Loop sebenarnya sedang menunggu IO (mis. mesin sibuk), bukan diblokir
+            return
+        task = asyncio.current_task(self._loop)
+        task_name = task.get_name() if task is not None else None
+        command = self._command_for(frames)
+        site = self._site(frames)
+        stall = {
+            'at': round(time.time(), 3),
+            'blocked_ms': round(blocked * 1000, 1),
+            'lag_ms': None,
+            'site': site,
+            'task': task_name,
+            'command': command,
+            'stack': [_frame_label(f, n, name) for f, n, name, _ in frames[-MAX_STACK:]],
+        }
+        with self._lock:
+            info = self._offenders.get(site)
+            if info is None:
+                info = self._offenders[site] = {
+                    'count': 0, 'total': 0.0, 'max': 0.0,
+                    'commands': collections.Counter(), 'tasks': collections.Counter()}
+            info['count'] += 1
+            if command:
+                info['commands'][command] += 1
+            if task_name:
+                info['tasks'][task_name] += 1
+            self._recent.append(stall)
+            self._pending = stall
+
+    @staticmethod
+    def _site(frames):
+        """Frame terdalam yang berasal dari kode proyek, atau frame terdalam"""
+        for filename, lineno, name, _ in reversed(frames):
+            # Dependency bisa terpasang di dalam direktori proyek (Replit)
+            if filename.startswith(ROOT + os.sep) and 'site-packages' not in filename:
+                return _frame_label(filename, lineno, name)
+        filename, lineno, name, _ = frames[-1]
+        return _frame_label(filename, lineno, name)
+
+    def _command_for(self, frames):
+        if self.commands is None:
+            return None
+        try:
+            callbacks = {command.callback.__code__: command.qualified_name
+                         for command in self.commands()}
+        except Exception:
+            # Daftar perintah sedang diubah di thread loop; lewati saja
+            return None
+        for _, _, _, code in reversed(frames):
+            if code in callbacks:
+                return callbacks[code]
+        return None
+
+
+def watchdog_from_env(bot=None):
+    """LoopWatchdog dari LOOP_WATCHDOG*, atau None jika dimatikan"""
+    if os.getenv("LOOP_WATCHDOG", "1") != "1":
+        return None
+    return LoopWatchdog(
+        threshold=float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100")) / 1000,
+        commands=bot.walk_commands if bot is not None else None,
+        profile_path=os.getenv("LOOP_PROFILE_PATH") or None,
+        profile_hz=float(os.getenv("LOOP_PROFILE_HZ", "100")))
@@ -0,0 +1,384 @@
+import asyncio
+import logging
+import os
+import re
+import time
+
+from utils import metrics, streamrecovery
+from utils.audio import LocalOpusSource, open_audio
+from utils.audiobuffer import buffered
+from utils.audiocache import cache_from_env
+from utils.cache import ResolutionCache, normalize_query, stream_expiry
+from utils.coalesce import SingleFlight
+from utils.extractor import ExtractionCancelled, scheduler_from_env
+from utils.searchindex import index_from_env
+
+log = logging.getLogger(__name__)
+
+# Extractor yt-dlp yang dimuat (regex nama extractor, dipisah koma). Tanpa
+# batas, YoutubeDL mendaftarkan ~1700 extractor dan URL dicocokkan ke
+# semuanya; "default" mengembalikan daftar lengkap yt-dlp.
+YTDL_EXTRACTORS = [name.strip() for name in os.getenv(
+    "YTDL_EXTRACTORS", "youtube.*,soundcloud.*,generic").split(',') if name.strip()] or ['default']
+
+# Opsi yt-dlp untuk mengambil audio saja. Format Opus (WebM) diutamakan
+# supaya FFmpeg bisa meneruskan paketnya tanpa encode ulang (lihat utils.audio).
+# Ekstraksi dibuat seringan mungkin supaya lagu cepat mulai: hanya hasil
+# pencarian pertama, tanpa manifest DASH/HLS (daftar format jauh lebih
+# pendek) dan tanpa mengecek ulang format yang tersedia.
+YTDL_OPTIONS = {
+    'format': 'bestaudio[acodec=opus]/bestaudio/best',
+    'noplaylist': True,
+    'nocheckcertificate': True,
+    'ignoreerrors': False,
+    'logtostderr': False,
+    'quiet': True,
+    'no_warnings': True,
+    'default_search': 'ytsearch1',
+    'source_address': '0.0.0.0',
+    'check_formats': False,
+    'youtube_include_dash_manifest': False,
+    'youtube_include_hls_manifest': False,
+    'extractor_args': {'youtube': {'skip': ['dash', 'hls', 'translated_subs']}},
+    'socket_timeout': 10,
+    'allowed_extractors': YTDL_EXTRACTORS,
+}
+
+# Opsi untuk membaca isi playlist tanpa me-resolve tiap video (flat)
+PLAYLIST_OPTIONS = dict(
+    YTDL_OPTIONS,
+    noplaylist=False,
+    extract_flat='in_playlist',
+    ignoreerrors=True,
+)
+
+URL_PATTERN = re.compile(r'^\s*https?://', re.IGNORECASE)
+
+# Jumlah entri per halaman ekstraksi playlist dan batas total entri
+PLAYLIST_PAGE_SIZE = 100
+MAX_PLAYLIST_ENTRIES = int(os.getenv("MAX_PLAYLIST_ENTRIES", "5000"))
+
+# Ekstraksi dijalankan di process pool terpisah (lihat utils.extractor)
+scheduler = scheduler_from_env()
+
+# Cache resolusi query -> metadata. Set YTDL_CACHE_PATH untuk menyimpan cache
+# ke SQLite supaya tetap ada setelah bot direstart.
+resolution_cache = ResolutionCache(
+    maxsize=int(os.getenv("YTDL_CACHE_SIZE", "1024")),
+    path=os.getenv("YTDL_CACHE_PATH") or None,
+)
+
+# Lookup identik yang sedang berjalan berbagi satu ekstraksi
+inflight = SingleFlight()
+
+# Cache audio lokal untuk track yang diputar ulang; aktif jika
+# AUDIO_CACHE_PATH di-set (lihat utils.audiocache)
+audio_cache = cache_from_env()
+
+# Indeks lokal lagu yang pernah diputar (SEARCH_INDEX_PATH, lihat
+# utils.searchindex). Query kata kunci !play dijawab dari indeks lebih dulu
+# kecuali SEARCH_INDEX_PLAY=0; indeks tetap dipakai !search dan autocomplete.
+search_index = index_from_env()
+SEARCH_INDEX_PLAY = os.getenv("SEARCH_INDEX_PLAY", "1") == "1"
+
+metrics.gauge('ytdl_cache', 'Statistik cache resolusi', ('stat',),
+              func=resolution_cache.stats)
+metrics.gauge('ytdl_scheduler', 'Statistik penjadwal ekstraksi', ('stat',),
+              func=scheduler.stats)
+metrics.gauge('ytdl_inflight', 'Statistik penggabungan lookup identik', ('stat',),
+              func=inflight.stats)
+if search_index is not None:
+    metrics.gauge('search_index', 'Statistik indeks pencarian lokal', ('stat',),
+                  func=search_index.stats)
+if audio_cache is not None:
+    metrics.gauge('audio_cache', 'Statistik cache audio lokal', ('stat',),
+                  func=audio_cache.stats)
+
+
+def audio_key(data):
+    """Kunci cache audio untuk metadata hasil ekstraksi"""
+    if data.get('extractor') and data.get('id'):
+        return f"{data['extractor']}:{data['id']}"
+    return data.get('webpage_url') or data.get('url')
+
+
+def has_local_audio(data):
+    return audio_cache is not None and audio_key(data) in audio_cache
+
+
+class YTDLSource:
+    """Hasil pencarian yt-dlp beserta audio source yang siap diputar"""
+
+    def __init__(self, source, data, requester=None, local_path=None, guild_id=None):
+        self.source = source
+        self.data = data
+        self.requester = requester
+        self.guild_id = guild_id
+        self.local_path = local_path
+        self.title = data.get('title')
+        self.url = data.get('webpage_url')
+        self.stream_url = data.get('url')
+        self.duration = data.get('duration')
+        self.acodec = data.get('acodec')
+        self.volume = getattr(source, 'gain', getattr(source, 'volume', 1.0))
+
+    def reopen(self, volume):
+        """Buka ulang stream dengan volume baru dari posisi saat ini
+
+        Source Opus memasang volume di filter FFmpeg, jadi perubahan volume
+        berarti proses FFmpeg baru. Source lama dikembalikan supaya pemanggil
+        bisa menutupnya setelah voice client beralih ke source baru.
+        """
+        old = self.source
+        if self.local_path:
+            url, acodec = self.local_path, 'opus'
+        else:
+            url, acodec = self.stream_url, self.acodec
+        source = open_audio(url, volume=volume, acodec=acodec,
+                            start=getattr(old, 'position', 0.0))
+        self.source = source if self.local_path else self._buffered(source, volume)
+        self.volume = volume
+        return old
+
+    def _buffered(self, source, volume):
+        """Bungkus source jaringan dengan jitter buffer dan pemulihan stream"""
+        recovery = self._recovery(volume)
+        wrapped = buffered(source, self.guild_id, recovery=recovery)
+        if recovery is not None and wrapped is not source:
+            recovery.start()
+        return wrapped
+
+    def _recovery(self, volume):
+        """StreamRecovery untuk lagu ini, atau None jika tidak bisa dipulihkan"""
+        if not streamrecovery.ENABLED or not self.url:
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+        def reopen(data, start):
+            return open_audio(data['url'], volume=volume, acodec=data.get('acodec'),
+                              start=start or 0.0)
+
+        return streamrecovery.StreamRecovery(loop, self.data, reopen, self.refresh)
+
+    async def refresh(self):
+        """Ambil URL stream baru dari `webpage_url` tanpa melihat cache
+
+        Dipakai utils.streamrecovery sebelum URL kedaluwarsa atau saat stream
+        putus; hasilnya juga menggantikan entri cache resolusi URL tersebut.
+        """
+        key = normalize_query(self.url)
+
+        async def extract_and_cache():
+            data = await self.extract(self.url, guild_id=self.guild_id, shared=True)
+            return resolution_cache.put(key, data).data
+
+        data = await inflight.do('refresh:' + key, extract_and_cache, tag=(self.guild_id, None))
+        self.data = data
+        self.stream_url = data.get('url')
+        self.acodec = data.get('acodec')
+        return data
+
+    @classmethod
+    async def extract(cls, query, *, loop=None, guild_id=None, owner=None, shared=False):
+        """Jalankan extract_info lewat penjadwal dan kembalikan entri pertama"""
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            data = await scheduler.run(query, YTDL_OPTIONS, guild_id=guild_id, owner=owner,
+                                       shared=shared)
+            outcome = 'ok'
+        except ExtractionCancelled:
+            outcome = 'cancelled'
+            raise
+        finally:
+            metrics.EXTRACT_LATENCY.observe(time.perf_counter() - started, outcome=outcome)
+        if data is None:
+            raise ValueError(f"Tidak ada hasil untuk: {query}")
+        if 'entries' in data:
+            entries = [e for e in data['entries'] if e]
+            if not entries:
+                raise ValueError(f"Tidak ada hasil untuk: {query}")
+            data = entries[0]
+        return data
+
+    @classmethod
+    async def resolve(cls, query, *, loop=None, guild_id=None, owner=None, usable=None):
+        """Ambil metadata untuk query, memakai cache resolusi jika bisa
+
+        Entri cache dengan URL stream basi di-refresh dari `webpage_url`
+        sehingga pencarian ulang tidak perlu dilakukan, kecuali `usable(data)`
+        menyatakan metadata lama sudah cukup (misalnya audionya ada di cache
+        lokal). Permintaan bersamaan untuk kunci yang sama hanya menjalankan
+        satu ekstraksi. Kata kunci yang cocok dengan lagu di indeks pencarian
+        lokal di-resolve dari URL lagu itu tanpa pencarian yt-dlp.
+        """
+        key = normalize_query(query)
+        entry = resolution_cache.get(key)
+        if entry is not None and (entry.stream_fresh(resolution_cache.stream_margin)
+                                  or (usable is not None and usable(entry.data))):
+            return entry.data
+
+        if entry is None and search_index is not None and SEARCH_INDEX_PLAY \
+                and not URL_PATTERN.match(query):
+            hit = await asyncio.to_thread(search_index.lookup, query, guild_id)
+            if hit is not None:
+                return await cls.resolve(hit['webpage_url'], loop=loop, guild_id=guild_id,
+                                         owner=owner, usable=usable)
+
+        target = entry.data.get('webpage_url') if entry is not None else None
+
+        async def extract_and_cache():
+            data = await cls.extract(target or query, loop=loop,
+                                     guild_id=guild_id, owner=owner, shared=True)
+            return resolution_cache.put(key, data).data
+
+        return await inflight.do(key, extract_and_cache, tag=(guild_id, owner))
+
+    @staticmethod
+    def cancel(guild_id, owner=None):
+        """Batalkan ekstraksi guild (atau milik satu user di guild); kembalikan jumlahnya
+
+        Lookup yang digabung hanya melepas penunggu milik guild/user itu;
+        ekstraksi bersamanya tetap berjalan untuk guild lain.
+        """
+        if owner is None:
+            count = scheduler.cancel_guild(guild_id)
+        else:
+            count = scheduler.cancel_owner(guild_id, owner)
+        return count + inflight.cancel(
+            lambda tag: tag is not None and tag[0] == guild_id and owner in (None, tag[1]))
+
+    @staticmethod
+    async def warm():
+        """Siapkan yt-dlp di worker ekstraksi (dipanggil setelah bot online)"""
+        started = time.perf_counter()
+        workers = await scheduler.warm(YTDL_OPTIONS)
+        log.info("yt-dlp siap di %d worker dalam %.0f ms", workers,
+                 (time.perf_counter() - started) * 1000)
+        return workers
+
+    @staticmethod
+    async def search_history(query, *, guild_id=None, limit=10):
+        """Lagu dari indeks pencarian lokal yang cocok dengan query (!search)"""
+        if search_index is None:
+            return []
+        return await asyncio.to_thread(search_index.search, query, guild_id, limit)
+
+    @staticmethod
+    def is_playlist(query):
+        """True jika query adalah URL playlist (bukan video dalam playlist)"""
+        if not URL_PATTERN.match(query):
+            return False
+        return ('/playlist' in query or '/sets/' in query
+                or ('list=' in query and 'v=' not in query))
+
+    @classmethod
+    async def iter_playlist(cls, query, *, guild_id=None, owner=None,
+                            limit=MAX_PLAYLIST_ENTRIES):
+        """Async generator entri playlist hasil ekstraksi flat
+
+        Halaman pertama (`PLAYLIST_PAGE_SIZE` entri) diambil lebih dulu supaya
+        entri pertama bisa segera diputar, sisanya diambil dalam satu
+        ekstraksi lanjutan. Setiap entri hanya berisi `url`, `title` dan
+        `duration`; URL stream baru di-resolve ketika track hampir diputar.
+        """
+        ranges = [(1, min(PLAYLIST_PAGE_SIZE, limit))]
+        if limit > PLAYLIST_PAGE_SIZE:
+            ranges.append((PLAYLIST_PAGE_SIZE + 1, limit))
+
+        for start, end in ranges:
+            options = dict(PLAYLIST_OPTIONS, playlist_items=f"{start}-{end}")
+            data = await scheduler.run(query, options, guild_id=guild_id, owner=owner)
+            entries = (data or {}).get('entries') or []
+            for entry in entries:
+                if not entry:
+                    continue
+                url = entry.get('url') or entry.get('webpage_url') or entry.get('id')
+                if url:
+                    yield {'url': url, 'title': entry.get('title'),
+                           'duration': entry.get('duration')}
+            if len(entries) < end - start + 1:
+                break
+
+    @classmethod
+    async def create_source(cls, ctx, query, *, loop=None, volume=1.0, timings=None):
+        """Cari lagu dan buka audio source untuk diputar
+
+        Track yang sudah ada di cache audio lokal diputar dari file; selain
+        itu stream dibuka lewat FFmpeg dan direkam ke cache jika aktif. Jika
+        `timings` (dict) diberikan, durasi tahap 'extract' dan 'open' dicatat.
+        """
+        guild = getattr(ctx, 'guild', None)
+        author = getattr(ctx, 'author', None)
+        started = time.perf_counter()
+        data = await cls.resolve(query, loop=loop,
+                                 guild_id=guild.id if guild else None,
+                                 owner=author.id if author else None,
+                                 usable=has_local_audio)
+        resolved = time.perf_counter()
+        if search_index is not None:
+            search_index.record(audio_key(data), data, query=query,
+                                guild_id=guild.id if guild else None)
+        source = cls.open_source(data, volume=volume, requester=author,
+                                 guild_id=guild.id if guild else None)
+        if timings is not None:
+            timings['extract'] = resolved - started
+            timings['open'] = time.perf_counter() - resolved
+        return source
+
+    @classmethod
+    async def restore(cls, data, *, volume=1.0, start=0.0, guild_id=None, timings=None):
+        """Buka source dari metadata tersimpan (warm restart setelah bot restart)
+
+        Metadata dipakai apa adanya jika URL stream-nya belum kedaluwarsa
+        atau audionya ada di cache lokal; selain itu URL stream di-refresh
+        dari `webpage_url` tanpa mengulang pencarian. `start` adalah posisi
+        (detik) untuk melanjutkan lagu yang sedang diputar sebelum restart.
+        """
+        started = time.perf_counter()
+        expires = stream_expiry(data.get('url'), 0)
+        if expires <= time.time() + resolution_cache.stream_margin and not has_local_audio(data):
+            data = await cls.resolve(data.get('webpage_url') or data['url'],
+                                     guild_id=guild_id, usable=has_local_audio)
+        resolved = time.perf_counter()
+        source = cls.open_source(data, volume=volume, start=start, guild_id=guild_id)
+        if timings is not None:
+            timings['extract'] = resolved - started
+            timings['open'] = time.perf_counter() - resolved
+        return source
+
+    @classmethod
+    def open_source(cls, data, *, volume=1.0, requester=None, start=0.0, guild_id=None):
+        """Buka audio source untuk metadata yang sudah di-resolve
+
+        Stream dari jaringan dibaca lewat jitter buffer (utils.audiobuffer)
+        yang membuka ulang stream jika putus (utils.streamrecovery); file
+        cache lokal diputar langsung.
+        """
+        local_path = audio_cache.get(audio_key(data)) if audio_cache is not None else None
+        if local_path is not None:
+            if volume == 1.0 and not start:
+                source = LocalOpusSource(local_path)
+            else:
+                source = open_audio(local_path, volume=volume, acodec='opus', start=start)
+            return cls(source, data, requester=requester, local_path=local_path,
+                       guild_id=guild_id)
+
+        record = None
+        # Siaran langsung dan track tanpa durasi tidak bisa dipastikan lengkap
+        if audio_cache is not None and audio_key(data) and data.get('duration') \
+                and not data.get('is_live'):
+            record = audio_cache.recorder(audio_key(data), expected=data.get('duration'))
+        try:
+            source = open_audio(data['url'], volume=volume, acodec=data.get('acodec'),
+                                start=start, record=record)
+        except Exception:
+            if record is not None:
+                record.abort()
+            raise
+        item = cls(source, data, requester=requester, guild_id=guild_id)
+        item.source = item._buffered(source, volume)
+        return item